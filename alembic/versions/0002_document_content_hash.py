@@ -0,0 +1,25 @@
+"""Add content hash to documents for upload deduplication
+
+Revision ID: 0002_document_content_hash
+Revises: 0001_initial
+Create Date: 2025-02-03 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0002_document_content_hash"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_index("ix_documents_content_hash", "documents", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    op.drop_column("documents", "content_hash")
@@ -0,0 +1,26 @@
+"""Store OCR payloads in object storage and keep a pointer and summary on documents
+
+Revision ID: 0003_document_ocr_object
+Revises: 0002_document_content_hash
+Create Date: 2025-02-10 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0003_document_ocr_object"
+down_revision = "0002_document_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("ocr_object", sa.String(), nullable=True))
+    op.add_column("documents", sa.Column("ocr_summary", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "ocr_summary")
+    op.drop_column("documents", "ocr_object")
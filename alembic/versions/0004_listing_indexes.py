@@ -0,0 +1,43 @@
+"""Covering keyset-pagination indexes for document and job listings
+
+Revision ID: 0004_listing_indexes
+Revises: 0003_document_ocr_object
+Create Date: 2025-02-17 00:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0004_listing_indexes"
+down_revision = "0003_document_ocr_object"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_documents_created_at_id", "documents", ["created_at", "id"], ["upload_id", "doc_type", "status", "updated_at", "finalized_at"]),
+    ("ix_documents_status_created_at_id", "documents", ["status", "created_at", "id"], ["upload_id", "doc_type", "updated_at", "finalized_at"]),
+    ("ix_documents_doc_type_created_at_id", "documents", ["doc_type", "created_at", "id"], ["upload_id", "status", "updated_at", "finalized_at"]),
+    ("ix_jobs_created_at_id", "jobs", ["created_at", "id"], ["upload_id", "document_id", "status", "stage", "updated_at"]),
+    ("ix_jobs_status_created_at_id", "jobs", ["status", "created_at", "id"], ["upload_id", "document_id", "stage", "updated_at"]),
+    ("ix_jobs_stage_created_at_id", "jobs", ["stage", "created_at", "id"], ["upload_id", "document_id", "status", "updated_at"]),
+)
+
+
+def upgrade() -> None:
+    # Built concurrently so large tables keep accepting writes during the migration.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_include=include,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
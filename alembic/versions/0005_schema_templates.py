@@ -0,0 +1,39 @@
+"""Layout templates that let recurring forms skip schema inference
+
+Revision ID: 0005_schema_templates
+Revises: 0004_listing_indexes
+Create Date: 2025-02-24 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0005_schema_templates"
+down_revision = "0004_listing_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "schema_templates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False, unique=True),
+        sa.Column("doc_type", sa.String(length=128), nullable=True),
+        sa.Column("anchors", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("schema_json", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("field_boxes", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("hits", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("confidence_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("last_hit_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_schema_templates_doc_type", "schema_templates", ["doc_type"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_schema_templates_doc_type", table_name="schema_templates")
+    op.drop_table("schema_templates")
@@ -0,0 +1,144 @@
+"""Partition documents and jobs by month of created_at and record the tenant of each row
+
+Revision ID: 0006_partitioned_lifecycle
+Revises: 0005_schema_templates
+Create Date: 2025-03-03 00:00:00.000000
+
+Both tables are rebuilt as range-partitioned tables with one partition per UTC
+month, from the oldest row to PARTITIONS_AHEAD months ahead, and a default
+partition that catches anything outside them. ``app_worker.retention`` creates
+later months and drops expired ones.
+
+Postgres requires the partition key in every primary and unique key, so these
+become (id, created_at) and (upload_id, created_at), and the foreign keys from
+``document_fields`` and ``jobs`` to ``documents`` are dropped. The rows are
+copied, so run this in a maintenance window.
+"""
+
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006_partitioned_lifecycle"
+down_revision = "0005_schema_templates"
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3
+
+# Primary keys are added separately. Unique keys hold per month only; upload ids
+# are random, so repeats are still rejected in practice.
+INDEXES = {
+    "documents": (
+        ("documents_upload_id_key", ["upload_id", "created_at"], "constraint"),
+        ("ix_documents_content_hash", ["content_hash"], "index"),
+        ("ix_documents_tenant_created_at", ["tenant", "created_at"], "index"),
+    ),
+    "jobs": (
+        ("ix_jobs_upload_id", ["upload_id", "created_at"], "unique"),
+        ("ix_jobs_tenant_created_at", ["tenant", "created_at"], "index"),
+    ),
+}
+# Covering listing indexes from 0004_listing_indexes.
+LISTING_INDEXES = {
+    "documents": (
+        ("ix_documents_created_at_id", ["created_at", "id"], ["upload_id", "doc_type", "status", "updated_at", "finalized_at"]),
+        ("ix_documents_status_created_at_id", ["status", "created_at", "id"], ["upload_id", "doc_type", "updated_at", "finalized_at"]),
+        ("ix_documents_doc_type_created_at_id", ["doc_type", "created_at", "id"], ["upload_id", "status", "updated_at", "finalized_at"]),
+    ),
+    "jobs": (
+        ("ix_jobs_created_at_id", ["created_at", "id"], ["upload_id", "document_id", "status", "stage", "updated_at"]),
+        ("ix_jobs_status_created_at_id", ["status", "created_at", "id"], ["upload_id", "document_id", "stage", "updated_at"]),
+        ("ix_jobs_stage_created_at_id", ["stage", "created_at", "id"], ["upload_id", "document_id", "status", "updated_at"]),
+    ),
+}
+FOREIGN_KEYS = (
+    ("document_fields_document_id_fkey", "document_fields", "CASCADE"),
+    ("jobs_document_id_fkey", "jobs", "SET NULL"),
+)
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _months(table: str) -> list[date]:
+    oldest = op.get_bind().scalar(sa.text(f"SELECT min(created_at) FROM {table}_unpartitioned"))
+    today = datetime.now(timezone.utc).date().replace(day=1)
+    month = min(oldest.astimezone(timezone.utc).date().replace(day=1), today) if oldest else today
+    months = []
+    while month <= _add_months(today, PARTITIONS_AHEAD):
+        months.append(month)
+        month = _add_months(month, 1)
+    return months
+
+
+def _create_indexes(table: str) -> None:
+    for name, columns, kind in INDEXES[table]:
+        if kind == "constraint":
+            op.create_unique_constraint(name, table, columns)
+        else:
+            op.create_index(name, table, columns, unique=kind == "unique")
+    for name, columns, include in LISTING_INDEXES[table]:
+        op.create_index(name, table, columns, postgresql_include=include)
+
+
+def _partition(table: str) -> None:
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+    op.execute(
+        f"CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS INCLUDING STORAGE) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    for month in _months(table):
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{_add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+        )
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")
+    if table == "documents":
+        # The id sequence belongs to the old table and would be dropped with it.
+        op.execute("ALTER SEQUENCE documents_id_seq OWNED BY documents.id")
+    op.drop_table(f"{table}_unpartitioned")
+    op.create_primary_key(f"{table}_pkey", table, ["id", "created_at"])
+    _create_indexes(table)
+
+
+def _unpartition(table: str) -> None:
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+    op.execute(f"CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS INCLUDING STORAGE)")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_partitioned")
+    if table == "documents":
+        op.execute("ALTER SEQUENCE documents_id_seq OWNED BY documents.id")
+    # Dropping the parent drops its partitions and their indexes.
+    op.drop_table(f"{table}_partitioned")
+    op.create_primary_key(f"{table}_pkey", table, ["id"])
+    if table == "documents":
+        op.create_unique_constraint("documents_upload_id_key", table, ["upload_id"])
+        op.create_index("ix_documents_content_hash", table, ["content_hash"])
+    else:
+        op.create_index("ix_jobs_upload_id", table, ["upload_id"], unique=True)
+    for name, columns, include in LISTING_INDEXES[table]:
+        op.create_index(name, table, columns, postgresql_include=include)
+
+
+def upgrade() -> None:
+    for name, table, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_="foreignkey")
+    for table in ("documents", "jobs"):
+        op.add_column(table, sa.Column("tenant", sa.String(length=64), nullable=True))
+        _partition(table)
+
+
+def downgrade() -> None:
+    for table in ("jobs", "documents"):
+        _unpartition(table)
+        op.drop_column(table, "tenant")
+    # Retention removed documents without foreign keys; clear what pointed at them.
+    op.execute("DELETE FROM document_fields WHERE document_id NOT IN (SELECT id FROM documents)")
+    op.execute("UPDATE jobs SET document_id = NULL WHERE document_id NOT IN (SELECT id FROM documents)")
+    for name, table, ondelete in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, "documents", ["document_id"], ["id"], ondelete=ondelete)
@@ -0,0 +1,50 @@
+"""Lead the document and job listing indexes with the tenant
+
+Revision ID: 0007_tenant_listing_indexes
+Revises: 0006_partitioned_lifecycle
+Create Date: 2025-03-10 00:00:00.000000
+
+Listings are scoped to the caller's tenant, so the covering keyset indexes from
+0004_listing_indexes gain ``tenant`` as their first column. They also serve the
+per-tenant retention deletes, which replaces the (tenant, created_at) indexes.
+Postgres cannot build indexes concurrently on partitioned tables, so both
+tables are locked against writes while this runs.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007_tenant_listing_indexes"
+down_revision = "0006_partitioned_lifecycle"
+branch_labels = None
+depends_on = None
+
+# (old name, new name, table, columns after tenant, INCLUDE columns)
+INDEXES = (
+    ("ix_documents_created_at_id", "ix_documents_tenant_created_at_id", "documents", ["created_at", "id"], ["upload_id", "doc_type", "status", "updated_at", "finalized_at"]),
+    ("ix_documents_status_created_at_id", "ix_documents_tenant_status_created_at_id", "documents", ["status", "created_at", "id"], ["upload_id", "doc_type", "updated_at", "finalized_at"]),
+    ("ix_documents_doc_type_created_at_id", "ix_documents_tenant_doc_type_created_at_id", "documents", ["doc_type", "created_at", "id"], ["upload_id", "status", "updated_at", "finalized_at"]),
+    ("ix_jobs_created_at_id", "ix_jobs_tenant_created_at_id", "jobs", ["created_at", "id"], ["upload_id", "document_id", "status", "stage", "updated_at"]),
+    ("ix_jobs_status_created_at_id", "ix_jobs_tenant_status_created_at_id", "jobs", ["status", "created_at", "id"], ["upload_id", "document_id", "stage", "updated_at"]),
+    ("ix_jobs_stage_created_at_id", "ix_jobs_tenant_stage_created_at_id", "jobs", ["stage", "created_at", "id"], ["upload_id", "document_id", "status", "updated_at"]),
+)
+TENANT_INDEXES = (
+    ("ix_documents_tenant_created_at", "documents"),
+    ("ix_jobs_tenant_created_at", "jobs"),
+)
+
+
+def upgrade() -> None:
+    for old, new, table, columns, include in INDEXES:
+        op.create_index(new, table, ["tenant", *columns], postgresql_include=include)
+        op.drop_index(old, table_name=table)
+    for name, table in TENANT_INDEXES:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table in TENANT_INDEXES:
+        op.create_index(name, table, ["tenant", "created_at"])
+    for old, new, table, columns, include in reversed(INDEXES):
+        op.create_index(old, table, columns, postgresql_include=include)
+        op.drop_index(new, table_name=table)
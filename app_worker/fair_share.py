@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Sequence
+
+from rq import Queue, Worker
+
+from core.admission import record_completion
+from core.config import get_settings
+from core.queue import (
+    LANES,
+    active_tenants,
+    claim_tenant_slot,
+    get_queue,
+    parse_lane_queue_name,
+    queue_stage,
+    release_tenant_slot,
+    stage_queue_name,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_lane_weights(value: str) -> dict[str, int]:
+    """``"interactive=8,bulk=2"`` -> weight per lane; lanes left out get weight 1."""
+    weights = dict.fromkeys(LANES, 1)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        lane, _, weight = item.partition("=")
+        if lane.strip() not in weights:
+            raise ValueError(f"Unknown queue lane in QUEUE_LANE_WEIGHTS: {lane.strip()}")
+        weights[lane.strip()] = max(int(weight), 1)
+    return weights
+
+
+class LaneScheduler:
+    """Decides the order in which a worker polls the per-tenant sub-queues.
+
+    Lanes take turns by smooth weighted round-robin, so with weights 8:2:1 the
+    interactive lane is polled first in 8 of 11 dequeues and none is starved.
+    Within a lane the tenant served last moves to the back. Redis pops from the
+    first non-empty queue in the order, so an idle lane or tenant costs nothing.
+    """
+
+    def __init__(self, stages: list[str], weights: dict[str, int]) -> None:
+        self.stages = stages
+        self.weights = weights
+        self._credit = dict.fromkeys(weights, 0)
+        self._tenants: dict[str, list[str]] = {lane: [] for lane in weights}
+
+    def update_tenants(self, tenants: dict[str, list[str]]) -> None:
+        """Adopt the current tenant lists, keeping the rotation order of known tenants."""
+        for lane, current in tenants.items():
+            active = set(current)
+            known = [tenant for tenant in self._tenants[lane] if tenant in active]
+            self._tenants[lane] = known + [tenant for tenant in current if tenant not in set(known)]
+
+    def lane_order(self) -> list[str]:
+        total = sum(self.weights.values())
+        for lane, weight in self.weights.items():
+            self._credit[lane] += weight
+        first = max(self._credit, key=self._credit.get)
+        self._credit[first] -= total
+        return [first, *sorted((lane for lane in self.weights if lane != first), key=self.weights.get, reverse=True)]
+
+    def queue_names(self, skip_tenants: set[str] = frozenset()) -> list[str]:
+        return [
+            stage_queue_name(stage, lane, tenant)
+            for lane in self.lane_order()
+            for tenant in self._tenants[lane]
+            if tenant not in skip_tenants
+            for stage in self.stages
+        ]
+
+    def served(self, lane: str, tenant: str) -> None:
+        tenants = self._tenants[lane]
+        if tenant in tenants:
+            tenants.remove(tenant)
+            tenants.append(tenant)
+
+
+class FairShareWorker(Worker):
+    """RQ worker that shares dequeues fairly between lanes and tenants.
+
+    ``queues`` (the plain stage queues and the base queue) are polled after
+    every lane, so jobs enqueued before lanes existed still drain. With
+    ``QUEUE_TENANT_MAX_RUNNING`` set, a job of a tenant that already has that
+    many jobs running anywhere is pushed back to the front of its queue and
+    the tenant is skipped until the next rescan.
+    """
+
+    def __init__(self, queues: list[Queue], *args: Any, stages: Sequence[str] = (), **kwargs: Any) -> None:
+        super().__init__(queues, *args, **kwargs)
+        settings = get_settings()
+        self.fallback_queues = list(self.queues)
+        self.lanes = LaneScheduler(list(stages), parse_lane_weights(settings.QUEUE_LANE_WEIGHTS))
+        self.tenant_limit = settings.QUEUE_TENANT_MAX_RUNNING
+        self.refresh_seconds = max(settings.QUEUE_REFRESH_SECONDS, 1)
+        self._refreshed_at = 0.0
+        self._saturated: set[str] = set()
+        self._claimed: str | None = None
+
+    def refresh_tenants(self) -> None:
+        self.lanes.update_tenants(active_tenants(self.connection))
+        self._saturated.clear()
+        self._refreshed_at = time.monotonic()
+
+    def _order_queues(self) -> None:
+        if time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh_tenants()
+        lane_queues = [get_queue(name) for name in self.lanes.queue_names(self._saturated)]
+        self._ordered_queues = lane_queues + self.fallback_queues
+        # Registry maintenance (abandoned and expired jobs) walks ``self.queues``.
+        self.queues = self._ordered_queues
+
+    def dequeue_job_and_maintain_ttl(self, timeout: int | None, max_idle_time: int | None = None):
+        # Block for at most ``refresh_seconds`` at a time, so that queues of tenants
+        # that appear while the worker is idle are picked up.
+        idle_since = time.monotonic()
+        while True:
+            self._order_queues()
+            window = max_idle_time
+            if timeout is not None:
+                window = self.refresh_seconds
+                if max_idle_time is not None:
+                    window = min(window, max_idle_time - int(time.monotonic() - idle_since))
+                    if window <= 0:
+                        return None
+            result = super().dequeue_job_and_maintain_ttl(timeout and min(timeout, window), window)
+            if result is None:
+                if timeout is None:
+                    return None
+                continue
+
+            job, queue = result
+            lane_queue = parse_lane_queue_name(queue.name)
+            if lane_queue is None:
+                return result
+            _, lane, tenant = lane_queue
+            if not self._claim(job, tenant):
+                queue.push_job_id(job.id, at_front=True)
+                self._saturated.add(tenant)
+                continue
+            self.lanes.served(lane, tenant)
+            return result
+
+    def _claim(self, job: Any, tenant: str) -> bool:
+        if self.tenant_limit <= 0:
+            return True
+        if not claim_tenant_slot(self.connection, tenant, self.name, self.tenant_limit, self.get_heartbeat_ttl(job)):
+            logger.debug("Tenant at its running-job limit", extra={"tenant": tenant})
+            return False
+        self._claimed = tenant
+        return True
+
+    def execute_job(self, job: Any, queue: Queue) -> None:
+        try:
+            super().execute_job(job, queue)
+        finally:
+            if self._claimed is not None:
+                release_tenant_slot(self.connection, self._claimed, self.name)
+                self._claimed = None
+        # Stage throughput for upload admission control (``core.admission``).
+        stage = queue_stage(queue.name)
+        if stage is not None:
+            record_completion(self.connection, stage)
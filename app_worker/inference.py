@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+
+from core.config import get_settings
+from core.queue import get_redis_connection
+from services.schema_ai.batcher import BatchServer
+from services.schema_ai.client import create_backend, create_cache
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main(argv: list[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Serve batched schema-AI inference for pipeline workers.")
+    parser.add_argument("--batch-size", type=int, default=settings.SCHEMA_AI_BATCH_SIZE)
+    parser.add_argument("--window-ms", type=int, default=settings.SCHEMA_AI_BATCH_WINDOW_MS)
+    parser.add_argument("--max-in-flight", type=int, default=settings.SCHEMA_AI_MAX_IN_FLIGHT)
+    args = parser.parse_args(argv)
+
+    backend = create_backend()
+    if backend is None:
+        parser.error("SCHEMA_AI_URL is not configured")
+    server = BatchServer(
+        get_redis_connection(),
+        backend,
+        create_cache(),
+        batch_size=args.batch_size,
+        window=args.window_ms / 1000,
+        max_in_flight=args.max_in_flight,
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: server.stop())
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,58 @@
 from __future__ import annotations
 
+import argparse
 import logging
 
-from rq import Connection, Worker
+from rq import Connection
+
+from app_worker.fair_share import FairShareWorker
 
 from core.config import get_settings
-from core.queue import get_queue, get_redis_connection
+from core.queue import PIPELINE_STAGES, get_queue, get_redis_connection, get_stage_queue
+from core.startup import StartupTimings, log_ready, warm_worker
 
 logging.basicConfig(level=logging.INFO)
 
 
-def main() -> None:
+def parse_stages(value: str | None) -> list[str]:
+    if not value:
+        return list(PIPELINE_STAGES)
+    stages = [stage.strip() for stage in value.split(",") if stage.strip()]
+    unknown = sorted(set(stages) - set(PIPELINE_STAGES))
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(unknown)}")
+    return stages
+
+
+def add_stage_argument(parser: argparse.ArgumentParser) -> None:
+    settings = get_settings()
+    parser.add_argument(
+        "--stages",
+        default=settings.RQ_WORKER_STAGES,
+        help=f"Comma-separated stages to consume (default: all of {', '.join(PIPELINE_STAGES)})",
+    )
+
+
+def run_worker(stages: list[str]) -> None:
     settings = get_settings()
-    queue = get_queue(settings.RQ_QUEUE_NAME)
+    timings = StartupTimings()
+    warm_worker(timings)
+    # Stage queues first; the base queue only drains jobs enqueued before the staged pipeline.
+    queues = [get_stage_queue(stage) for stage in stages]
+    queues.append(get_queue(settings.RQ_QUEUE_NAME))
 
     with Connection(get_redis_connection()):
-        worker = Worker([queue.name])
+        worker = FairShareWorker(queues, stages=stages)
+        log_ready("Worker", timings)
         worker.work(with_scheduler=True)
 
 
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run an RQ worker for one or more pipeline stages.")
+    add_stage_argument(parser)
+    args = parser.parse_args(argv)
+    run_worker(parse_stages(args.stages))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import threading
+
+from core.config import get_settings
+from documents.retention import run_retention
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def serve(stop: threading.Event) -> None:
+    """Run a retention pass every ``RETENTION_INTERVAL_SECONDS`` until ``stop`` is set."""
+    interval = get_settings().RETENTION_INTERVAL_SECONDS
+    while not stop.is_set():
+        try:
+            run_retention(stop)
+        except Exception:
+            logger.exception("Retention pass failed; retrying in %s s", interval)
+        stop.wait(interval)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Create upcoming partitions and delete expired documents, jobs and stored objects."
+    )
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args(argv)
+
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    if args.once:
+        run_retention(stop)
+    else:
+        serve(stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import time
+
+from app_worker.main import add_stage_argument, parse_stages, run_worker
+from core import metrics
+from core.config import get_settings
+from core.database import get_sync_sessionmaker
+from core.queue import get_redis_connection
+from core.startup import StartupTimings
+
+logger = logging.getLogger(__name__)
+
+MIN_HEALTHY_UPTIME = 10.0
+MAX_RESTART_BACKOFF = 30.0
+
+
+def preload() -> dict[str, float]:
+    """Import and warm heavy dependencies once so forked workers share them copy-on-write.
+
+    Returns the time spent per step in milliseconds.
+    """
+    timings = StartupTimings()
+
+    def imaging() -> None:
+        from PIL import Image
+
+        import numpy  # noqa: F401
+        import pypdfium2  # noqa: F401
+
+        Image.init()
+
+    def services() -> None:
+        import app_worker.tasks  # noqa: F401
+        import services.ocr  # noqa: F401
+        import services.preproc  # noqa: F401
+        import services.quality  # noqa: F401
+        import services.schema_ai  # noqa: F401
+
+    def prompts() -> None:
+        from services.schema_ai.prompts import FIELD_MAP_PROMPT, SCHEMA_INFER_PROMPT, load_prompt
+
+        load_prompt(SCHEMA_INFER_PROMPT)
+        load_prompt(FIELD_MAP_PROMPT)
+
+    for name, func in (("imaging", imaging), ("services", services), ("prompts", prompts)):
+        with timings.step(name):
+            func()
+    return timings.steps
+
+
+class Supervisor:
+    """Pre-forking parent that keeps ``processes`` RQ workers alive.
+
+    Children are restarted when they die unexpectedly (with backoff when they
+    crash quickly). SIGTERM/SIGINT trigger a warm shutdown: children receive
+    SIGTERM, finish their current job, and are killed after ``shutdown_timeout``.
+    """
+
+    def __init__(self, stages: list[str], processes: int, shutdown_timeout: float) -> None:
+        self.stages = stages
+        self.processes = processes
+        self.shutdown_timeout = shutdown_timeout
+        self._children: dict[int, float] = {}
+        self._backoff = 0.0
+        self._stopping = False
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self._children[pid] = time.monotonic()
+            logger.info("Started worker process", extra={"pid": pid, "stages": self.stages})
+            return
+
+        # Child: restore default signal handling so RQ can install its own.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.environ[metrics.WORKER_ID_ENV] = str(os.getpid())
+        exit_code = 0
+        try:
+            run_worker(self.stages)
+        except Exception:
+            logger.exception("Worker process crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _handle_stop(self, signum, frame) -> None:
+        if self._stopping:
+            return
+        logger.info("Stopping worker processes", extra={"signal": signum})
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+
+    def _reap(self) -> list[tuple[int, int, float]]:
+        exited = []
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                break
+            if pid == 0:
+                break
+            started = self._children.pop(pid, time.monotonic())
+            exited.append((pid, status, time.monotonic() - started))
+        return exited
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        # Connections must not be shared across fork; children open their own.
+        get_redis_connection.cache_clear()
+        get_sync_sessionmaker.cache_clear()
+        gc.freeze()
+
+        for _ in range(self.processes):
+            self._spawn()
+
+        next_spawn = 0.0
+        while not self._stopping:
+            for pid, status, uptime in self._reap():
+                logger.warning(
+                    "Worker process exited",
+                    extra={"pid": pid, "exit_code": os.waitstatus_to_exitcode(status), "uptime": round(uptime, 1)},
+                )
+                self._backoff = (
+                    min(max(self._backoff * 2, 1.0), MAX_RESTART_BACKOFF) if uptime < MIN_HEALTHY_UPTIME else 0.0
+                )
+                next_spawn = time.monotonic() + self._backoff
+            while not self._stopping and len(self._children) < self.processes and time.monotonic() >= next_spawn:
+                self._spawn()
+            time.sleep(0.5)
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.2)
+        for pid in list(self._children):
+            logger.warning("Killing worker process after shutdown timeout", extra={"pid": pid})
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while self._children:
+            self._reap()
+            time.sleep(0.05)
+
+
+def main(argv: list[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Pre-fork RQ workers that share preloaded dependencies.")
+    add_stage_argument(parser)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.WORKER_PROCESSES or os.cpu_count() or 1,
+        help="Number of worker processes (default: WORKER_PROCESSES or the CPU count)",
+    )
+    args = parser.parse_args(argv)
+    stages = parse_stages(args.stages)
+
+    timings = preload()
+    logger.info("Preloaded worker dependencies", extra={"timings_ms": timings})
+
+    if settings.METRICS_ENABLED and settings.WORKER_METRICS_PORT:
+        metrics.reset_multiprocess_dir()
+        metrics.start_worker_exporter(settings.WORKER_METRICS_PORT)
+
+    Supervisor(stages, args.processes, settings.WORKER_SHUTDOWN_TIMEOUT).run()
+
+
+if __name__ == "__main__":
+    main()
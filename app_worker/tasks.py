@@ -1,12 +1,325 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from rq import get_current_job
+from sqlalchemy import text
+from sqlalchemy.orm import object_session
+
+from core import metrics, storage
+from core.config import get_settings
+from core.database import get_sync_sessionmaker
+from core.events import publish_job_event_sync
+from core.queue import (
+    LANE_REPROCESS,
+    STAGE_OCR,
+    STAGE_PREPROC,
+    STAGE_QUALITY,
+    STAGE_SCHEMA,
+    cancel_dependents_sync,
+    current_lane,
+    enqueue_page_fanout_sync,
+    enqueue_pipeline_chains_sync,
+)
+from documents.models import (
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    STATUS_PROCESSING,
+    STATUS_REJECTED,
+    TERMINAL_STATUSES,
+    DocumentModel,
+    JobModel,
+)
+from documents.fields import upsert_fields_sync
+from documents.payloads import ocr_payload_sync, summarize_ocr
+from services.webhooks import enqueue_webhook_sync, webhook_event
 
 logger = logging.getLogger(__name__)
 
+STATUS_RUNNING = "running"
+STAGE_OCR_MERGE = "ocr_merge"
+# Metrics label of the per-page OCR jobs.
+OCR_PAGE_STAGE = "ocr_page"
+
+_INCREMENT_PAGES_DONE = text(
+    """
+    UPDATE jobs
+    SET payload = jsonb_set(
+            coalesce(payload, '{}'::jsonb),
+            '{pages_done}',
+            to_jsonb(coalesce((payload->>'pages_done')::int, 0) + 1)
+        ),
+        updated_at = now()
+    WHERE id = :job_id
+    RETURNING (payload->>'pages_done')::int, (payload->>'pages_total')::int
+    """
+)
+
+StageWork = Callable[[JobModel, DocumentModel], dict[str, Any]]
+
+
+def _put_json(object_name: str, payload: Any, compress: bool = False) -> int:
+    return storage.put_json_sync(object_name, payload, compress=compress)
+
+
+def _get_json(object_name: str) -> Any:
+    return storage.get_json_sync(object_name)
+
+
+def _notify_webhook(job: JobModel, document: DocumentModel, stage: str) -> None:
+    """Queue the customer webhook once a job reaches a terminal status; the dispatcher delivers it."""
+    if job.status not in TERMINAL_STATUSES or not document.webhook_url:
+        return
+    event = webhook_event(
+        job.status,
+        job_id=str(job.id),
+        upload_id=job.upload_id,
+        document_id=document.id,
+        stage=stage,
+        doc_type=document.doc_type,
+    )
+    enqueue_webhook_sync(document.webhook_url, event)
+
+
+def _run_stage(stage: str, job_id: str, upload_id: str, work: StageWork, *, final: bool = False) -> dict[str, Any]:
+    """Record stage transitions on ``JobModel``/``DocumentModel`` around ``work``.
+
+    Stages of a job that already reached a terminal status are skipped, so a
+    rejected or failed document does not keep consuming downstream workers.
+    """
+    SessionLocal = get_sync_sessionmaker()
+    with SessionLocal() as session:
+        job = session.get(JobModel, uuid.UUID(job_id))
+        if job is None:
+            logger.warning("Job not found", extra={"job_id": job_id, "upload_id": upload_id, "stage": stage})
+            return {"job_id": job_id, "upload_id": upload_id, "stage": stage, "status": "missing"}
+        if job.status in TERMINAL_STATUSES:
+            return {"job_id": job_id, "upload_id": upload_id, "stage": stage, "status": "skipped"}
+
+        document = job.document
+        job.stage = stage
+        job.status = STATUS_RUNNING
+        document.status = STATUS_PROCESSING
+        session.commit()
+        publish_job_event_sync(job_id, upload_id, stage, job.status, event="started")
+
+        started = time.perf_counter()
+        try:
+            result = work(job, document)
+        except Exception:
+            metrics.observe_since(metrics.STAGE_SECONDS, started, stage, STATUS_FAILED)
+            metrics.STAGE_FAILURES.labels(stage).inc()
+            session.rollback()
+            job.status = STATUS_FAILED
+            document.status = STATUS_FAILED
+            session.commit()
+            publish_job_event_sync(job_id, upload_id, stage, STATUS_FAILED, event="failed")
+            _notify_webhook(job, document, stage)
+            logger.exception("Stage failed", extra={"job_id": job_id, "upload_id": upload_id, "stage": stage})
+            raise
+
+        if final and job.status not in TERMINAL_STATUSES:
+            job.status = STATUS_COMPLETED
+            document.status = STATUS_COMPLETED
+            document.finalized_at = datetime.now(timezone.utc)
+        session.commit()
+        metrics.observe_since(metrics.STAGE_SECONDS, started, stage, job.status)
+        publish_job_event_sync(job_id, upload_id, stage, job.status, event="finished")
+        _notify_webhook(job, document, stage)
+        return {"job_id": job_id, "upload_id": upload_id, "stage": stage, "status": job.status, **result}
+
+
+def run_quality_stage(*, job_id: str, upload_id: str, source_object: str) -> dict[str, Any]:
+    def work(job: JobModel, document: DocumentModel) -> dict[str, Any]:
+        from services.quality import assess
+
+        report = assess(storage.get_bytes_sync(source_object))
+        output = storage.proc_object_name(upload_id, storage.QUALITY_OBJECT)
+        _put_json(output, report)
+        document.quality_json = report
+        if report["ok"] or not get_settings().QUALITY_GATE_ENABLED:
+            return {"output": output}
+
+        job.status = STATUS_REJECTED
+        document.status = STATUS_REJECTED
+        document.finalized_at = datetime.now(timezone.utc)
+        current = get_current_job()
+        canceled = cancel_dependents_sync(current.id) if current is not None else []
+        logger.info(
+            "Upload rejected by quality gate",
+            extra={"job_id": job_id, "upload_id": upload_id, "reasons": report["reasons"], "canceled": len(canceled)},
+        )
+        return {"output": output, "rejected": report["reasons"]}
+
+    return _run_stage(STAGE_QUALITY, job_id, upload_id, work)
+
+
+def run_preproc_stage(*, job_id: str, upload_id: str, source_object: str) -> dict[str, Any]:
+    def work(job: JobModel, document: DocumentModel) -> dict[str, Any]:
+        from services.preproc import rectify
+        from services.preproc.imaging import iter_pages
+
+        data = storage.get_bytes_sync(source_object)
+
+        # Multi-page inputs are only split here; each page is rectified by its own OCR page job.
+        pages = 0
+        for pages, (page_data, suffix) in enumerate(iter_pages(data), start=1):
+            storage.put_bytes_sync(storage.page_object_name(upload_id, pages, suffix), page_data)
+        if pages:
+            job.payload = {**(job.payload or {}), "pages_total": pages, "pages_done": 0, "page_suffix": suffix}
+            return {"pages": pages}
+
+        image, report = rectify(data)
+        output = storage.proc_object_name(upload_id, storage.RECTIFIED_OBJECT)
+        storage.put_bytes_sync(output, image, content_type="image/png")
+        document.rectified_url = output
+        job.payload = {**(job.payload or {}), "pages_total": 1, "pages_done": 0, "preproc": report}
+        logger.info("Rectified upload", extra={"job_id": job_id, "upload_id": upload_id, **report})
+        return {"output": output, "pages": 1, "timings_ms": report["timings_ms"]}
+
+    return _run_stage(STAGE_PREPROC, job_id, upload_id, work)
+
+
+def run_ocr_stage(*, job_id: str, upload_id: str) -> dict[str, Any]:
+    """Fan out one OCR job per page; merge and schema jobs are chained after them."""
+
+    def work(job: JobModel, document: DocumentModel) -> dict[str, Any]:
+        progress = job.payload or {}
+        suffix = progress.get("page_suffix")
+        if suffix is None:
+            pages = [storage.proc_object_name(upload_id, storage.RECTIFIED_OBJECT)]
+        else:
+            pages = [
+                storage.page_object_name(upload_id, number, suffix)
+                for number in range(1, progress["pages_total"] + 1)
+            ]
+        lane, tenant = current_lane()
+        page_job_ids = enqueue_page_fanout_sync(
+            job_id, upload_id, pages, preprocess=suffix is not None, lane=lane, tenant=tenant
+        )
+        return {"pages": len(page_job_ids)}
+
+    return _run_stage(STAGE_OCR, job_id, upload_id, work)
+
+
+def run_ocr_page(*, job_id: str, upload_id: str, page: int, page_object: str, preprocess: bool) -> dict[str, Any]:
+    from services.ocr import recognize
+    from services.preproc import rectify
+
+    SessionLocal = get_sync_sessionmaker()
+    with SessionLocal() as session:
+        job = session.get(JobModel, uuid.UUID(job_id))
+        if job is None or job.status in TERMINAL_STATUSES:
+            return {"job_id": job_id, "upload_id": upload_id, "page": page, "status": "skipped"}
+
+    timings = None
+    started = time.perf_counter()
+    try:
+        image = storage.get_bytes_sync(page_object)
+        if preprocess:
+            image, report = rectify(image)
+            timings = report["timings_ms"]
+            # Next to the source page, never over it: a PNG page would be rectified twice on a retry.
+            rectified = storage.page_object_name(upload_id, page, storage.RECTIFIED_PAGE_SUFFIX)
+            storage.put_bytes_sync(rectified, image, content_type="image/png")
+            logger.info("Rectified page", extra={"job_id": job_id, "upload_id": upload_id, "page": page, **report})
+        result = recognize(image, mime_type="PNG", page=page)
+        _put_json(storage.page_object_name(upload_id, page, ".ocr.json"), result, compress=True)
+    except Exception:
+        metrics.observe_since(metrics.STAGE_SECONDS, started, OCR_PAGE_STAGE, STATUS_FAILED)
+        metrics.STAGE_FAILURES.labels(OCR_PAGE_STAGE).inc()
+        with SessionLocal() as session:
+            job = session.get(JobModel, uuid.UUID(job_id))
+            # Several pages can fail; only the first one notifies the customer.
+            first_failure = job.status not in TERMINAL_STATUSES
+            job.status = STATUS_FAILED
+            job.document.status = STATUS_FAILED
+            session.commit()
+            publish_job_event_sync(job_id, upload_id, STAGE_OCR, STATUS_FAILED, event="failed", page=page)
+            if first_failure:
+                _notify_webhook(job, job.document, STAGE_OCR)
+        logger.exception("Page OCR failed", extra={"job_id": job_id, "upload_id": upload_id, "page": page})
+        raise
+
+    with SessionLocal() as session:
+        pages_done, pages_total = session.execute(_INCREMENT_PAGES_DONE, {"job_id": uuid.UUID(job_id)}).one()
+        session.commit()
+    metrics.observe_since(metrics.STAGE_SECONDS, started, OCR_PAGE_STAGE, "done")
+    publish_job_event_sync(
+        job_id,
+        upload_id,
+        STAGE_OCR,
+        STATUS_RUNNING,
+        event="page_done",
+        page=page,
+        pages_done=pages_done,
+        pages_total=pages_total,
+    )
+    return {"job_id": job_id, "upload_id": upload_id, "page": page, "status": "done", "timings_ms": timings}
+
+
+def run_ocr_merge_stage(*, job_id: str, upload_id: str, pages_total: int) -> dict[str, Any]:
+    def work(job: JobModel, document: DocumentModel) -> dict[str, Any]:
+        merged_pages = [
+            _get_json(storage.page_object_name(upload_id, number, ".ocr.json"))
+            for number in range(1, pages_total + 1)
+        ]
+        if document.rectified_url is None:
+            document.rectified_url = storage.page_object_name(upload_id, 1, storage.RECTIFIED_PAGE_SUFFIX)
+
+        payload = {
+            "upload_id": upload_id,
+            "pages": merged_pages,
+            "text": "\n\n".join(page["text"] for page in merged_pages),
+        }
+        output = storage.proc_object_name(upload_id, storage.OCR_OBJECT)
+        stored_bytes = _put_json(output, payload, compress=True)
+        document.ocr_object = output
+        document.ocr_summary = summarize_ocr(payload, stored_bytes)
+        return {"output": output, "pages": len(merged_pages)}
+
+    return _run_stage(STAGE_OCR_MERGE, job_id, upload_id, work)
+
+
+def run_schema_stage(*, job_id: str, upload_id: str, ocr_object: str) -> dict[str, Any]:
+    """Resolve the schema; the OCR payload is read through the document, so ``ocr_object`` is informational."""
+
+    def work(job: JobModel, document: DocumentModel) -> dict[str, Any]:
+        from services.schema_ai import resolve_schema
+
+        payload = ocr_payload_sync(document)
+        if payload is None:
+            raise RuntimeError(f"Document {document.id} has no OCR payload")
+        session = object_session(document)
+        schema, fields, template = resolve_schema(session, upload_id, payload, quality_summary=document.quality_json)
+        job.payload = {**(job.payload or {}), "schema_template": template}
+        logger.info("Schema resolved", extra={"job_id": job_id, "upload_id": upload_id, **template})
+        if fields:
+            upsert_fields_sync(session, {document.id: fields})
+        if schema is None:
+            return {"output": None}
+        output = storage.proc_object_name(upload_id, storage.SCHEMA_OBJECT)
+        _put_json(output, schema)
+        document.schema_json = schema
+        document.doc_type = schema.get("doc_type")
+        return {"output": output}
+
+    return _run_stage(STAGE_SCHEMA, job_id, upload_id, work, final=True)
+
 
 def process_upload(*, job_id: str, upload_id: str) -> dict[str, Any]:
-    """Stub pipeline task. Extend with Quality, Preproc, OCR steps."""
-    logger.info("Received job", extra={"job_id": job_id, "upload_id": upload_id})
-    return {"job_id": job_id, "upload_id": upload_id, "status": "received"}
+    """Entry point kept for jobs enqueued before the staged pipeline; starts the stage chain."""
+    SessionLocal = get_sync_sessionmaker()
+    with SessionLocal() as session:
+        job = session.get(JobModel, uuid.UUID(job_id))
+        source_object = job.document.source_url if job and job.document else None
+    if source_object is None:
+        logger.warning("Job has no source object", extra={"job_id": job_id, "upload_id": upload_id})
+        return {"job_id": job_id, "upload_id": upload_id, "status": "missing"}
+
+    [queue_job_id] = enqueue_pipeline_chains_sync([(job_id, upload_id, source_object)], lane=LANE_REPROCESS)
+    return {"job_id": job_id, "upload_id": upload_id, "status": "enqueued", "queue_job_id": queue_job_id}
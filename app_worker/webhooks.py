@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import signal
+import socket
+
+from core.config import get_settings
+from core.queue import get_async_redis_connection
+from services.webhooks.dispatcher import DispatcherConfig, WebhookDispatcher, create_client
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def serve(consumer: str) -> None:
+    settings = get_settings()
+    async with create_client() as client:
+        dispatcher = WebhookDispatcher(get_async_redis_connection(), client, DispatcherConfig.from_settings(consumer))
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, dispatcher.stop)
+        await dispatcher.run(settings.WORKER_SHUTDOWN_TIMEOUT)
+
+
+def main(argv: list[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Deliver queued webhooks to customer endpoints.")
+    parser.add_argument(
+        "--consumer",
+        default=settings.WEBHOOK_CONSUMER_NAME or socket.gethostname(),
+        help="Stable name of this dispatcher; its unacknowledged deliveries are re-queued on restart",
+    )
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.consumer))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.responses import TokenResponse
 from core.config import get_settings
-from core.security import create_access_token, create_refresh_token, get_token_payload, verify_password
+from core.security import create_access_token, create_refresh_token, get_token_payload, verify_and_update_password
 from users.models import UserModel
 
 settings = get_settings()
@@ -22,7 +22,8 @@ async def get_token(data, db: AsyncSession):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not verify_password(data.password, user.password):
+    verified, new_hash = await verify_and_update_password(data.password, user.password)
+    if not verified:
         raise HTTPException(
             status_code=400,
             detail="Invalid login credentials.",
@@ -31,6 +32,10 @@ async def get_token(data, db: AsyncSession):
 
     _verify_user_access(user=user)
 
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     return await _get_user_token(user=user)
 
 async def get_refresh_token(token: str, db: AsyncSession):
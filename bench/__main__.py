@@ -0,0 +1,114 @@
+"""``python -m bench run`` measures the gateway and the pipeline; ``python -m bench compare`` diffs two result files."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench import report
+from bench.load import SCENARIOS, Account
+from bench.stages import STAGES
+from bench.standins import configure
+
+
+def _size(value: str) -> int:
+    units = {"k": 1024, "m": 1024 * 1024}
+    suffix = value[-1].lower()
+    return int(float(value[:-1]) * units[suffix]) if suffix in units else int(value)
+
+
+def _run(args: argparse.Namespace) -> int:
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="ocr-bench-"))
+    standins = configure(workdir, database_url=args.database_url, redis_url=args.redis_url)
+    result: dict = {
+        "environment": report.environment(),
+        "standins": standins,
+        "parameters": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "file_size": args.file_size,
+            "iterations": args.iterations,
+            "url": args.url,
+        },
+    }
+
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    if scenarios:
+        from bench.load import run_load
+
+        account = Account(args.email, args.password) if args.email and args.password else None
+        result["http"] = asyncio.run(
+            run_load(
+                scenarios,
+                concurrency=args.concurrency,
+                requests=args.requests,
+                file_size=args.file_size,
+                url=args.url,
+                account=account,
+                warmup=args.warmup,
+            )
+        )
+    if args.iterations:
+        from bench.stages import run_stages
+
+        result["stages"] = run_stages(args.iterations)
+    result["peak_rss_mb"] = report.peak_rss_mb()
+
+    out = Path(args.out or f"bench-results/{time.strftime('%Y%m%d-%H%M%S')}.json")
+    report.save(result, out)
+    for section in ("http", "stages"):
+        for name, row in (result.get(section) or {}).items():
+            if "skipped" in row:
+                print(f"{section}:{name:<12} skipped: {row['skipped']}")
+                continue
+            rate = f"{row['rps']} req/s" if "rps" in row else f"{row['items_per_second']} items/s"
+            print(
+                f"{section}:{name:<12} p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  "
+                f"p99 {row['p99_ms']} ms  {rate}  rss {row['peak_rss_mb']} MB"
+            )
+    print(f"Results written to {out}")
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    changes, regressed = report.compare(report.load(args.baseline), report.load(args.candidate), args.threshold)
+    print(report.format_changes(changes))
+    return 1 if regressed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and save the results as JSON")
+    run.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}; empty skips HTTP")
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    run.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    run.add_argument("--file-size", type=_size, default=_size("256k"), help="upload size, e.g. 64k or 5m")
+    run.add_argument("--iterations", type=int, default=10, help=f"uploads pushed through {','.join(STAGES)}; 0 skips")
+    run.add_argument("--url", help="benchmark a running gateway instead of an in-process app")
+    run.add_argument("--email", help="verified account for the auth scenarios against --url")
+    run.add_argument("--password")
+    run.add_argument("--database-url", help="async SQLAlchemy URL instead of SQLite, e.g. a local Postgres")
+    run.add_argument("--redis-url", help="real Redis instead of fakeredis")
+    run.add_argument("--workdir", help="directory for the SQLite database and local storage")
+    run.add_argument("--out", help="result file (default bench-results/<timestamp>.json)")
+    run.set_defaults(handler=_run)
+
+    diff = commands.add_parser("compare", help="compare two result files; exits 1 on a regression")
+    diff.add_argument("baseline", type=Path)
+    diff.add_argument("candidate", type=Path)
+    diff.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    diff.set_defaults(handler=_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
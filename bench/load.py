@@ -0,0 +1,207 @@
+"""Closed-loop HTTP load against the gateway: ``concurrency`` clients each send their next request as soon as the last one returns."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable
+from uuid import uuid4
+
+import httpx
+
+from bench.report import peak_rss_mb, summarize
+
+SCENARIOS = ("upload", "register", "token", "refresh", "me")
+# Scenarios that need a verified account to log in with.
+AUTHENTICATED = frozenset({"token", "refresh", "me"})
+
+
+@dataclass
+class Account:
+    email: str
+    password: str
+    access_token: str = ""
+    refresh_token: str = ""
+
+
+@dataclass
+class LoadContext:
+    run_id: str
+    file_size: int
+    account: Account | None = None
+    # Request indices are unique across warmup and measured runs, so registered emails never collide.
+    sequence: itertools.count = field(default_factory=itertools.count)
+    _filler: bytes = field(default=b"", repr=False)
+
+    def upload_body(self, index: int) -> bytes:
+        # A unique prefix keeps content-hash deduplication from short-circuiting uploads.
+        if len(self._filler) != self.file_size:
+            self._filler = os.urandom(self.file_size)
+        prefix = f"{self.run_id}:{index}:".encode()
+        return prefix + self._filler[len(prefix) :]
+
+
+Send = Callable[[httpx.AsyncClient, LoadContext, int], Awaitable[httpx.Response]]
+
+
+async def _upload(client: httpx.AsyncClient, context: LoadContext, index: int) -> httpx.Response:
+    files = {"file": (f"bench-{index}.png", context.upload_body(index), "image/png")}
+    return await client.post("/uploads/", files=files)
+
+
+def _user(email: str, password: str) -> dict[str, str]:
+    return {
+        "first_name": "Bench",
+        "last_name": "User",
+        "email": email,
+        "password": password,
+        "confirm_password": password,
+    }
+
+
+async def _register(client: httpx.AsyncClient, context: LoadContext, index: int) -> httpx.Response:
+    return await client.post("/users/", json=_user(f"bench-{context.run_id}-{index}@example.com", "bench-password"))
+
+
+async def _token(client: httpx.AsyncClient, context: LoadContext, index: int) -> httpx.Response:
+    account = context.account
+    return await client.post("/auth/token", data={"username": account.email, "password": account.password})
+
+
+async def _refresh(client: httpx.AsyncClient, context: LoadContext, index: int) -> httpx.Response:
+    return await client.post("/auth/refresh", headers={"refresh-token": context.account.refresh_token})
+
+
+async def _me(client: httpx.AsyncClient, context: LoadContext, index: int) -> httpx.Response:
+    return await client.get("/users/me", headers={"Authorization": f"Bearer {context.account.access_token}"})
+
+
+SENDERS: dict[str, Send] = {
+    "upload": _upload,
+    "register": _register,
+    "token": _token,
+    "refresh": _refresh,
+    "me": _me,
+}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, context: LoadContext, name: str, concurrency: int, requests: int
+) -> dict:
+    send = SENDERS[name]
+    remaining = iter(range(requests))
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+
+    async def user() -> None:
+        for _ in remaining:
+            index = next(context.sequence)
+            started = time.perf_counter()
+            try:
+                response = await send(client, context, index)
+            except httpx.HTTPError as exc:
+                statuses[type(exc).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": ok,
+        "statuses": dict(statuses),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        **summarize(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def _mark_verified(email: str) -> None:
+    from sqlalchemy import update
+
+    from core.database import AsyncSessionLocal
+    from users.models import UserModel
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(UserModel).where(UserModel.email == email).values(is_verified=True))
+        await session.commit()
+
+
+async def prepare_account(client: httpx.AsyncClient, context: LoadContext, account: Account | None) -> Account:
+    """Log in with ``account``, or register one and verify it directly in the database (in-process only)."""
+    if account is None:
+        account = Account(email=f"bench-{context.run_id}@example.com", password="bench-password")
+        response = await client.post("/users/", json=_user(account.email, account.password))
+        response.raise_for_status()
+        await _mark_verified(account.email)
+    response = await client.post("/auth/token", data={"username": account.email, "password": account.password})
+    response.raise_for_status()
+    tokens = response.json()
+    account.access_token = tokens["access_token"]
+    account.refresh_token = tokens["refresh_token"]
+    return account
+
+
+@asynccontextmanager
+async def in_process_client(timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    """Run ``main.app`` with its lifespan in this process and talk to it over ASGI, without sockets."""
+    import main
+    from core.database import engine
+
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+                yield client
+    finally:
+        # aiosqlite connections live on non-daemon threads; close them or the process never exits.
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def remote_client(url: str, concurrency: int, timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        yield client
+
+
+async def run_load(
+    scenarios: list[str],
+    *,
+    concurrency: int,
+    requests: int,
+    file_size: int,
+    url: str | None = None,
+    account: Account | None = None,
+    warmup: int = 0,
+    timeout: float = 60.0,
+) -> dict[str, dict]:
+    """Run each scenario in turn and return their summaries keyed by scenario name.
+
+    Against a remote ``url`` the authenticated scenarios need an existing
+    verified ``account``; they are skipped without one.
+    """
+    context = LoadContext(run_id=uuid4().hex[:12], file_size=file_size)
+    client_context = remote_client(url, concurrency, timeout) if url else in_process_client(timeout)
+    results: dict[str, dict] = {}
+    async with client_context as client:
+        if AUTHENTICATED.intersection(scenarios) and (account is not None or url is None):
+            context.account = await prepare_account(client, context, account)
+        for name in scenarios:
+            if name in AUTHENTICATED and context.account is None:
+                results[name] = {"skipped": "needs --email/--password against a remote server"}
+                continue
+            if warmup:
+                await run_scenario(client, context, name, concurrency, warmup)
+            results[name] = await run_scenario(client, context, name, concurrency, requests)
+    return results
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+# Metrics where a larger value is an improvement; everything else is a cost.
+HIGHER_IS_BETTER = frozenset({"rps", "items_per_second"})
+COMPARED = ("p50_ms", "p95_ms", "p99_ms", "rps", "items_per_second", "peak_rss_mb")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile of ``values`` (0 <= pct <= 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies_ms: list[float]) -> dict[str, float]:
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms, default=0.0), 3),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (``ru_maxrss`` is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def environment() -> dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save(result: dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+
+
+def load(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def _rows(result: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    rows = {f"http:{name}": row for name, row in (result.get("http") or {}).items()}
+    rows.update({f"stage:{name}": row for name, row in (result.get("stages") or {}).items()})
+    return rows
+
+
+def compare(baseline: dict[str, Any], candidate: dict[str, Any], threshold: float) -> tuple[list[dict[str, Any]], bool]:
+    """Relative change of every shared metric; a change worse than ``threshold`` (e.g. 0.1) is a regression."""
+    changes = []
+    regressed = False
+    before, after = _rows(baseline), _rows(candidate)
+    for name in sorted(before.keys() & after.keys()):
+        for metric in COMPARED:
+            old, new = before[name].get(metric), after[name].get(metric)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old
+            worse = -delta if metric in HIGHER_IS_BETTER else delta
+            regression = worse > threshold
+            regressed |= regression
+            changes.append(
+                {"name": name, "metric": metric, "before": old, "after": new, "delta": round(delta, 4), "regression": regression}
+            )
+    return changes, regressed
+
+
+def format_changes(changes: list[dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<24} {'metric':<18} {'before':>12} {'after':>12} {'change':>9}"]
+    for change in changes:
+        flag = "  REGRESSION" if change["regression"] else ""
+        lines.append(
+            f"{change['name']:<24} {change['metric']:<18} {change['before']:>12} {change['after']:>12} "
+            f"{change['delta']:>+9.1%}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,140 @@
+"""Per-stage throughput of the worker pipeline, calling the RQ task functions directly.
+
+The OCR fan-out and page jobs are left out: recognition is an external API and
+page progress is counted with a Postgres-only ``jsonb_set`` update. Their
+output is written synthetically so the merge and schema stages see real input.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import random
+import time
+import uuid
+from typing import Any
+
+from bench.report import peak_rss_mb, summarize
+
+STAGES = ("quality", "preproc", "ocr_merge", "schema")
+_LABELS = ("Invoice number", "Date", "Customer", "Address", "Total amount", "Tax", "Due date", "Reference")
+
+
+def synthetic_page(width: int, height: int, seed: int) -> bytes:
+    """A slightly skewed PNG "form": dark text-like bars on an off-white page."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("L", (width, height), 235)
+    draw = ImageDraw.Draw(image)
+    margin, line_height = width // 12, max(height // 60, 8)
+    for top in range(margin, height - margin, line_height * 2):
+        left = margin
+        while left < width - margin:
+            word = rng.randint(line_height, line_height * 6)
+            draw.rectangle([left, top, min(left + word, width - margin), top + line_height], fill=rng.randint(10, 60))
+            left += word + line_height
+    image = image.rotate(rng.uniform(-2, 2), fillcolor=235, resample=Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", dpi=(200, 200))
+    return buffer.getvalue()
+
+
+def synthetic_ocr_page(page: int, seed: int, width: int, height: int) -> dict[str, Any]:
+    """An OCR page payload shaped like ``services.ocr.normalize`` output, with label: value lines."""
+    rng = random.Random(seed)
+    segments = []
+    for index, label in enumerate(_LABELS):
+        top = 120 + index * 90
+        segments.append(
+            {
+                "id": f"p{page}-b0-l{index}",
+                "page": page,
+                "bbox": [100, top, 100 + 40 * len(label), top + 40],
+                "text": f"{label}: {rng.randint(1000, 999999)}",
+                "confidence": round(rng.uniform(0.85, 0.99), 3),
+            }
+        )
+    return {
+        "page": page,
+        "width": width,
+        "height": height,
+        "text": "\n".join(segment["text"] for segment in segments),
+        "segments": segments,
+    }
+
+
+def _sync_sessionmaker():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import documents.models  # noqa: F401 - registers the tables
+    import users.models  # noqa: F401
+    from bench.standins import sync_database_url
+    from core.database import Base
+
+    engine = create_engine(sync_database_url(os.environ["DATABASE_URL"]))
+    Base.metadata.create_all(engine)
+    return sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+
+def _create_job(SessionLocal, source_object: str, upload_id: str) -> str:
+    from documents.models import DocumentModel, JobModel
+
+    with SessionLocal() as session:
+        document = DocumentModel(upload_id=upload_id, source_url=source_object)
+        job = JobModel(upload_id=upload_id, document=document)
+        session.add_all([document, job])
+        session.commit()
+        return str(job.id)
+
+
+def run_stages(iterations: int, width: int = 1700, height: int = 2200, warmup: int = 1) -> dict[str, dict]:
+    """Push ``iterations`` synthetic uploads through every stage and summarize each stage's latency."""
+    # Every iteration must reach the later stages, whatever the synthetic page scores.
+    os.environ["QUALITY_GATE_ENABLED"] = "false"
+
+    from app_worker import tasks
+    from core import storage
+    from core.config import get_settings
+
+    get_settings.cache_clear()
+    SessionLocal = _sync_sessionmaker()
+    tasks.get_sync_sessionmaker = lambda: SessionLocal
+    storage.get_backend().ensure_bucket(get_settings().MINIO_BUCKET)
+
+    latencies: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    for iteration in range(warmup + iterations):
+        upload_id = uuid.uuid4().hex
+        source_object = f"raw/{upload_id}/source.png"
+        storage.put_bytes_sync(source_object, synthetic_page(width, height, iteration), content_type="image/png")
+        job_id = _create_job(SessionLocal, source_object, upload_id)
+        ocr_page = synthetic_ocr_page(1, iteration, width, height)
+        calls = {
+            "quality": lambda: tasks.run_quality_stage(job_id=job_id, upload_id=upload_id, source_object=source_object),
+            "preproc": lambda: tasks.run_preproc_stage(job_id=job_id, upload_id=upload_id, source_object=source_object),
+            "ocr_merge": lambda: tasks.run_ocr_merge_stage(job_id=job_id, upload_id=upload_id, pages_total=1),
+            "schema": lambda: tasks.run_schema_stage(
+                job_id=job_id, upload_id=upload_id, ocr_object=storage.proc_object_name(upload_id, storage.OCR_OBJECT)
+            ),
+        }
+        for stage in STAGES:
+            if stage == "ocr_merge":
+                storage.put_json_sync(storage.page_object_name(upload_id, 1, ".ocr.json"), ocr_page, compress=True)
+            started = time.perf_counter()
+            result = calls[stage]()
+            if result["status"] in ("missing", "skipped"):
+                raise RuntimeError(f"Stage {stage} did not run: {result}")
+            if iteration >= warmup:
+                latencies[stage].append((time.perf_counter() - started) * 1000)
+
+    results = {}
+    for stage, values in latencies.items():
+        total_s = sum(values) / 1000
+        results[stage] = {
+            "iterations": len(values),
+            "items_per_second": round(len(values) / total_s, 2) if total_s else 0.0,
+            **summarize(values),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    return results
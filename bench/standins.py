@@ -0,0 +1,96 @@
+"""Local stand-ins for Postgres, Redis and MinIO, so the gateway and workers run without containers.
+
+:func:`configure` must run before anything imports ``core.database`` or
+``main``: the async engine is created at import time from ``DATABASE_URL``.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+STANDIN_ENV = {
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "bench",
+    "MINIO_ENDPOINT": "localhost:9000",
+    "MINIO_ACCESS_KEY": "bench",
+    "MINIO_SECRET_KEY": "bench-secret",
+    "MINIO_BUCKET": "bench",
+    "MINIO_SECURE": "false",
+    "REDIS_URL": "redis://localhost:6379/0",
+    "RQ_QUEUE_NAME": "bench",
+    "JWT_SECRET": "bench-secret",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_TOKEN_EXPIRE_MINUTES": "60",
+    "SCHEMA_AI_BACKEND": "stub",
+}
+
+
+def configure(workdir: Path, database_url: str | None = None, redis_url: str | None = None) -> dict[str, str]:
+    """Point settings at ``workdir`` and patch in the stand-ins; returns what was chosen.
+
+    ``database_url``/``redis_url`` select real services instead of SQLite and
+    fakeredis, e.g. to benchmark against a local Postgres.
+    """
+    workdir.mkdir(parents=True, exist_ok=True)
+    for name, value in STANDIN_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LOCAL_ROOT"] = str(workdir / "storage")
+    os.environ["SCHEMA_AI_CACHE_DIR"] = str(workdir / "schema_ai_cache")
+    os.environ["DATABASE_URL"] = database_url or f"sqlite+aiosqlite:///{workdir / 'bench.db'}"
+    if redis_url:
+        os.environ["REDIS_URL"] = redis_url
+    else:
+        _use_fakeredis()
+    if os.environ["DATABASE_URL"].startswith("sqlite"):
+        _register_sqlite_types()
+        # Template learning upserts with a Postgres-only ON CONFLICT statement.
+        os.environ.setdefault("SCHEMA_TEMPLATES_ENABLED", "false")
+    return {
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "redis": "redis" if redis_url else "fakeredis",
+        "storage": "local",
+    }
+
+
+def _use_fakeredis() -> None:
+    import fakeredis
+    from fakeredis import aioredis
+
+    import core.queue
+
+    server = fakeredis.FakeServer()
+
+    class FakeRedis(fakeredis.FakeRedis):
+        @classmethod
+        def from_url(cls, url: str, **kwargs) -> FakeRedis:
+            return cls(server=server)
+
+    class FakeAsyncRedis(aioredis.FakeRedis):
+        @classmethod
+        def from_url(cls, url: str, **kwargs) -> FakeAsyncRedis:
+            return cls(server=server)
+
+    core.queue.Redis = FakeRedis
+    core.queue.AsyncRedis = FakeAsyncRedis
+    core.queue.get_redis_connection.cache_clear()
+    core.queue.get_async_redis_connection.cache_clear()
+    core.queue.get_queue.cache_clear()
+
+
+def _register_sqlite_types() -> None:
+    from sqlalchemy.dialects.postgresql import JSONB
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(JSONB, "sqlite")
+    def _jsonb(type_, compiler, **kw):
+        return "JSON"
+
+
+def sync_database_url(database_url: str) -> str:
+    """The blocking-driver URL used by worker tasks."""
+    return database_url.replace("sqlite+aiosqlite", "sqlite").replace("postgresql+asyncpg", "postgresql+psycopg")
@@ -0,0 +1,184 @@
+"""Admission control for uploads, based on the queue backlog and recent stage throughput.
+
+Workers count finished jobs per stage in short Redis buckets. The gateway
+reads those counts and the depth of every stage queue, at most once per
+``ADMISSION_CACHE_SECONDS``, and turns them into an estimated wait. Uploads
+are refused with 429 before anything is stored when a configured limit is hit.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+from redis import Redis
+from rq import Queue
+
+from core import metrics
+from core.cache import TTLCache
+from core.config import get_settings
+from core.queue import (
+    LANES,
+    PIPELINE_STAGES,
+    get_async_redis_connection,
+    lane_tenants_key,
+    stage_queue_name,
+    tenant_key,
+)
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_BUCKET_SECONDS = 10
+
+_backlog_cache = TTLCache(maxsize=1, ttl=get_settings().ADMISSION_CACHE_SECONDS)
+
+
+def _throughput_key(stage: str, bucket: int) -> str:
+    return f"{get_settings().RQ_QUEUE_NAME}:throughput:{stage}:{bucket}"
+
+
+def record_completion(connection: Redis, stage: str) -> None:
+    """Count one finished job of ``stage``; called by the workers after every job."""
+    bucket = int(time.time()) // THROUGHPUT_BUCKET_SECONDS
+    key = _throughput_key(stage, bucket)
+    with connection.pipeline(transaction=False) as pipe:
+        pipe.incr(key)
+        pipe.expire(key, get_settings().ADMISSION_THROUGHPUT_WINDOW_SECONDS + THROUGHPUT_BUCKET_SECONDS)
+        pipe.execute()
+
+
+@dataclass
+class Backlog:
+    """Queued jobs per stage and per tenant, and finished jobs per second per stage."""
+
+    queued: dict[str, int] = field(default_factory=dict)
+    queued_by_tenant: dict[str, int] = field(default_factory=dict)
+    throughput: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total_queued(self) -> int:
+        return sum(self.queued.values())
+
+    @property
+    def total_throughput(self) -> float:
+        return sum(self.throughput.values())
+
+    def estimated_wait(self) -> float | None:
+        """Seconds until a job enqueued now starts its last stage; None without throughput data.
+
+        Every job queued at a stage or before it passes through that stage
+        ahead of the new job, so each stage adds its cumulative backlog
+        divided by its recent throughput.
+        """
+        wait, ahead = 0.0, 0
+        for stage in PIPELINE_STAGES:
+            ahead += self.queued.get(stage, 0)
+            if not ahead:
+                continue
+            rate = self.throughput.get(stage, 0.0)
+            if rate <= 0:
+                return None
+            wait += ahead / rate
+        return round(wait, 1)
+
+    def drain_seconds(self, jobs: int) -> float | None:
+        """Seconds for the workers to finish ``jobs`` queued jobs at the current throughput."""
+        rate = self.total_throughput
+        return jobs / rate if rate > 0 else None
+
+
+async def read_backlog() -> Backlog:
+    settings = get_settings()
+    redis = get_async_redis_connection()
+    async with redis.pipeline(transaction=False) as pipe:
+        for lane in LANES:
+            pipe.zrange(lane_tenants_key(lane), 0, -1)
+        tenants_by_lane = await pipe.execute()
+
+    queues: list[tuple[str, str | None, str]] = [(stage, None, stage_queue_name(stage)) for stage in PIPELINE_STAGES]
+    for lane, tenants in zip(LANES, tenants_by_lane):
+        for member in tenants:
+            tenant = member.decode() if isinstance(member, bytes) else member
+            queues.extend((stage, tenant, stage_queue_name(stage, lane, tenant)) for stage in PIPELINE_STAGES)
+
+    window = settings.ADMISSION_THROUGHPUT_WINDOW_SECONDS
+    now = time.time()
+    buckets = range(int(now - window) // THROUGHPUT_BUCKET_SECONDS + 1, int(now) // THROUGHPUT_BUCKET_SECONDS + 1)
+    async with redis.pipeline(transaction=False) as pipe:
+        for _, _, name in queues:
+            pipe.llen(Queue.redis_queue_namespace_prefix + name)
+        for stage in PIPELINE_STAGES:
+            pipe.mget([_throughput_key(stage, bucket) for bucket in buckets])
+        results = await pipe.execute()
+
+    backlog = Backlog()
+    for (stage, tenant, _), depth in zip(queues, results):
+        backlog.queued[stage] = backlog.queued.get(stage, 0) + depth
+        if tenant is not None:
+            backlog.queued_by_tenant[tenant] = backlog.queued_by_tenant.get(tenant, 0) + depth
+    for stage, counts in zip(PIPELINE_STAGES, results[len(queues) :]):
+        backlog.throughput[stage] = sum(int(count) for count in counts if count) / window
+    return backlog
+
+
+async def current_backlog() -> Backlog | None:
+    """The cached backlog snapshot; None when Redis cannot be read (admission then fails open)."""
+    backlog = _backlog_cache.get("backlog")
+    if backlog is None:
+        try:
+            backlog = await read_backlog()
+        except Exception:
+            logger.warning("Failed to read the queue backlog; admitting uploads", exc_info=True)
+            return None
+        _backlog_cache.set("backlog", backlog)
+    return backlog
+
+
+def _reject(reason: str, detail: str, retry_after: float | None) -> HTTPException:
+    settings = get_settings()
+    metrics.ADMISSION_REJECTIONS.labels(reason).inc()
+    seconds = settings.ADMISSION_DEFAULT_RETRY_AFTER if retry_after is None else math.ceil(retry_after)
+    seconds = min(max(seconds, 1), settings.ADMISSION_MAX_RETRY_AFTER)
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(seconds)})
+
+
+async def admit_uploads(tenant: str | None, count: int = 1) -> float | None:
+    """Admit ``count`` uploads of ``tenant`` or raise 429 with ``Retry-After``.
+
+    Returns the estimated wait in seconds before the uploads are processed,
+    or None when there is not enough throughput data to estimate it.
+    """
+    settings = get_settings()
+    backlog = await current_backlog()
+    if backlog is None:
+        return None
+    tenant = tenant_key(tenant)
+
+    limit = settings.ADMISSION_MAX_QUEUED_JOBS
+    excess = backlog.total_queued + count - limit
+    if limit and excess > 0:
+        raise _reject("global", "The processing queue is full. Please retry later.", backlog.drain_seconds(excess))
+
+    limit = settings.ADMISSION_MAX_QUEUED_JOBS_PER_TENANT
+    excess = backlog.queued_by_tenant.get(tenant, 0) + count - limit
+    if limit and excess > 0:
+        raise _reject(
+            "tenant",
+            "Too many of your uploads are waiting to be processed. Please retry later.",
+            backlog.drain_seconds(excess),
+        )
+
+    wait = backlog.estimated_wait()
+    limit = settings.ADMISSION_MAX_WAIT_SECONDS
+    if limit and wait is not None and wait > limit:
+        raise _reject("wait", "The processing backlog exceeds the allowed wait. Please retry later.", wait - limit)
+
+    # Count the admitted uploads in the cached snapshot, so a burst between two
+    # reads cannot overshoot the limits.
+    first_stage = PIPELINE_STAGES[0]
+    backlog.queued[first_stage] = backlog.queued.get(first_stage, 0) + count
+    backlog.queued_by_tenant[tenant] = backlog.queued_by_tenant.get(tenant, 0) + count
+    return wait
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -18,21 +19,166 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.getenv("POSTGRES_DB")
     DATABASE_URL: str = f"postgresql+psycopg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}" 
     
+    # Gateway connection pool; checkouts that wait longer than DB_POOL_TIMEOUT fail with 503
+    DB_POOL_SIZE: int = os.getenv("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW: int = os.getenv("DB_MAX_OVERFLOW", 0)
+    DB_POOL_TIMEOUT: float = os.getenv("DB_POOL_TIMEOUT", 2.0)
+    DB_POOL_PREWARM: bool = os.getenv("DB_POOL_PREWARM", True)
+    # Schema handling at gateway startup: "create" runs create_all (development), "check" only
+    # verifies that the database is at the alembic head revision (one query), "off" skips both;
+    # deployments run `alembic upgrade head` first (the compose "migrate" service) and use "check",
+    # since create_all builds unpartitioned tables without an alembic revision
+    DB_SCHEMA_MODE: str = os.getenv("DB_SCHEMA_MODE", "create")
+
     # Minio
     MINIO_ENDPOINT: str = os.getenv("MINIO_ENDPOINT")
     MINIO_ACCESS_KEY: str = os.getenv("MINIO_ACCESS_KEY")
     MINIO_SECRET_KEY: str = os.getenv("MINIO_SECRET_KEY")
     MINIO_BUCKET: str = os.getenv("MINIO_BUCKET")
     MINIO_SECURE: bool = os.getenv("MINIO_SECURE")
+    MINIO_REGION: str | None = os.getenv("MINIO_REGION")
+
+    # Storage backend: "minio", or "local" for single-node deployments and tests
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "minio")
+    STORAGE_LOCAL_ROOT: str = os.getenv("STORAGE_LOCAL_ROOT", "./data/storage")
+    STORAGE_PUBLIC_URL: str = os.getenv("STORAGE_PUBLIC_URL", "")
+    STORAGE_SIGNING_SECRET: str | None = os.getenv("STORAGE_SIGNING_SECRET")
+    STORAGE_MAX_WORKERS: int = os.getenv("STORAGE_MAX_WORKERS", 16)
+    STORAGE_CONNECT_TIMEOUT: float = os.getenv("STORAGE_CONNECT_TIMEOUT", 5.0)
+    STORAGE_READ_TIMEOUT: float = os.getenv("STORAGE_READ_TIMEOUT", 60.0)
+
+    # Uploads
+    UPLOAD_MAX_BYTES: int = os.getenv("UPLOAD_MAX_BYTES", 256 * 1024 * 1024)
+    UPLOAD_CHUNK_SIZE: int = os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024)
+    UPLOAD_PART_SIZE: int = os.getenv("UPLOAD_PART_SIZE", 8 * 1024 * 1024)
+    UPLOAD_PARALLEL_PARTS: int = os.getenv("UPLOAD_PARALLEL_PARTS", 1)
+    UPLOAD_BATCH_MAX_FILES: int = os.getenv("UPLOAD_BATCH_MAX_FILES", 1000)
+    UPLOAD_BATCH_CONCURRENCY: int = os.getenv("UPLOAD_BATCH_CONCURRENCY", 8)
+
+    # Upload admission control: limits on queued pipeline jobs (0: unlimited) and on the
+    # estimated wait, computed from stage throughput over the last window
+    ADMISSION_MAX_QUEUED_JOBS: int = os.getenv("ADMISSION_MAX_QUEUED_JOBS", 0)
+    ADMISSION_MAX_QUEUED_JOBS_PER_TENANT: int = os.getenv("ADMISSION_MAX_QUEUED_JOBS_PER_TENANT", 0)
+    ADMISSION_MAX_WAIT_SECONDS: float = os.getenv("ADMISSION_MAX_WAIT_SECONDS", 0)
+    ADMISSION_THROUGHPUT_WINDOW_SECONDS: int = os.getenv("ADMISSION_THROUGHPUT_WINDOW_SECONDS", 300)
+    ADMISSION_CACHE_SECONDS: float = os.getenv("ADMISSION_CACHE_SECONDS", 1.0)
+    ADMISSION_DEFAULT_RETRY_AFTER: int = os.getenv("ADMISSION_DEFAULT_RETRY_AFTER", 30)
+    ADMISSION_MAX_RETRY_AFTER: int = os.getenv("ADMISSION_MAX_RETRY_AFTER", 300)
 
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL")
     RQ_QUEUE_NAME: str = os.getenv("RQ_QUEUE_NAME")
+    RQ_WORKER_STAGES: str | None = os.getenv("RQ_WORKER_STAGES")
+    # Seconds RQ keeps finished and failed jobs in Redis (its defaults: 500 s and one year)
+    RQ_RESULT_TTL: int = os.getenv("RQ_RESULT_TTL", 3600)
+    RQ_FAILURE_TTL: int = os.getenv("RQ_FAILURE_TTL", 7 * 24 * 3600)
+    WORKER_PROCESSES: int = os.getenv("WORKER_PROCESSES", 0)
+    WORKER_SHUTDOWN_TIMEOUT: int = os.getenv("WORKER_SHUTDOWN_TIMEOUT", 60)
+    # Fair-share dequeuing: relative share of dequeues per lane, concurrent jobs per
+    # tenant across all workers (0: unlimited), and how often workers rescan tenants
+    QUEUE_LANE_WEIGHTS: str = os.getenv("QUEUE_LANE_WEIGHTS", "interactive=8,bulk=2,reprocess=1")
+    QUEUE_TENANT_MAX_RUNNING: int = os.getenv("QUEUE_TENANT_MAX_RUNNING", 0)
+    QUEUE_TENANT_IDLE_SECONDS: int = os.getenv("QUEUE_TENANT_IDLE_SECONDS", 24 * 3600)
+    QUEUE_REFRESH_SECONDS: int = os.getenv("QUEUE_REFRESH_SECONDS", 5)
+    EVENTS_QUEUE_SIZE: int = os.getenv("EVENTS_QUEUE_SIZE", 100)
+    EVENTS_HEARTBEAT_SECONDS: int = os.getenv("EVENTS_HEARTBEAT_SECONDS", 15)
+    EVENTS_MAX_SUBSCRIPTIONS: int = os.getenv("EVENTS_MAX_SUBSCRIPTIONS", 1000)
+
+    # Data retention (app_worker.retention). Documents and jobs older than RETENTION_DAYS are
+    # deleted with their fields and stored objects (0: kept forever); RETENTION_TENANT_DAYS
+    # overrides it per tenant as "tenant=days,...". Monthly partitions are created
+    # RETENTION_PARTITIONS_AHEAD months ahead; expired ones are dropped, or with
+    # RETENTION_PARTITION_ACTION=detach kept as standalone tables for archiving, together
+    # with their stored objects and a document_fields_p{YYYY_MM} table of their fields
+    RETENTION_DAYS: int = os.getenv("RETENTION_DAYS", 0)
+    RETENTION_TENANT_DAYS: str = os.getenv("RETENTION_TENANT_DAYS", "")
+    RETENTION_PARTITION_ACTION: str = os.getenv("RETENTION_PARTITION_ACTION", "drop")
+    RETENTION_PARTITIONS_AHEAD: int = os.getenv("RETENTION_PARTITIONS_AHEAD", 3)
+    RETENTION_BATCH_SIZE: int = os.getenv("RETENTION_BATCH_SIZE", 500)
+    RETENTION_INTERVAL_SECONDS: int = os.getenv("RETENTION_INTERVAL_SECONDS", 3600)
+
+    # Prometheus metrics: gateway /metrics, and a supervisor exporter per worker service (0 disables it)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", True)
+    WORKER_METRICS_PORT: int = os.getenv("WORKER_METRICS_PORT", 9100)
+
+    # Webhooks
+    WEBHOOK_CONSUMER_NAME: str | None = os.getenv("WEBHOOK_CONSUMER_NAME")
+    WEBHOOK_TIMEOUT_SECONDS: float = os.getenv("WEBHOOK_TIMEOUT_SECONDS", 10.0)
+    WEBHOOK_MAX_CONNECTIONS: int = os.getenv("WEBHOOK_MAX_CONNECTIONS", 100)
+    WEBHOOK_MAX_KEEPALIVE: int = os.getenv("WEBHOOK_MAX_KEEPALIVE", 20)
+    WEBHOOK_PER_HOST_CONCURRENCY: int = os.getenv("WEBHOOK_PER_HOST_CONCURRENCY", 4)
+    WEBHOOK_BATCH_SIZE: int = os.getenv("WEBHOOK_BATCH_SIZE", 1)
+    WEBHOOK_BATCH_WINDOW_MS: int = os.getenv("WEBHOOK_BATCH_WINDOW_MS", 200)
+    WEBHOOK_MAX_ATTEMPTS: int = os.getenv("WEBHOOK_MAX_ATTEMPTS", 8)
+    WEBHOOK_BACKOFF_BASE_SECONDS: float = os.getenv("WEBHOOK_BACKOFF_BASE_SECONDS", 2.0)
+    WEBHOOK_BACKOFF_MAX_SECONDS: float = os.getenv("WEBHOOK_BACKOFF_MAX_SECONDS", 600.0)
+    WEBHOOK_DEAD_LETTER_MAX: int = os.getenv("WEBHOOK_DEAD_LETTER_MAX", 10000)
+    WEBHOOK_METRICS_INTERVAL_SECONDS: float = os.getenv("WEBHOOK_METRICS_INTERVAL_SECONDS", 60.0)
+
+    # Pipeline
+    PDF_RENDER_DPI: int = os.getenv("PDF_RENDER_DPI", 200)
+    PREPROC_TARGET_DPI: int = os.getenv("PREPROC_TARGET_DPI", 300)
+    PREPROC_TILE_ROWS: int = os.getenv("PREPROC_TILE_ROWS", 512)
+    # Low-resolution pages are upscaled by at most this factor (1.0: never upscaled)
+    PREPROC_MAX_UPSCALE: float = os.getenv("PREPROC_MAX_UPSCALE", 1.0)
+    PREPROC_MAX_SKEW_DEGREES: float = os.getenv("PREPROC_MAX_SKEW_DEGREES", 10.0)
+    PREPROC_BINARIZE: bool = os.getenv("PREPROC_BINARIZE", True)
+    PREPROC_SAUVOLA_WINDOW: int = os.getenv("PREPROC_SAUVOLA_WINDOW", 31)
+    PREPROC_SAUVOLA_K: float = os.getenv("PREPROC_SAUVOLA_K", 0.2)
+    FIELD_COPY_THRESHOLD: int = os.getenv("FIELD_COPY_THRESHOLD", 5000)
+    QUALITY_GATE_ENABLED: bool = os.getenv("QUALITY_GATE_ENABLED", True)
+    QUALITY_THUMBNAIL_SIZE: int = os.getenv("QUALITY_THUMBNAIL_SIZE", 1024)
+    QUALITY_PDF_DPI: int = os.getenv("QUALITY_PDF_DPI", 96)
+    QUALITY_MIN_DPI: int = os.getenv("QUALITY_MIN_DPI", 150)
+    QUALITY_MIN_SHARPNESS: float = os.getenv("QUALITY_MIN_SHARPNESS", 100.0)
+    QUALITY_MIN_CONTRAST: float = os.getenv("QUALITY_MIN_CONTRAST", 40.0)
+    QUALITY_MIN_BRIGHTNESS: float = os.getenv("QUALITY_MIN_BRIGHTNESS", 60.0)
+    QUALITY_MAX_BRIGHT_CLIPPED: float = os.getenv("QUALITY_MAX_BRIGHT_CLIPPED", 0.5)
+    QUALITY_MIN_INK_RATIO: float = os.getenv("QUALITY_MIN_INK_RATIO", 0.002)
+    QUALITY_MAX_SKEW_DEGREES: float = os.getenv("QUALITY_MAX_SKEW_DEGREES", 10.0)
+    YANDEX_OCR_URL: str = os.getenv("YANDEX_OCR_URL", "https://ocr.api.cloud.yandex.net/ocr/v1/recognizeText")
+    YANDEX_OCR_API_KEY: str | None = os.getenv("YANDEX_OCR_API_KEY")
+    YANDEX_FOLDER_ID: str | None = os.getenv("YANDEX_FOLDER_ID")
+    YANDEX_OCR_LANGUAGES: str = os.getenv("YANDEX_OCR_LANGUAGES", "*")
+    YANDEX_OCR_MODEL: str = os.getenv("YANDEX_OCR_MODEL", "page")
+    OCR_TIMEOUT_SECONDS: int = os.getenv("OCR_TIMEOUT_SECONDS", 60)
+    SCHEMA_AI_URL: str | None = os.getenv("SCHEMA_AI_URL")
+    SCHEMA_AI_API_KEY: str | None = os.getenv("SCHEMA_AI_API_KEY")
+    SCHEMA_AI_MODEL: str = os.getenv("SCHEMA_AI_MODEL", "gpt-4o-mini")
+    SCHEMA_AI_TIMEOUT_SECONDS: int = os.getenv("SCHEMA_AI_TIMEOUT_SECONDS", 120)
+    SCHEMA_AI_BACKEND: str = os.getenv("SCHEMA_AI_BACKEND", "http")
+    SCHEMA_AI_STUB_LATENCY_MS: int = os.getenv("SCHEMA_AI_STUB_LATENCY_MS", 0)
+    SCHEMA_AI_BATCHING: bool = os.getenv("SCHEMA_AI_BATCHING", False)
+    SCHEMA_AI_BATCH_SIZE: int = os.getenv("SCHEMA_AI_BATCH_SIZE", 8)
+    SCHEMA_AI_BATCH_WINDOW_MS: int = os.getenv("SCHEMA_AI_BATCH_WINDOW_MS", 50)
+    SCHEMA_AI_MAX_IN_FLIGHT: int = os.getenv("SCHEMA_AI_MAX_IN_FLIGHT", 4)
+    SCHEMA_AI_CACHE_DIR: str = os.getenv("SCHEMA_AI_CACHE_DIR", "./data/schema_ai_cache")
+    SCHEMA_AI_CACHE_TTL_SECONDS: int = os.getenv("SCHEMA_AI_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+    SCHEMA_AI_CACHE_MAX_BYTES: int = os.getenv("SCHEMA_AI_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+    SCHEMA_TEMPLATES_ENABLED: bool = os.getenv("SCHEMA_TEMPLATES_ENABLED", True)
+    SCHEMA_TEMPLATE_MIN_CONFIDENCE: float = os.getenv("SCHEMA_TEMPLATE_MIN_CONFIDENCE", 0.75)
+    SCHEMA_TEMPLATE_LEARN_MIN_CONFIDENCE: float = os.getenv("SCHEMA_TEMPLATE_LEARN_MIN_CONFIDENCE", 0.7)
+    SCHEMA_TEMPLATE_MIN_ANCHORS: int = os.getenv("SCHEMA_TEMPLATE_MIN_ANCHORS", 5)
+    SCHEMA_TEMPLATE_GEOMETRY_TOLERANCE: float = os.getenv("SCHEMA_TEMPLATE_GEOMETRY_TOLERANCE", 0.05)
+    SCHEMA_TEMPLATE_CACHE_TTL_SECONDS: int = os.getenv("SCHEMA_TEMPLATE_CACHE_TTL_SECONDS", 60)
 
     # JWT
     JWT_SECRET: str = os.getenv('JWT_SECRET')
     JWT_ALGORITHM: str = os.getenv('JWT_ALGORITHM')
     ACCESS_TOKEN_EXPIRE_MINUTES: int = os.getenv('JWT_TOKEN_EXPIRE_MINUTES')
+    PASSWORD_HASH_WORKERS: int = os.getenv("PASSWORD_HASH_WORKERS", 2)
+    PASSWORD_HASH_MAX_PENDING: int = os.getenv("PASSWORD_HASH_MAX_PENDING", 32)
+    TOKEN_CACHE_MAX_ENTRIES: int = os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000)
+    TOKEN_CACHE_TTL_SECONDS: int = os.getenv("TOKEN_CACHE_TTL_SECONDS", 300)
+
+    # Authenticated user cache. The in-process tier is only invalidated locally,
+    # so keep its TTL short when several gateway processes share the Redis tier.
+    USER_CACHE_MAX_ENTRIES: int = os.getenv("USER_CACHE_MAX_ENTRIES", 10000)
+    USER_CACHE_TTL_SECONDS: int = os.getenv("USER_CACHE_TTL_SECONDS", 15)
+    USER_CACHE_REDIS_ENABLED: bool = os.getenv("USER_CACHE_REDIS_ENABLED", False)
+    USER_CACHE_REDIS_TTL_SECONDS: int = os.getenv("USER_CACHE_REDIS_TTL_SECONDS", 300)
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    """Settings are read from the environment once per process; call ``get_settings.cache_clear()`` after changing it."""
     return Settings()
@@ -1,18 +1,58 @@
-from typing import AsyncGenerator
+import asyncio
+import json
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncGenerator
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from core import metrics
 from core.config import get_settings
 
 settings = get_settings()
 
+
+class _CheckoutTimer:
+    """Pool mixin recording checkout waits and counting waiters for ``core.metrics``."""
+
+    metrics_name = "default"
+    waiting = 0
+
+    def _do_get(self):
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+            metrics.observe_since(metrics.DB_CHECKOUT_SECONDS, started, self.metrics_name)
+
+
+class TimedAsyncQueuePool(_CheckoutTimer, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+class TimedQueuePool(_CheckoutTimer, QueuePool):
+    metrics_name = "sync"
+
+
 engine = create_async_engine(
     settings.DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
     pool_pre_ping=True,
     pool_recycle=300,
-    pool_size=5,
-    max_overflow=0,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
 )
 
+metrics.pool_collector.add(TimedAsyncQueuePool.metrics_name, engine)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     expire_on_commit=False,
@@ -21,10 +61,173 @@ AsyncSessionLocal = async_sessionmaker(
 )
 Base = declarative_base()
 
+@lru_cache(maxsize=1)
+def get_sync_sessionmaker() -> sessionmaker[Session]:
+    """Blocking sessions for RQ workers, which run tasks outside any event loop."""
+    sync_engine = create_engine(
+        settings.DATABASE_URL,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        pool_size=2,
+        max_overflow=0,
+    )
+    metrics.pool_collector.add(TimedQueuePool.metrics_name, sync_engine)
+    return sessionmaker(sync_engine, expire_on_commit=False, autoflush=False)
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "alembic" / "versions"
+_REVISION = re.compile(r'^(revision|down_revision)\s*=\s*(.+)$', re.MULTILINE)
+
+
+class SchemaMismatchError(RuntimeError):
+    """The database is not at the alembic head revision of this build."""
+
+
+def migration_heads(directory: Path = MIGRATIONS_DIR) -> set[str]:
+    """Head revisions of the migration scripts, read from their headers without importing alembic."""
+    revisions: set[str] = set()
+    parents: set[str] = set()
+    for script in directory.glob("*.py"):
+        found = dict(_REVISION.findall(script.read_text()))
+        if "revision" not in found:
+            continue
+        revisions.add(found["revision"].strip("\"' "))
+        parents.update(re.findall(r'["\']([^"\']+)["\']', found.get("down_revision", "")))
+    return revisions - parents
+
+
 async def init_models() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+
+async def check_schema() -> str:
+    """Fail fast unless ``alembic_version`` matches the migration heads; returns the current revision."""
+    expected = migration_heads()
+    async with engine.connect() as conn:
+        try:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+        except DBAPIError as exc:
+            raise SchemaMismatchError("Database has no alembic_version table; run `alembic upgrade head`") from exc
+    if current != expected:
+        raise SchemaMismatchError(
+            f"Database schema is at {sorted(current)}, this build expects {sorted(expected)}; run `alembic upgrade head`"
+        )
+    return ",".join(sorted(current))
+
+
+async def prepare_schema() -> None:
+    """Apply ``DB_SCHEMA_MODE`` at startup."""
+    mode = settings.DB_SCHEMA_MODE
+    if mode == "create":
+        await init_models()
+    elif mode == "check":
+        await check_schema()
+    elif mode != "off":
+        raise ValueError(f"Unknown DB_SCHEMA_MODE: {mode!r}")
+
+
+async def prewarm_pool() -> int:
+    """Open ``DB_POOL_SIZE`` connections concurrently and return them to the pool; returns how many."""
+    if not settings.DB_POOL_PREWARM:
+        return 0
+
+    async def connect():
+        conn = await engine.connect()
+        await conn.exec_driver_sql("SELECT 1")
+        return conn
+
+    connections = await asyncio.gather(*(connect() for _ in range(settings.DB_POOL_SIZE)))
+    for conn in connections:
+        await conn.close()
+    return len(connections)
+
+class RequestSession:
+    """The one ``AsyncSession`` of a request, created on first use.
+
+    A session only checks out a connection when it first executes, and gives
+    it back when its transaction ends, so requests that never touch the
+    database never take a pool slot.
+    """
+
+    SCOPE_KEY = "db_session"
+
+    def __init__(self) -> None:
+        self._session: AsyncSession | None = None
+
+    def get(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def get_request_session(scope: dict[str, Any]) -> AsyncSession | None:
+    """The request's shared session, or None outside ``RequestSessionMiddleware``."""
+    holder = scope.get(RequestSession.SCOPE_KEY)
+    return holder.get() if holder is not None else None
+
+
+class RequestSessionMiddleware:
+    """Give every HTTP request one lazily opened session, shared by authentication and ``get_db``.
+
+    Pool checkouts that time out (``DB_POOL_TIMEOUT``) are answered with 503
+    and ``Retry-After`` instead of queueing indefinitely.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        holder = scope[RequestSession.SCOPE_KEY] = RequestSession()
+        response_started = False
+
+        async def send_tracking(message: dict[str, Any]) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking)
+        except PoolTimeoutError:
+            metrics.DB_POOL_TIMEOUTS.inc()
+            if response_started:
+                raise
+            await _send_unavailable(send)
+        finally:
+            await holder.close()
+
+
+async def _send_unavailable(send: Any) -> None:
+    body = json.dumps({"detail": "The database is busy. Please retry shortly."}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session = get_request_session(request.scope)
+    if session is not None:
+        yield session
+        return
     async with AsyncSessionLocal() as session:
         yield session
\ No newline at end of file
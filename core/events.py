@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Iterable
+
+from core.config import get_settings
+from core.queue import get_async_redis_connection, get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+JOB_EVENTS_CHANNEL = "jobs:events"
+_RECONNECT_DELAY = 1.0
+_MAX_RECONNECT_DELAY = 30.0
+
+
+def job_event(job_id: str, upload_id: str, stage: str | None, status: str, **extra: Any) -> dict[str, Any]:
+    return {"job_id": job_id, "upload_id": upload_id, "stage": stage, "status": status, "ts": time.time(), **extra}
+
+
+def publish_job_event_sync(job_id: str, upload_id: str, stage: str | None, status: str, **extra: Any) -> None:
+    """Publish a stage transition from a worker. Failures are logged, never raised."""
+    event = job_event(job_id, upload_id, stage, status, **extra)
+    try:
+        get_redis_connection().publish(JOB_EVENTS_CHANNEL, json.dumps(event))
+    except Exception:
+        logger.warning("Failed to publish job event", extra={"job_id": job_id, "stage": stage}, exc_info=True)
+
+
+class Subscription:
+    """Events for a set of upload ids, buffered for one client stream.
+
+    When the client falls behind, the oldest buffered events are dropped so a
+    slow reader cannot grow memory without bound.
+    """
+
+    def __init__(self, broker: EventBroker, maxsize: int) -> None:
+        self._broker = broker
+        self.upload_ids: set[str] = set()
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def add(self, upload_ids: Iterable[str]) -> None:
+        self._broker._add(self, upload_ids)
+
+    def remove(self, upload_ids: Iterable[str]) -> None:
+        self._broker._remove(self, upload_ids)
+
+    def close(self) -> None:
+        self._broker._remove(self, list(self.upload_ids))
+
+    def put(self, event: dict[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict[str, Any]:
+        return await self.queue.get()
+
+
+class EventBroker:
+    """Fans job events out to in-process subscribers from one shared Redis subscription.
+
+    The Redis listener starts with the first subscriber and runs until
+    :meth:`close`, so a gateway process holds at most one pub/sub connection no
+    matter how many SSE or WebSocket clients it serves.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self._queue_size = queue_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._listener: asyncio.Task | None = None
+
+    def subscribe(self, upload_ids: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription(self, self._queue_size)
+        subscription.add(upload_ids)
+        return subscription
+
+    def _add(self, subscription: Subscription, upload_ids: Iterable[str]) -> None:
+        for upload_id in upload_ids:
+            self._subscribers.setdefault(upload_id, set()).add(subscription)
+            subscription.upload_ids.add(upload_id)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    def _remove(self, subscription: Subscription, upload_ids: Iterable[str]) -> None:
+        for upload_id in upload_ids:
+            subscription.upload_ids.discard(upload_id)
+            subscribers = self._subscribers.get(upload_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[upload_id]
+
+    def _dispatch(self, raw: bytes | str) -> None:
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            return
+        for subscription in list(self._subscribers.get(event.get("upload_id"), ())):
+            subscription.put(event)
+
+    async def _listen(self) -> None:
+        delay = _RECONNECT_DELAY
+        while True:
+            pubsub = get_async_redis_connection().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(JOB_EVENTS_CHANNEL)
+                delay = _RECONNECT_DELAY
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Job event subscription lost; reconnecting", exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._subscribers.clear()
+
+
+event_broker = EventBroker(queue_size=get_settings().EVENTS_QUEUE_SIZE)
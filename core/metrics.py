@@ -0,0 +1,278 @@
+"""Prometheus metrics shared by the gateway and the workers.
+
+Latencies are histograms recorded where the work happens. Pool and queue
+gauges are read from SQLAlchemy and Redis when ``/metrics`` is scraped.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set (several gateway processes, or the
+forking RQ workers), samples are written to files in that directory and summed
+at scrape time.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+    values,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+# Set by each supervised worker process; its RQ work horses report under that id (see ``_process_identifier``).
+WORKER_ID_ENV = "METRICS_WORKER_ID"
+
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _process_identifier() -> int:
+    # RQ forks a short-lived work horse per job. Keyed by pid, every job would leave
+    # its own sample file behind; the horses of one worker run one at a time, so
+    # they can safely share the file of the worker process that forked them.
+    return int(os.environ.get(WORKER_ID_ENV) or os.getpid())
+
+
+if os.environ.get(MULTIPROC_DIR_ENV):
+    values.ValueClass = values.MultiProcessValue(_process_identifier)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Gateway request latency by route template.",
+    ["method", "route", "status"],
+)
+STORAGE_SECONDS = Histogram(
+    "storage_operation_duration_seconds",
+    "Time spent in object storage calls.",
+    ["operation", "backend"],
+)
+STORAGE_WAIT_SECONDS = Histogram(
+    "storage_executor_wait_seconds",
+    "Time async storage calls waited for a storage executor thread.",
+)
+QUEUE_ENQUEUE_SECONDS = Histogram(
+    "queue_enqueue_duration_seconds",
+    "Time spent enqueueing RQ jobs.",
+    ["operation"],
+)
+DB_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool, including connecting.",
+    ["pool"],
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts",
+    "Gateway requests answered with 503 because no pooled connection became free in time.",
+)
+ADMISSION_REJECTIONS = Counter(
+    "upload_admission_rejections",
+    "Uploads refused with 429 by admission control, by the limit that was hit.",
+    ["reason"],
+)
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Worker time per pipeline stage, by resulting job status.",
+    ["stage", "status"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_FAILURES = Counter(
+    "pipeline_stage_failures",
+    "Pipeline stage runs that raised.",
+    ["stage"],
+)
+
+
+def observe_since(histogram: Histogram, started: float, *labels: str) -> None:
+    """Record ``time.perf_counter() - started`` on ``histogram``."""
+    (histogram.labels(*labels) if labels else histogram).observe(time.perf_counter() - started)
+
+
+class PoolCollector(Collector):
+    """Connection counts of SQLAlchemy engines, read at scrape time.
+
+    Engines are looked up on every scrape because ``dispose()`` replaces the pool.
+    """
+
+    def __init__(self) -> None:
+        self._engines: dict[str, Any] = {}
+
+    def add(self, name: str, engine: Any) -> None:
+        self._engines[name] = engine
+
+    @staticmethod
+    def _families() -> tuple[GaugeMetricFamily, GaugeMetricFamily, GaugeMetricFamily]:
+        return (
+            GaugeMetricFamily("db_pool_size", "Configured pool size.", labels=["pool"]),
+            GaugeMetricFamily("db_pool_connections", "Pool connections by state.", labels=["pool", "state"]),
+            GaugeMetricFamily("db_pool_waiting", "Checkouts currently waiting for a connection.", labels=["pool"]),
+        )
+
+    def describe(self) -> Iterable[GaugeMetricFamily]:
+        return self._families()
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        size, connections, waiting = self._families()
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            size.add_metric([name], pool.size())
+            connections.add_metric([name, "in_use"], pool.checkedout())
+            connections.add_metric([name, "idle"], pool.checkedin())
+            connections.add_metric([name, "overflow"], max(pool.overflow(), 0))
+            waiting.add_metric([name], getattr(pool, "waiting", 0))
+        yield from (size, connections, waiting)
+
+
+class QueueCollector(Collector):
+    """Job counts of every pipeline queue, read from Redis in two round trips per scrape.
+
+    The per-tenant sub-queues of a lane are summed under ``{stage queue}:{lane}``
+    to keep the label set bounded.
+    """
+
+    @staticmethod
+    def _family() -> GaugeMetricFamily:
+        return GaugeMetricFamily("rq_queue_jobs", "RQ jobs per queue and state.", labels=["queue", "state"])
+
+    def describe(self) -> Iterable[GaugeMetricFamily]:
+        # Lets the registry learn the metric names without a Redis round trip at registration.
+        return [self._family()]
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        from core.config import get_settings
+        from core.queue import PIPELINE_STAGES, active_tenants, get_queue, get_redis_connection, stage_queue_name
+
+        jobs = self._family()
+        names = {name: name for name in (get_settings().RQ_QUEUE_NAME, *map(stage_queue_name, PIPELINE_STAGES))}
+        keys = []
+        try:
+            connection = get_redis_connection()
+            for lane, tenants in active_tenants(connection).items():
+                for stage in PIPELINE_STAGES:
+                    label = f"{stage_queue_name(stage)}:{lane}"
+                    names.update((stage_queue_name(stage, lane, tenant), label) for tenant in tenants)
+            with connection.pipeline(transaction=False) as pipe:
+                for name, label in names.items():
+                    queue = get_queue(name)
+                    pipe.llen(queue.key)
+                    keys.append((label, "queued"))
+                    for state, registry in (
+                        ("started", queue.started_job_registry),
+                        ("deferred", queue.deferred_job_registry),
+                        ("scheduled", queue.scheduled_job_registry),
+                        ("failed", queue.failed_job_registry),
+                    ):
+                        pipe.zcard(registry.key)
+                        keys.append((label, state))
+                counts = pipe.execute()
+        except Exception:
+            logger.warning("Failed to read queue depths", exc_info=True)
+            return
+        totals: dict[tuple[str, str], int] = {}
+        for key, count in zip(keys, counts):
+            totals[key] = totals.get(key, 0) + count
+        for (label, state), count in totals.items():
+            jobs.add_metric([label, state], count)
+        yield jobs
+
+
+pool_collector = PoolCollector()
+queue_collector = QueueCollector()
+_GATEWAY_COLLECTORS = (pool_collector, queue_collector)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get(MULTIPROC_DIR_ENV))
+
+
+def _registry(collectors: Iterable[Collector] = ()) -> CollectorRegistry:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in collectors:
+        registry.register(collector)
+    return registry
+
+
+def register_gateway_collectors() -> None:
+    """Add the pool and queue gauges to the default registry (single-process mode)."""
+    if multiprocess_enabled():
+        return
+    for collector in _GATEWAY_COLLECTORS:
+        try:
+            REGISTRY.register(collector)
+        except ValueError:
+            pass  # already registered
+
+
+def render() -> tuple[bytes, str]:
+    """The gateway's ``/metrics`` body and content type."""
+    registry = _registry(_GATEWAY_COLLECTORS) if multiprocess_enabled() else REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def reset_multiprocess_dir() -> None:
+    """Remove samples left by a previous run; call once before starting worker processes."""
+    directory = os.environ.get(MULTIPROC_DIR_ENV)
+    if not directory:
+        return
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for sample_file in path.glob("*.db"):
+        sample_file.unlink(missing_ok=True)
+
+
+def start_worker_exporter(port: int) -> None:
+    """Serve the samples of all worker processes on ``port``."""
+    if not multiprocess_enabled():
+        logger.warning(
+            "PROMETHEUS_MULTIPROC_DIR is not set; stage metrics of forked workers cannot be exported"
+        )
+        start_http_server(port)
+        return
+    start_http_server(port, registry=_registry())
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording ``http_request_duration_seconds``.
+
+    Requests are labelled by route template (``/jobs/{job_id}/events``), not by
+    raw path, so label cardinality stays bounded; unmatched paths share one label.
+    Streaming responses are timed until the stream ends.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            observe_since(HTTP_REQUEST_SECONDS, started, scope["method"], route, str(status))
@@ -1,16 +1,42 @@
 from __future__ import annotations
 
+import time
 from functools import lru_cache
 from typing import Any, Callable
+from uuid import uuid4
 
 from fastapi.concurrency import run_in_threadpool
 from redis import Redis
-from rq import Queue
+from redis.asyncio import Redis as AsyncRedis
+from rq import Queue, get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
 
+from core import metrics, storage
 from core.config import get_settings
 
 DEFAULT_JOB_NAME = "app_worker.tasks.process_upload"
 
+STAGE_QUALITY = "quality"
+STAGE_PREPROC = "preproc"
+STAGE_OCR = "ocr"
+STAGE_SCHEMA = "schema"
+PIPELINE_STAGES = (STAGE_QUALITY, STAGE_PREPROC, STAGE_OCR, STAGE_SCHEMA)
+STAGE_TASKS = {stage: f"app_worker.tasks.run_{stage}_stage" for stage in PIPELINE_STAGES}
+# Stages chained at upload time. The OCR stage fans out per-page jobs and
+# chains the merge and schema jobs itself once the page count is known.
+CHAIN_STAGES = (STAGE_QUALITY, STAGE_PREPROC, STAGE_OCR)
+OCR_PAGE_TASK = "app_worker.tasks.run_ocr_page"
+OCR_MERGE_TASK = "app_worker.tasks.run_ocr_merge_stage"
+
+# Priority lanes. Each lane has one sub-queue per stage and tenant; workers
+# share dequeues between lanes by weight and between a lane's tenants in turn.
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+LANE_REPROCESS = "reprocess"
+LANES = (LANE_INTERACTIVE, LANE_BULK, LANE_REPROCESS)
+ANONYMOUS_TENANT = "anonymous"
+
 
 @lru_cache(maxsize=1)
 def get_redis_connection() -> Redis:
@@ -19,12 +45,128 @@ def get_redis_connection() -> Redis:
 
 
 @lru_cache(maxsize=1)
+def get_async_redis_connection() -> AsyncRedis:
+    settings = get_settings()
+    return AsyncRedis.from_url(settings.REDIS_URL)
+
+
+@lru_cache(maxsize=None)
 def get_queue(name: str | None = None) -> Queue:
     settings = get_settings()
     queue_name = name or settings.RQ_QUEUE_NAME
     return Queue(queue_name, connection=get_redis_connection())
 
 
+def job_ttls() -> dict[str, int]:
+    """``result_ttl``/``failure_ttl`` for every enqueued job, so finished jobs do not pile up in Redis."""
+    settings = get_settings()
+    return {"result_ttl": settings.RQ_RESULT_TTL, "failure_ttl": settings.RQ_FAILURE_TTL}
+
+
+def tenant_key(tenant: str | None) -> str:
+    return str(tenant or ANONYMOUS_TENANT).replace(":", "_")
+
+
+def stage_queue_name(stage: str, lane: str | None = None, tenant: str | None = None) -> str:
+    """``{RQ_QUEUE_NAME}:{stage}``, or ``{RQ_QUEUE_NAME}:{stage}:{lane}:{tenant}`` for a tenant's sub-queue of a lane."""
+    settings = get_settings()
+    name = f"{settings.RQ_QUEUE_NAME}:{stage}"
+    if lane is None:
+        return name
+    if lane not in LANES:
+        raise ValueError(f"Unknown queue lane: {lane}")
+    return f"{name}:{lane}:{tenant_key(tenant)}"
+
+
+def parse_lane_queue_name(name: str) -> tuple[str, str, str] | None:
+    """``(stage, lane, tenant)`` of a sub-queue name, or None for any other queue."""
+    prefix = f"{get_settings().RQ_QUEUE_NAME}:"
+    if not name.startswith(prefix):
+        return None
+    parts = name[len(prefix) :].split(":", 2)
+    if len(parts) != 3 or parts[0] not in PIPELINE_STAGES or parts[1] not in LANES:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def queue_stage(name: str) -> str | None:
+    """Pipeline stage served by a stage queue or one of its sub-queues; None for any other queue."""
+    parsed = parse_lane_queue_name(name)
+    if parsed is not None:
+        return parsed[0]
+    stage = name.removeprefix(f"{get_settings().RQ_QUEUE_NAME}:")
+    return stage if stage != name and stage in PIPELINE_STAGES else None
+
+
+def get_stage_queue(stage: str, lane: str | None = None, tenant: str | None = None) -> Queue:
+    return get_queue(stage_queue_name(stage, lane, tenant))
+
+
+def current_lane() -> tuple[str | None, str | None]:
+    """Lane and tenant of the RQ job being executed, so the jobs it enqueues stay in its sub-queues."""
+    job = get_current_job()
+    parsed = parse_lane_queue_name(job.origin) if job is not None else None
+    return (parsed[1], parsed[2]) if parsed else (None, None)
+
+
+def lane_tenants_key(lane: str) -> str:
+    return f"{get_settings().RQ_QUEUE_NAME}:lanes:{lane}:tenants"
+
+
+def _touch_tenant(pipe: Any, lane: str, tenant: str | None) -> None:
+    pipe.zadd(lane_tenants_key(lane), {tenant_key(tenant): time.time()})
+
+
+def active_tenants(connection: Redis | None = None) -> dict[str, list[str]]:
+    """Tenants per lane that enqueued work within ``QUEUE_TENANT_IDLE_SECONDS``, longest idle first.
+
+    Tenants idle for longer are forgotten. Every stage that enqueues follow-up
+    jobs refreshes its tenant, so a long-running backlog stays listed.
+    """
+    connection = connection or get_redis_connection()
+    cutoff = time.time() - get_settings().QUEUE_TENANT_IDLE_SECONDS
+    with connection.pipeline(transaction=False) as pipe:
+        for lane in LANES:
+            pipe.zremrangebyscore(lane_tenants_key(lane), "-inf", cutoff)
+            pipe.zrange(lane_tenants_key(lane), 0, -1)
+        results = pipe.execute()
+    return {
+        lane: [member.decode() if isinstance(member, bytes) else member for member in results[index * 2 + 1]]
+        for index, lane in enumerate(LANES)
+    }
+
+
+def tenant_running_key(tenant: str) -> str:
+    return f"{get_settings().RQ_QUEUE_NAME}:tenants:{tenant}:running"
+
+
+def claim_tenant_slot(connection: Redis, tenant: str, holder: str, limit: int, ttl: int) -> bool:
+    """Take one of ``limit`` concurrent job slots of ``tenant`` for ``holder``; False if all are taken.
+
+    Slots are members of a sorted set scored by their expiry, so a slot held by
+    a worker that died is freed after ``ttl`` seconds.
+    """
+    if limit <= 0:
+        return True
+    key = tenant_running_key(tenant)
+
+    def claim(pipe: Any) -> bool:
+        now = time.time()
+        if pipe.zcount(key, now, "+inf") >= limit:
+            return False
+        pipe.multi()
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zadd(key, {holder: now + ttl})
+        pipe.expire(key, ttl)
+        return True
+
+    return connection.transaction(claim, key, value_from_callable=True)
+
+
+def release_tenant_slot(connection: Redis, tenant: str, holder: str) -> None:
+    connection.zrem(tenant_running_key(tenant), holder)
+
+
 async def enqueue_job(
     func: str | Callable[..., Any] = DEFAULT_JOB_NAME,
     *,
@@ -32,10 +174,208 @@ async def enqueue_job(
     queue_name: str | None = None,
 ) -> str:
     queue = get_queue(queue_name)
-    rq_job = await run_in_threadpool(queue.enqueue, func, kwargs=kwargs or {})
+    started = time.perf_counter()
+    rq_job = await run_in_threadpool(queue.enqueue, func, kwargs=kwargs or {}, **job_ttls())
+    metrics.observe_since(metrics.QUEUE_ENQUEUE_SECONDS, started, "enqueue_job")
     return rq_job.get_id()
 
 
-async def enqueue_pipeline_job(job_id: str, upload_id: str, *, queue_name: str | None = None) -> str:
-    payload = {"job_id": job_id, "upload_id": upload_id}
-    return await enqueue_job(kwargs=payload, queue_name=queue_name)
+def _enqueue_many_sync(queue: Queue, func: str | Callable[..., Any], kwargs_list: list[dict[str, Any]]) -> list[str]:
+    job_datas = [Queue.prepare_data(func, kwargs=kwargs, **job_ttls()) for kwargs in kwargs_list]
+    with queue.connection.pipeline() as pipe:
+        rq_jobs = queue.enqueue_many(job_datas, pipeline=pipe)
+        pipe.execute()
+    return [rq_job.get_id() for rq_job in rq_jobs]
+
+
+async def enqueue_many(
+    func: str | Callable[..., Any] = DEFAULT_JOB_NAME,
+    *,
+    kwargs_list: list[dict[str, Any]],
+    queue_name: str | None = None,
+) -> list[str]:
+    if not kwargs_list:
+        return []
+    queue = get_queue(queue_name)
+    started = time.perf_counter()
+    job_ids = await run_in_threadpool(_enqueue_many_sync, queue, func, kwargs_list)
+    metrics.observe_since(metrics.QUEUE_ENQUEUE_SECONDS, started, "enqueue_many")
+    return job_ids
+
+
+def _stage_kwargs(stage: str, job_id: str, upload_id: str, source_object: str) -> dict[str, Any]:
+    """Stages exchange MinIO object keys only; outputs live under ``proc/{upload_id}/``."""
+    kwargs: dict[str, Any] = {"job_id": job_id, "upload_id": upload_id}
+    if stage in (STAGE_QUALITY, STAGE_PREPROC):
+        kwargs["source_object"] = source_object
+    elif stage == STAGE_SCHEMA:
+        kwargs["ocr_object"] = storage.proc_object_name(upload_id, storage.OCR_OBJECT)
+    return kwargs
+
+
+def _save_deferred(
+    queue: Queue,
+    pipe: Any,
+    func: str,
+    kwargs: dict[str, Any],
+    job_id: str,
+    depends_on: str | list[str],
+    description: str,
+) -> None:
+    # Dependencies are created in the same MULTI/EXEC block and cannot finish
+    # before it executes, so the job can be registered as deferred directly.
+    job = queue.create_job(
+        func,
+        kwargs=kwargs,
+        job_id=job_id,
+        depends_on=depends_on,
+        status=JobStatus.DEFERRED,
+        description=description,
+        **job_ttls(),
+    )
+    job.register_dependency(pipeline=pipe)
+    job.save(pipeline=pipe)
+
+
+def enqueue_pipeline_chains_sync(
+    items: list[tuple[str, str, str]], lane: str = LANE_INTERACTIVE, tenant: str | None = None
+) -> list[str]:
+    """Enqueue one staged pipeline per ``(job_id, upload_id, source_object)`` in a single Redis pipeline.
+
+    The first stage is queued immediately; every later stage is saved as a
+    deferred job that depends on the previous one, on the tenant's sub-queue
+    of ``lane`` for that stage. Returns the id of each chain's first job.
+    """
+    if not items:
+        return []
+
+    started = time.perf_counter()
+    first_queue = get_stage_queue(CHAIN_STAGES[0], lane, tenant)
+    connection = first_queue.connection
+    chains = [[str(uuid4()) for _ in CHAIN_STAGES] for _ in items]
+
+    with connection.pipeline() as pipe:
+        first_queue.enqueue_many(
+            [
+                Queue.prepare_data(
+                    STAGE_TASKS[CHAIN_STAGES[0]],
+                    kwargs=_stage_kwargs(CHAIN_STAGES[0], *item),
+                    job_id=chain[0],
+                    description=f"{CHAIN_STAGES[0]}:{item[1]}",
+                    **job_ttls(),
+                )
+                for item, chain in zip(items, chains)
+            ],
+            pipeline=pipe,
+        )
+        for position, stage in enumerate(CHAIN_STAGES[1:], start=1):
+            queue = get_stage_queue(stage, lane, tenant)
+            for item, chain in zip(items, chains):
+                _save_deferred(
+                    queue,
+                    pipe,
+                    STAGE_TASKS[stage],
+                    _stage_kwargs(stage, *item),
+                    job_id=chain[position],
+                    depends_on=chain[position - 1],
+                    description=f"{stage}:{item[1]}",
+                )
+        _touch_tenant(pipe, lane, tenant)
+        pipe.execute()
+    metrics.observe_since(metrics.QUEUE_ENQUEUE_SECONDS, started, "pipeline_chains")
+    return [chain[0] for chain in chains]
+
+
+def enqueue_page_fanout_sync(
+    job_id: str,
+    upload_id: str,
+    pages: list[str],
+    preprocess: bool,
+    lane: str | None = None,
+    tenant: str | None = None,
+) -> list[str]:
+    """Queue one OCR job per page object, then a merge job and the schema stage after all of them.
+
+    ``pages`` are MinIO keys in page order. Without a ``lane`` the jobs go to
+    the plain stage queues. Returns the page job ids.
+    """
+    started = time.perf_counter()
+    ocr_queue = get_stage_queue(STAGE_OCR, lane, tenant)
+    page_job_ids = [str(uuid4()) for _ in pages]
+    merge_job_id = str(uuid4())
+    base_kwargs = {"job_id": job_id, "upload_id": upload_id}
+
+    with ocr_queue.connection.pipeline() as pipe:
+        ocr_queue.enqueue_many(
+            [
+                Queue.prepare_data(
+                    OCR_PAGE_TASK,
+                    kwargs={**base_kwargs, "page": number, "page_object": page_object, "preprocess": preprocess},
+                    job_id=page_job_id,
+                    description=f"ocr_page:{upload_id}:{number}",
+                    **job_ttls(),
+                )
+                for number, (page_object, page_job_id) in enumerate(zip(pages, page_job_ids), start=1)
+            ],
+            pipeline=pipe,
+        )
+        _save_deferred(
+            ocr_queue,
+            pipe,
+            OCR_MERGE_TASK,
+            {**base_kwargs, "pages_total": len(pages)},
+            job_id=merge_job_id,
+            depends_on=page_job_ids,
+            description=f"ocr_merge:{upload_id}",
+        )
+        _save_deferred(
+            get_stage_queue(STAGE_SCHEMA, lane, tenant),
+            pipe,
+            STAGE_TASKS[STAGE_SCHEMA],
+            _stage_kwargs(STAGE_SCHEMA, job_id, upload_id, ""),
+            job_id=str(uuid4()),
+            depends_on=merge_job_id,
+            description=f"{STAGE_SCHEMA}:{upload_id}",
+        )
+        if lane is not None:
+            _touch_tenant(pipe, lane, tenant)
+        pipe.execute()
+    metrics.observe_since(metrics.QUEUE_ENQUEUE_SECONDS, started, "page_fanout")
+    return page_job_ids
+
+
+def cancel_dependents_sync(queue_job_id: str) -> list[str]:
+    """Cancel every deferred job downstream of ``queue_job_id`` so none of them is ever enqueued.
+
+    Call this from inside the job before it returns: RQ skips canceled
+    dependents when the parent finishes. Returns the canceled job ids.
+    """
+    connection = get_redis_connection()
+    pending = list(Job.fetch(queue_job_id, connection=connection).dependent_ids)
+    canceled = []
+    while pending:
+        try:
+            job = Job.fetch(pending.pop(), connection=connection)
+        except NoSuchJobError:
+            continue
+        pending.extend(job.dependent_ids)
+        if job.get_status() == JobStatus.DEFERRED:
+            job.cancel()
+            canceled.append(job.id)
+    return canceled
+
+
+async def enqueue_pipeline_job(
+    job_id: str, upload_id: str, source_object: str, lane: str = LANE_INTERACTIVE, tenant: str | None = None
+) -> str:
+    queue_job_ids = await run_in_threadpool(
+        enqueue_pipeline_chains_sync, [(job_id, upload_id, source_object)], lane, tenant
+    )
+    return queue_job_ids[0]
+
+
+async def enqueue_pipeline_jobs(
+    items: list[tuple[str, str, str]], lane: str = LANE_BULK, tenant: str | None = None
+) -> list[str]:
+    """Enqueue ``(job_id, upload_id, source_object)`` pipelines through a single Redis pipeline."""
+    return await run_in_threadpool(enqueue_pipeline_chains_sync, items, lane, tenant)
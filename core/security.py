@@ -1,5 +1,8 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime, timezone
-from passlib.context import CryptContext
+from functools import lru_cache, partial
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy import select
@@ -9,23 +12,81 @@ from starlette.authentication import (
     AuthenticationBackend,
     UnauthenticatedUser,
 )
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query, Request
+from starlette.requests import HTTPConnection
 
-from core.database import AsyncSessionLocal, get_db
+from core.cache import TTLCache
+from core.database import AsyncSessionLocal, PoolTimeoutError, get_db, get_request_session
+from users.cache import cache_user, get_cached_user
 from users.models import UserModel
 
 from core.config import get_settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=1)
+def get_password_context():
+    """argon2 hashes new passwords; bcrypt hashes still verify and are upgraded on login.
+
+    Built on first use so that passlib and its hash backends stay out of startup.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 settings = get_settings()
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+_token_payloads = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_ENTRIES, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+
+class HashingPool:
+    """Runs password hashing off the event loop on a small, bounded executor.
+
+    argon2 and bcrypt release the GIL, so threads give real parallelism. Work
+    beyond ``workers + max_pending`` is rejected with a 503 instead of queueing.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self._workers = workers
+        self._limit = workers + max_pending
+        self._pending = 0
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def run(self, func, *args):
+        if self._pending >= self._limit:
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication is temporarily overloaded. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="password-hash")
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(workers=settings.PASSWORD_HASH_WORKERS, max_pending=settings.PASSWORD_HASH_MAX_PENDING)
+
+def _hash_password(password):
+    return get_password_context().hash(password)
+
+def _verify_and_update(plain_password, hashed_password):
+    return get_password_context().verify_and_update(plain_password, hashed_password)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_password_hash(password):
+    return await hashing_pool.run(_hash_password, password)
+
+async def verify_and_update_password(plain_password, hashed_password) -> tuple[bool, str | None]:
+    """Verify a password, returning a replacement hash when the stored one uses a deprecated scheme."""
+    return await hashing_pool.run(_verify_and_update, plain_password, hashed_password)
 
 async def create_access_token(data, expiry: timedelta):
     payload = data.copy()
@@ -43,24 +104,79 @@ def get_token_payload(token):
         return None
     return payload
 
-async def _resolve_user(token: str, db: AsyncSession) -> UserModel | None:
+def _get_cached_token_payload(token: str) -> dict | None:
+    payload = _token_payloads.get(token)
+    if payload is not None:
+        expires_at = payload.get("exp")
+        if expires_at is None or expires_at > time.time():
+            return payload
+        _token_payloads.pop(token)
+        return None
+
     payload = get_token_payload(token)
     if not isinstance(payload, dict):
         return None
+    expires_at = payload.get("exp")
+    _token_payloads.set(token, payload, ttl=expires_at - time.time() if expires_at else None)
+    return payload
+
+async def _resolve_user(token: str, db: AsyncSession | None = None) -> UserModel | None:
+    payload = _get_cached_token_payload(token)
+    if payload is None:
+        return None
 
     user_id = payload.get("id")
     if not user_id:
         return None
 
-    result = await db.execute(select(UserModel).where(UserModel.id == user_id))
-    return result.scalar_one_or_none()
+    user = await get_cached_user(user_id)
+    if user is not None:
+        return user
+
+    query = select(UserModel).where(UserModel.id == user_id)
+    if db is None:
+        async with AsyncSessionLocal() as session:
+            user = (await session.execute(query)).scalar_one_or_none()
+    else:
+        user = (await db.execute(query)).scalar_one_or_none()
+
+    if user is not None:
+        await cache_user(user)
+    return user
 
 
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> UserModel:
-    user = await _resolve_user(token, db)
+    user = request.scope.get("user")
+    if not isinstance(user, UserModel):
+        user = await _resolve_user(token, db)
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired authentication token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def get_connection_user(conn: HTTPConnection, access_token: str | None = None) -> UserModel | None:
+    """User authenticated by the middleware, or by ``access_token`` for clients that cannot send headers."""
+    user = conn.scope.get("user")
+    if isinstance(user, UserModel):
+        return user
+    if access_token:
+        return await _resolve_user(access_token)
+    return None
+
+
+async def get_stream_user(
+    request: Request,
+    access_token: str | None = Query(None, description="Bearer token for EventSource clients"),
+) -> UserModel:
+    user = await get_connection_user(request, access_token)
     if not user:
         raise HTTPException(
             status_code=401,
@@ -83,11 +199,17 @@ class JWTAuth(AuthenticationBackend):
         if not token:
             return guest
 
+        session = get_request_session(conn.scope)
         try:
-            async with AsyncSessionLocal() as session:
-                user = await _resolve_user(token, session)
+            user = await _resolve_user(token, session)
+        except PoolTimeoutError:
+            raise
         except Exception:
             return guest
+        finally:
+            if session is not None:
+                # End the lookup's transaction so its connection is back in the pool while the route runs.
+                await session.close()
 
         if not user:
             return guest
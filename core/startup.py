@@ -0,0 +1,93 @@
+"""Startup warm-up and timing for the gateway and the workers.
+
+Connections are opened before a process reports ready, so the first request
+or job does not pay for DNS, TCP and authentication handshakes, and each step
+is timed so slow starts can be traced to their cause.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimings:
+    """Milliseconds per startup step, measured from ``started`` (a ``time.perf_counter()`` value)."""
+
+    def __init__(self, started: float | None = None) -> None:
+        self.started = time.perf_counter() if started is None else started
+        self.steps: dict[str, float] = {}
+
+    def mark(self, name: str, since: float | None = None) -> None:
+        """Record the time from ``since`` (default: process start) until now as ``name``."""
+        self.steps[name] = round((time.perf_counter() - (self.started if since is None else since)) * 1000, 1)
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, started)
+
+    async def timed(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """Await ``awaitable`` as step ``name``; lets independent steps run under ``asyncio.gather``."""
+        with self.step(name):
+            return await awaitable
+
+    def as_dict(self) -> dict[str, float]:
+        return {**self.steps, "total": round((time.perf_counter() - self.started) * 1000, 1)}
+
+
+async def ping_redis() -> None:
+    """Connect the async client (gateway reads, event broker) and the sync client (RQ enqueues)."""
+    from core.queue import get_async_redis_connection, get_redis_connection
+
+    await get_async_redis_connection().ping()
+    await asyncio.to_thread(get_redis_connection().ping)
+
+
+async def warm_gateway(timings: StartupTimings) -> None:
+    """Prepare the schema, then fill the database pool and connect to Redis and storage concurrently."""
+    from core import storage
+    from core.database import prepare_schema, prewarm_pool
+
+    await timings.timed("schema", prepare_schema())
+    await asyncio.gather(
+        timings.timed("db_pool", prewarm_pool()),
+        timings.timed("redis", ping_redis()),
+        timings.timed("storage", storage.ensure_bucket()),
+    )
+
+
+def warm_worker(timings: StartupTimings) -> None:
+    """Connect to Redis and the database once in a worker process, before its first job.
+
+    RQ runs every job in a forked work horse. redis-py replaces inherited
+    connections after a fork by itself; the database connection is closed again
+    so no socket is shared with a horse, but the engine keeps its initialized
+    dialect (server version, type info), which the horses inherit.
+    """
+    from sqlalchemy import text
+
+    from core.database import get_sync_sessionmaker
+    from core.queue import get_redis_connection
+
+    with timings.step("redis"):
+        get_redis_connection().ping()
+    with timings.step("db"):
+        with get_sync_sessionmaker()() as session:
+            session.execute(text("SELECT 1"))
+            bind = session.get_bind()
+        bind.dispose()
+
+
+def log_ready(process: str, timings: StartupTimings, log: logging.Logger = logger) -> None:
+    steps = timings.as_dict()
+    breakdown = ", ".join(f"{name} {ms:.0f} ms" for name, ms in timings.steps.items())
+    log.info("%s ready in %.0f ms (%s)", process, steps["total"], breakdown, extra={"timings_ms": steps})
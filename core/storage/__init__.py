@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, AsyncIterator, BinaryIO, Callable, TypeVar
+
+from core import metrics
+from core.config import get_settings
+from core.storage.base import ObjectTooLargeError, StorageBackend
+
+RAW_PREFIX = "raw"
+PROC_PREFIX = "proc"
+QUALITY_OBJECT = "quality.json"
+RECTIFIED_OBJECT = "rectified.png"
+OCR_OBJECT = "ocr.json"
+SCHEMA_OBJECT = "schema.json"
+PAGES_DIR = "pages"
+RECTIFIED_PAGE_SUFFIX = ".rectified.png"
+JSON_CONTENT_TYPE = "application/json"
+_GZIP_MAGIC = b"\x1f\x8b"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    object_name: str
+    size: int
+    sha256: str
+
+
+class _HashingReader:
+    """Read-only wrapper that hashes and counts bytes as they are pulled by the storage backend."""
+
+    def __init__(self, source: BinaryIO, chunk_size: int, max_size: int | None = None) -> None:
+        self._source = source
+        self._chunk_size = chunk_size
+        self._max_size = max_size
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self._chunk_size:
+            size = self._chunk_size
+        chunk = self._source.read(size)
+        if not chunk:
+            return b""
+        self.size += len(chunk)
+        if self._max_size is not None and self.size > self._max_size:
+            raise ObjectTooLargeError(f"Object exceeds the {self._max_size} byte limit")
+        self._digest.update(chunk)
+        return chunk
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> StorageBackend:
+    """The backend selected by ``STORAGE_BACKEND`` (``minio`` or ``local``), created once per process."""
+    backend = get_settings().STORAGE_BACKEND
+    if backend == "minio":
+        from core.storage.minio_backend import MinioBackend
+
+        return MinioBackend.from_settings()
+    if backend == "local":
+        from core.storage.local import LocalBackend
+
+        return LocalBackend.from_settings()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r}")
+
+
+@lru_cache(maxsize=1)
+def get_executor() -> ThreadPoolExecutor:
+    """Threads for blocking storage calls, kept apart from Starlette's shared threadpool."""
+    return ThreadPoolExecutor(max_workers=get_settings().STORAGE_MAX_WORKERS, thread_name_prefix="storage")
+
+
+def _timed(operation: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        metrics.observe_since(metrics.STORAGE_SECONDS, started, operation, get_backend().name)
+
+
+async def _run(operation: str | None, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking storage call on the storage executor.
+
+    The wait for a thread is always recorded; the call itself is timed as
+    ``operation`` unless it is None (``func`` already times itself).
+    """
+    submitted = time.perf_counter()
+
+    def call() -> T:
+        metrics.observe_since(metrics.STORAGE_WAIT_SECONDS, submitted)
+        if operation is None:
+            return func(*args, **kwargs)
+        return _timed(operation, func, *args, **kwargs)
+
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), call)
+
+
+def shutdown() -> None:
+    if get_executor.cache_info().currsize:
+        get_executor().shutdown(wait=True)
+        get_executor.cache_clear()
+
+
+def get_bucket_name() -> str:
+    settings = get_settings()
+    return settings.MINIO_BUCKET
+
+
+def proc_object_name(upload_id: str, name: str) -> str:
+    return f"{PROC_PREFIX}/{upload_id}/{name}"
+
+
+def page_object_name(upload_id: str, page: int, suffix: str) -> str:
+    return proc_object_name(upload_id, f"{PAGES_DIR}/{page:04d}{suffix}")
+
+
+def _expiry(expires: int | float | timedelta) -> timedelta:
+    return timedelta(seconds=expires) if isinstance(expires, (int, float)) else expires
+
+
+async def ensure_bucket(bucket: str | None = None) -> None:
+    """Create the bucket if needed; backends remember it, so only the first call per process does I/O."""
+    await _run("ensure_bucket", get_backend().ensure_bucket, bucket or get_bucket_name())
+
+
+async def put_object(
+    object_name: str,
+    data: bytes | BinaryIO,
+    content_type: str | None = None,
+    bucket: str | None = None,
+) -> None:
+    if isinstance(data, bytes):
+        stream: BinaryIO = io.BytesIO(data)
+        size = len(data)
+    else:
+        stream = data
+        data.seek(0, io.SEEK_END)
+        size = data.tell()
+        data.seek(0)
+    await _run("put", get_backend().put_stream, bucket or get_bucket_name(), object_name, stream, size, content_type)
+
+
+async def put_stream(
+    object_name: str,
+    stream: BinaryIO,
+    content_type: str | None = None,
+    bucket: str | None = None,
+    max_size: int | None = None,
+) -> StoredObject:
+    """Upload a file-like object of unknown length without buffering it whole.
+
+    Only one chunk is held in memory at a time; the SHA-256 and size are computed
+    while it is read. Raises ``ObjectTooLargeError`` once ``max_size`` is
+    exceeded, in which case no partial object is kept.
+    """
+    settings = get_settings()
+    reader = _HashingReader(stream, chunk_size=settings.UPLOAD_CHUNK_SIZE, max_size=max_size)
+    await _run("put", get_backend().put_stream, bucket or get_bucket_name(), object_name, reader, -1, content_type)
+    return StoredObject(object_name=object_name, size=reader.size, sha256=reader.sha256)
+
+
+async def remove_object(object_name: str, bucket: str | None = None) -> None:
+    await _run("remove", get_backend().remove, bucket or get_bucket_name(), object_name)
+
+
+async def stream_object(
+    object_name: str,
+    chunk_size: int | None = None,
+    bucket: str | None = None,
+) -> AsyncIterator[bytes]:
+    """Yield an object in chunks, reading each one on the storage executor."""
+    chunks = get_backend().iter_chunks(
+        bucket or get_bucket_name(), object_name, chunk_size or get_settings().UPLOAD_CHUNK_SIZE
+    )
+    try:
+        while (chunk := await _run("get_chunk", next, chunks, None)) is not None:
+            yield chunk
+    finally:
+        await _run("close", chunks.close)
+
+
+def _presign_many_sync(bucket: str, object_names: list[str], expiry: timedelta) -> list[str]:
+    backend = get_backend()
+    return [backend.presign_get(bucket, name, expiry) for name in object_names]
+
+
+async def generate_presigned_get(
+    object_name: str,
+    expires: int | timedelta = 3600,
+    bucket: str | None = None,
+) -> str:
+    return await _run("presign", get_backend().presign_get, bucket or get_bucket_name(), object_name, _expiry(expires))
+
+
+async def generate_presigned_get_many(
+    object_names: list[str],
+    expires: int | timedelta = 3600,
+    bucket: str | None = None,
+) -> list[str]:
+    return await _run("presign", _presign_many_sync, bucket or get_bucket_name(), object_names, _expiry(expires))
+
+
+def put_bytes_sync(
+    object_name: str,
+    data: bytes,
+    content_type: str | None = None,
+    bucket: str | None = None,
+    content_encoding: str | None = None,
+) -> None:
+    """Blocking upload for worker processes, which have no event loop."""
+    _timed(
+        "put",
+        get_backend().put_stream,
+        bucket or get_bucket_name(),
+        object_name,
+        io.BytesIO(data),
+        len(data),
+        content_type=content_type,
+        content_encoding=content_encoding,
+    )
+
+
+def remove_prefixes_sync(prefixes: list[str], bucket: str | None = None) -> int:
+    """Delete every object under ``prefixes`` (such as ``raw/{upload_id}/``); returns how many were deleted."""
+    if not prefixes:
+        return 0
+    return _timed("remove_prefixes", get_backend().remove_prefixes, bucket or get_bucket_name(), prefixes)
+
+
+def get_bytes_sync(object_name: str, bucket: str | None = None) -> bytes:
+    return _timed("get", get_backend().get_bytes, bucket or get_bucket_name(), object_name)
+
+
+def encode_json(payload: Any, compress: bool = False) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(data, compresslevel=6, mtime=0) if compress else data
+
+
+def decode_json(data: bytes) -> Any:
+    """Parse JSON objects written by :func:`encode_json`, compressed or not."""
+    if data[:2] == _GZIP_MAGIC:
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+def put_json_sync(object_name: str, payload: Any, compress: bool = False, bucket: str | None = None) -> int:
+    """Store ``payload`` as JSON (gzip with ``Content-Encoding`` when ``compress``); returns the stored size."""
+    data = encode_json(payload, compress)
+    put_bytes_sync(
+        object_name,
+        data,
+        content_type=JSON_CONTENT_TYPE,
+        bucket=bucket,
+        content_encoding="gzip" if compress else None,
+    )
+    return len(data)
+
+
+def get_json_sync(object_name: str, bucket: str | None = None) -> Any:
+    return decode_json(get_bytes_sync(object_name, bucket))
+
+
+async def get_json(object_name: str, bucket: str | None = None) -> Any:
+    return await _run(None, get_json_sync, object_name, bucket)
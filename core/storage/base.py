@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import BinaryIO, Iterable, Iterator
+
+
+class ObjectTooLargeError(Exception):
+    """Raised when a streamed object exceeds the configured size limit."""
+
+
+class StorageBackend(ABC):
+    """Blocking object-store operations; ``core.storage`` runs them on its executor for async callers.
+
+    Readers passed to :meth:`put_stream` hash and count bytes as they are
+    consumed and raise :class:`ObjectTooLargeError` past their limit, in which
+    case the backend must not leave a partial object behind.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def ensure_bucket(self, bucket: str) -> None:
+        ...
+
+    @abstractmethod
+    def put_stream(
+        self,
+        bucket: str,
+        object_name: str,
+        reader: BinaryIO,
+        length: int,
+        content_type: str | None = None,
+        content_encoding: str | None = None,
+    ) -> None:
+        """Store ``reader``; ``length`` is ``-1`` when unknown."""
+
+    @abstractmethod
+    def get_bytes(self, bucket: str, object_name: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def iter_chunks(self, bucket: str, object_name: str, chunk_size: int) -> Iterator[bytes]:
+        ...
+
+    @abstractmethod
+    def remove(self, bucket: str, object_name: str) -> None:
+        ...
+
+    @abstractmethod
+    def remove_prefixes(self, bucket: str, prefixes: Iterable[str]) -> int:
+        """Delete every object under each of ``prefixes``; returns how many were deleted."""
+
+    @abstractmethod
+    def presign_get(self, bucket: str, object_name: str, expires: timedelta) -> str:
+        ...
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+from urllib.parse import quote, urlencode
+
+from core.config import get_settings
+from core.storage.base import StorageBackend
+
+FILES_ROUTE = "/files"
+
+
+def _signature(bucket: str, object_name: str, expires_at: int) -> str:
+    secret = (get_settings().STORAGE_SIGNING_SECRET or get_settings().JWT_SECRET).encode()
+    message = f"{bucket}/{object_name}:{expires_at}".encode()
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(bucket: str, object_name: str, expires_at: int, signature: str) -> bool:
+    if expires_at < time.time():
+        return False
+    return hmac.compare_digest(_signature(bucket, object_name, expires_at), signature)
+
+
+class LocalBackend(StorageBackend):
+    """Objects as files under ``root/{bucket}/``, for single-node deployments and tests.
+
+    Writes go to a temporary file that is renamed into place, so readers never
+    see a partial object. Reads are memory-mapped; the ``/files`` route serves
+    presigned URLs as file responses, which servers with the ``pathsend``
+    extension hand to ``sendfile``.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str | os.PathLike, public_url: str = "") -> None:
+        self.root = Path(root).resolve()
+        self.public_url = public_url.rstrip("/")
+
+    @classmethod
+    def from_settings(cls) -> LocalBackend:
+        settings = get_settings()
+        return cls(settings.STORAGE_LOCAL_ROOT, settings.STORAGE_PUBLIC_URL)
+
+    def path(self, bucket: str, object_name: str) -> Path:
+        base = self.root / bucket
+        path = (base / object_name).resolve()
+        if not path.is_relative_to(base) or path == base:
+            raise ValueError(f"Invalid object name: {object_name!r}")
+        return path
+
+    def ensure_bucket(self, bucket: str) -> None:
+        (self.root / bucket).mkdir(parents=True, exist_ok=True)
+
+    def put_stream(
+        self,
+        bucket: str,
+        object_name: str,
+        reader: BinaryIO,
+        length: int,
+        content_type: str | None = None,
+        content_encoding: str | None = None,
+    ) -> None:
+        path = self.path(bucket, object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                shutil.copyfileobj(reader, target, get_settings().UPLOAD_CHUNK_SIZE)
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    def get_bytes(self, bucket: str, object_name: str) -> bytes:
+        return self.path(bucket, object_name).read_bytes()
+
+    def iter_chunks(self, bucket: str, object_name: str, chunk_size: int) -> Iterator[bytes]:
+        with open(self.path(bucket, object_name), "rb") as source:
+            if os.fstat(source.fileno()).st_size == 0:
+                return
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, len(mapped), chunk_size):
+                    yield mapped[offset : offset + chunk_size]
+
+    def remove(self, bucket: str, object_name: str) -> None:
+        self.path(bucket, object_name).unlink(missing_ok=True)
+
+    def remove_prefixes(self, bucket: str, prefixes: Iterable[str]) -> int:
+        # Prefixes are whole directories (``raw/{upload_id}/``).
+        removed = 0
+        for prefix in prefixes:
+            directory = self.path(bucket, prefix.rstrip("/"))
+            if directory.is_dir():
+                removed += sum(1 for path in directory.rglob("*") if path.is_file())
+                shutil.rmtree(directory)
+        return removed
+
+    def presign_get(self, bucket: str, object_name: str, expires: timedelta) -> str:
+        expires_at = int(time.time() + expires.total_seconds())
+        query = urlencode({"expires": expires_at, "signature": _signature(bucket, object_name, expires_at)})
+        return f"{self.public_url}{FILES_ROUTE}/{quote(bucket)}/{quote(object_name)}?{query}"
+
+
+def signed_path(backend: StorageBackend, bucket: str, object_name: str, expires_at: int, signature: str) -> Path | None:
+    """Resolve a presigned ``/files`` request to a file, or None when it is invalid, expired or missing."""
+    if not isinstance(backend, LocalBackend) or not verify_signature(bucket, object_name, expires_at, signature):
+        return None
+    try:
+        path = backend.path(bucket, object_name)
+    except ValueError:
+        return None
+    return path if path.is_file() else None
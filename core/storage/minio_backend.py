@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import threading
+from datetime import timedelta
+from typing import BinaryIO, Iterable, Iterator
+
+import certifi
+import urllib3
+from minio import Minio
+from minio.deleteobjects import DeleteObject
+
+from core.config import get_settings
+from core.storage.base import StorageBackend
+
+
+def create_http_client() -> urllib3.PoolManager:
+    """Connection pool sized to the storage executor, so no worker thread waits for a socket.
+
+    The MinIO default is 10 connections and five-minute connect/read timeouts.
+    """
+    settings = get_settings()
+    return urllib3.PoolManager(
+        num_pools=4,
+        maxsize=settings.STORAGE_MAX_WORKERS,
+        block=False,
+        timeout=urllib3.Timeout(connect=settings.STORAGE_CONNECT_TIMEOUT, read=settings.STORAGE_READ_TIMEOUT),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+
+
+class MinioBackend(StorageBackend):
+    """MinIO/S3 objects. A bucket is checked (and created) once per process, not per upload."""
+
+    name = "minio"
+
+    def __init__(self, client: Minio, part_size: int, parallel_parts: int) -> None:
+        self.client = client
+        self._part_size = part_size
+        self._parallel_parts = parallel_parts
+        self._buckets: set[str] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> MinioBackend:
+        settings = get_settings()
+        client = Minio(
+            settings.MINIO_ENDPOINT,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_SECURE,
+            # A known region lets presigning stay local instead of asking the server first.
+            region=settings.MINIO_REGION,
+            http_client=create_http_client(),
+        )
+        return cls(client, settings.UPLOAD_PART_SIZE, settings.UPLOAD_PARALLEL_PARTS)
+
+    def ensure_bucket(self, bucket: str) -> None:
+        if bucket in self._buckets:
+            return
+        with self._lock:
+            if bucket not in self._buckets:
+                if not self.client.bucket_exists(bucket):
+                    self.client.make_bucket(bucket)
+                self._buckets.add(bucket)
+
+    def put_stream(
+        self,
+        bucket: str,
+        object_name: str,
+        reader: BinaryIO,
+        length: int,
+        content_type: str | None = None,
+        content_encoding: str | None = None,
+    ) -> None:
+        self.ensure_bucket(bucket)
+        self.client.put_object(
+            bucket,
+            object_name,
+            reader,
+            length=length,
+            part_size=self._part_size if length < 0 else 0,
+            content_type=content_type or "application/octet-stream",
+            metadata={"Content-Encoding": content_encoding} if content_encoding else None,
+            num_parallel_uploads=self._parallel_parts,
+        )
+
+    def get_bytes(self, bucket: str, object_name: str) -> bytes:
+        response = self.client.get_object(bucket, object_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def iter_chunks(self, bucket: str, object_name: str, chunk_size: int) -> Iterator[bytes]:
+        response = self.client.get_object(bucket, object_name)
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    def remove(self, bucket: str, object_name: str) -> None:
+        self.client.remove_object(bucket, object_name)
+
+    def remove_prefixes(self, bucket: str, prefixes: Iterable[str]) -> int:
+        # ``remove_objects`` sends multi-object deletes of up to 1000 keys while the
+        # listing is still being consumed, and is lazy: errors come back as it is iterated.
+        removed = 0
+
+        def listed() -> Iterator[DeleteObject]:
+            nonlocal removed
+            for prefix in prefixes:
+                for item in self.client.list_objects(bucket, prefix=prefix, recursive=True):
+                    removed += 1
+                    yield DeleteObject(item.object_name)
+
+        errors = list(self.client.remove_objects(bucket, listed()))
+        if errors:
+            raise RuntimeError(f"Failed to remove {len(errors)} objects, first: {errors[0]}")
+        return removed
+
+    def presign_get(self, bucket: str, object_name: str, expires: timedelta) -> str:
+        return self.client.presigned_get_object(bucket, object_name, expires)
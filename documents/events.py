@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, AsyncIterator
+from uuid import UUID
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+
+from core.config import get_settings
+from core.database import AsyncSessionLocal
+from core.events import Subscription, event_broker
+from core.queue import tenant_key
+from documents.models import TERMINAL_STATUSES, JobModel
+
+_SNAPSHOT_COLUMNS = (JobModel.id, JobModel.upload_id, JobModel.stage, JobModel.status)
+
+
+def _snapshot(row: Any) -> dict[str, Any]:
+    return {
+        "type": "snapshot",
+        "job_id": str(row.id),
+        "upload_id": row.upload_id,
+        "stage": row.stage,
+        "status": row.status,
+    }
+
+
+async def _load_snapshots(*conditions) -> list[dict[str, Any]]:
+    # Short-lived session: streams stay open for minutes and must not pin a pooled connection.
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(select(*_SNAPSHOT_COLUMNS).where(*conditions))).all()
+    return [_snapshot(row) for row in rows]
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _owned_upload_ids(tenant: str, *conditions) -> list[str]:
+    async with AsyncSessionLocal() as session:
+        statement = select(JobModel.upload_id).where(JobModel.tenant == tenant_key(tenant), *conditions)
+        return list(await session.scalars(statement))
+
+
+async def open_job_stream(job_id: UUID, tenant: str) -> tuple[Subscription, dict[str, Any]]:
+    """Subscribe to the events of one of ``tenant``'s jobs, then read its current state.
+
+    Jobs of other tenants are reported as not found. Subscribing first means a
+    transition committed in between is delivered as an event rather than lost.
+    """
+    upload_ids = await _owned_upload_ids(tenant, JobModel.id == job_id)
+    if not upload_ids:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    subscription = event_broker.subscribe(upload_ids)
+    snapshots = await _load_snapshots(JobModel.id == job_id)
+    return subscription, snapshots[0]
+
+
+async def job_event_stream(subscription: Subscription, snapshot: dict[str, Any]) -> AsyncIterator[str]:
+    """Server-sent events for one job, ending after a terminal status."""
+    heartbeat = get_settings().EVENTS_HEARTBEAT_SECONDS
+    try:
+        yield _sse("snapshot", snapshot)
+        if snapshot["status"] in TERMINAL_STATUSES:
+            return
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse("job", event)
+            if event["status"] in TERMINAL_STATUSES:
+                return
+    finally:
+        subscription.close()
+
+
+def _upload_ids(message: dict[str, Any], key: str) -> list[str]:
+    values = message.get(key) or []
+    if not isinstance(values, list):
+        return []
+    return [value for value in values if isinstance(value, str)]
+
+
+async def _receive_commands(websocket: WebSocket, subscription: Subscription, tenant: str) -> None:
+    limit = get_settings().EVENTS_MAX_SUBSCRIPTIONS
+    while True:
+        try:
+            message = await websocket.receive_json()
+        except (ValueError, KeyError):
+            subscription.put({"type": "error", "detail": "Messages must be JSON objects"})
+            continue
+        if not isinstance(message, dict):
+            subscription.put({"type": "error", "detail": "Messages must be JSON objects"})
+            continue
+
+        subscription.remove(_upload_ids(message, "unsubscribe"))
+        requested = [
+            upload_id for upload_id in _upload_ids(message, "subscribe") if upload_id not in subscription.upload_ids
+        ]
+        if not requested:
+            continue
+        if len(subscription.upload_ids) + len(requested) > limit:
+            subscription.put({"type": "error", "detail": f"At most {limit} subscriptions per connection"})
+            continue
+
+        owned = await _owned_upload_ids(tenant, JobModel.upload_id.in_(requested))
+        missing = [upload_id for upload_id in requested if upload_id not in owned]
+        if missing:
+            subscription.put({"type": "error", "status": 404, "detail": "Upload not found", "upload_ids": missing})
+        if not owned:
+            continue
+        subscription.add(owned)
+        for snapshot in await _load_snapshots(JobModel.upload_id.in_(owned)):
+            subscription.put(snapshot)
+            if snapshot["status"] in TERMINAL_STATUSES:
+                subscription.remove([snapshot["upload_id"]])
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription) -> None:
+    while True:
+        event = await subscription.get()
+        await websocket.send_json(event if "type" in event else {"type": "event", **event})
+        if event.get("type") != "snapshot" and event.get("status") in TERMINAL_STATUSES:
+            subscription.remove([event["upload_id"]])
+
+
+async def serve_event_socket(websocket: WebSocket, tenant: str) -> None:
+    """Multiplex events for many uploads of ``tenant`` over one socket.
+
+    Clients send ``{"subscribe": [...], "unsubscribe": [...]}``; every subscribed
+    upload first gets a ``snapshot`` message, then ``event`` messages until it
+    reaches a terminal status. Uploads of other tenants get a 404 ``error``
+    message instead. A single task writes to the socket.
+    """
+    subscription = event_broker.subscribe()
+    tasks = [
+        asyncio.create_task(_receive_commands(websocket, subscription, tenant)),
+        asyncio.create_task(_send_events(websocket, subscription)),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not isinstance(task.exception(), WebSocketDisconnect):
+                task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription.close()
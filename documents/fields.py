@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable, Mapping
+
+from sqlalchemy import column, func, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from documents.models import FIELD_NAME_CONSTRAINT, DocumentFieldModel
+
+NUMERIC_TYPES = frozenset({"number", "numeric", "decimal", "integer", "int", "float", "amount", "money", "currency"})
+DATE_TYPES = frozenset({"date", "datetime"})
+DATE_FORMATS = ("%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%Y.%m.%d", "%d.%m.%y")
+
+_FIELD_COLUMNS = (
+    "document_id",
+    "field_name",
+    "field_type",
+    "value_text",
+    "value_num",
+    "value_date",
+    "bbox",
+    "confidence",
+)
+_UPDATED_COLUMNS = _FIELD_COLUMNS[2:]
+_BBOX_INDEX = _FIELD_COLUMNS.index("bbox")
+_STAGING_TABLE = "document_fields_staging"
+_NON_NUMERIC = re.compile(r"[^\d,.\-]")
+
+
+@dataclass
+class ExtractedField:
+    name: str
+    value: Any
+    field_type: str | None = None
+    bbox: list[float] | None = None
+    confidence: float | None = None
+
+
+def parse_number(value: Any) -> Decimal | None:
+    """Parse amounts such as ``1 234,56``, ``1,234.56`` or ``$12``; None when not numeric."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    cleaned = _NON_NUMERIC.sub("", str(value))
+    if "," in cleaned and "." in cleaned:
+        # Whichever separator comes last is the decimal one.
+        thousands = "," if cleaned.rfind(",") < cleaned.rfind(".") else "."
+        cleaned = cleaned.replace(thousands, "").replace(",", ".")
+    elif "," in cleaned:
+        integer, _, fraction = cleaned.rpartition(",")
+        cleaned = f"{integer.replace(',', '')}.{fraction}" if len(fraction) <= 2 else cleaned.replace(",", "")
+    try:
+        number = Decimal(cleaned)
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() else None
+
+
+def parse_date(value: Any) -> date | None:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value is None:
+        return None
+    raw = str(value).strip()
+    try:
+        return datetime.fromisoformat(raw).date()
+    except ValueError:
+        pass
+    for pattern in DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, pattern).date()
+        except ValueError:
+            continue
+    return None
+
+
+def field_row(document_id: int, field: ExtractedField) -> dict[str, Any]:
+    """Type a field into the ``value_text``/``value_num``/``value_date`` columns."""
+    field_type = field.field_type.lower() if field.field_type else None
+    value_text = None if field.value is None else str(field.value).strip()
+    return {
+        "document_id": document_id,
+        "field_name": field.name,
+        "field_type": field_type,
+        "value_text": value_text,
+        "value_num": parse_number(field.value) if field_type in NUMERIC_TYPES else None,
+        "value_date": parse_date(field.value) if field_type in DATE_TYPES else None,
+        "bbox": field.bbox,
+        "confidence": field.confidence,
+    }
+
+
+def build_rows(fields_by_document: Mapping[int, Iterable[ExtractedField]]) -> list[dict[str, Any]]:
+    """One typed row per ``(document_id, field_name)``; the last value for a repeated name wins.
+
+    Postgres rejects an upsert that touches the same row twice, so duplicates are
+    dropped here. Rows are sorted by key so concurrent workers lock rows in the
+    same order and cannot deadlock each other.
+    """
+    rows: dict[tuple[int, str], dict[str, Any]] = {}
+    for document_id, fields in fields_by_document.items():
+        for field in fields:
+            rows[(document_id, field.name)] = field_row(document_id, field)
+    return [rows[key] for key in sorted(rows)]
+
+
+def _upsert(source: Any = None):
+    statement = insert(DocumentFieldModel)
+    if source is not None:
+        statement = statement.from_select(list(_FIELD_COLUMNS), source)
+    return statement.on_conflict_do_update(
+        constraint=FIELD_NAME_CONSTRAINT,
+        set_={
+            **{name: getattr(statement.excluded, name) for name in _UPDATED_COLUMNS},
+            "updated_at": func.now(),
+        },
+        # Values corrected by a person are never overwritten by a re-run.
+        where=DocumentFieldModel.edited_by.is_(None),
+    )
+
+
+def _copy_upsert(session: Session, rows: list[dict[str, Any]]) -> None:
+    """COPY rows into a transaction-scoped staging table, then upsert them with one statement."""
+    session.execute(
+        text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} "
+            f"(LIKE document_fields INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+    )
+    cursor = session.connection().connection.cursor()
+    try:
+        with cursor.copy(f"COPY {_STAGING_TABLE} ({', '.join(_FIELD_COLUMNS)}) FROM STDIN") as copy:
+            for row in rows:
+                values = [row[name] for name in _FIELD_COLUMNS]
+                if row["bbox"] is not None:
+                    values[_BBOX_INDEX] = json.dumps(row["bbox"])
+                copy.write_row(values)
+    finally:
+        cursor.close()
+    staging = table(_STAGING_TABLE, *(column(name) for name in _FIELD_COLUMNS))
+    session.execute(_upsert(staging.select()))
+    session.execute(text(f"TRUNCATE {_STAGING_TABLE}"))
+
+
+def upsert_fields_sync(session: Session, fields_by_document: Mapping[int, Iterable[ExtractedField]]) -> int:
+    """Write every field of the given documents in bulk; the caller commits.
+
+    Batches above ``FIELD_COPY_THRESHOLD`` rows go through COPY, smaller ones
+    through a multi-row ``INSERT … ON CONFLICT``. Returns the number of rows sent.
+    """
+    rows = build_rows(fields_by_document)
+    if not rows:
+        return 0
+    if len(rows) >= get_settings().FIELD_COPY_THRESHOLD:
+        _copy_upsert(session, rows)
+    else:
+        session.execute(_upsert(), rows)
+    return len(rows)
+
+
+async def upsert_fields(db: AsyncSession, fields_by_document: Mapping[int, Iterable[ExtractedField]]) -> int:
+    """Async counterpart of :func:`upsert_fields_sync` (multi-row INSERT only); the caller commits."""
+    rows = build_rows(fields_by_document)
+    if rows:
+        await db.execute(_upsert(), rows)
+    return len(rows)
@@ -3,39 +3,96 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import Column, Date, DateTime, Float, Index, Integer, Numeric, String, Text, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from core.database import Base
 
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_REJECTED = "rejected"
+TERMINAL_STATUSES = frozenset({STATUS_COMPLETED, STATUS_FAILED, STATUS_REJECTED})
+
+FIELD_NAME_CONSTRAINT = "uq_document_field_name"
+
 
 class DocumentModel(Base):
     __tablename__ = "documents"
+    # Migrated databases partition ``documents`` and ``jobs`` by month of ``created_at``
+    # (revision 0006): their primary and unique keys include ``created_at``, and no
+    # foreign key points at them, so fields and jobs are joined without one.
+    # Keyset-pagination indexes for list views, which are scoped to a tenant; INCLUDE
+    # makes them covering for the listed columns. They also serve per-tenant retention.
+    __table_args__ = (
+        Index(
+            "ix_documents_tenant_created_at_id",
+            "tenant",
+            "created_at",
+            "id",
+            postgresql_include=["upload_id", "doc_type", "status", "updated_at", "finalized_at"],
+        ),
+        Index(
+            "ix_documents_tenant_status_created_at_id",
+            "tenant",
+            "status",
+            "created_at",
+            "id",
+            postgresql_include=["upload_id", "doc_type", "updated_at", "finalized_at"],
+        ),
+        Index(
+            "ix_documents_tenant_doc_type_created_at_id",
+            "tenant",
+            "doc_type",
+            "created_at",
+            "id",
+            postgresql_include=["upload_id", "status", "updated_at", "finalized_at"],
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     upload_id = Column(String(64), nullable=False, unique=True, index=True)
     doc_type = Column(String(128), nullable=True)
     status = Column(String(32), nullable=False, default="pending", server_default="pending")
+    # Owner for listings and retention (``core.queue.tenant_key``); null on rows from before tenants were recorded.
+    tenant = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     source_url = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)
     rectified_url = Column(String, nullable=True)
-    quality_json = Column(JSONB, nullable=True)
-    ocr_json = Column(JSONB, nullable=True)
-    schema_json = Column(JSONB, nullable=True)
+    # Payload columns are loaded only on access; full OCR output lives in MinIO
+    # under ``ocr_object`` (``ocr_json`` is only set on rows from before that).
+    quality_json = deferred(Column(JSONB, nullable=True))
+    ocr_json = deferred(Column(JSONB, nullable=True))
+    schema_json = deferred(Column(JSONB, nullable=True))
+    ocr_object = Column(String, nullable=True)
+    ocr_summary = Column(JSONB, nullable=True)
     webhook_url = Column(String, nullable=True)
     finalized_at = Column(DateTime(timezone=True), nullable=True)
 
-    fields = relationship("DocumentFieldModel", back_populates="document", cascade="all, delete-orphan", passive_deletes=True)
-    job = relationship("JobModel", back_populates="document", uselist=False)
+    fields = relationship(
+        "DocumentFieldModel",
+        primaryjoin="DocumentModel.id == foreign(DocumentFieldModel.document_id)",
+        back_populates="document",
+        cascade="all, delete-orphan",
+    )
+    job = relationship(
+        "JobModel",
+        primaryjoin="DocumentModel.id == foreign(JobModel.document_id)",
+        back_populates="document",
+        uselist=False,
+    )
 
 
 class DocumentFieldModel(Base):
     __tablename__ = "document_fields"
+    __table_args__ = (UniqueConstraint("document_id", "field_name", name=FIELD_NAME_CONSTRAINT),)
 
     id = Column(Integer, primary_key=True)
-    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    document_id = Column(Integer, nullable=False)
     field_name = Column(String(128), nullable=False)
     field_type = Column(String(32), nullable=True)
     value_text = Column(Text, nullable=True)
@@ -48,19 +105,67 @@ class DocumentFieldModel(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
-    document = relationship("DocumentModel", back_populates="fields")
+    document = relationship(
+        "DocumentModel", primaryjoin="DocumentModel.id == foreign(DocumentFieldModel.document_id)", back_populates="fields"
+    )
 
 
 class JobModel(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index(
+            "ix_jobs_tenant_created_at_id",
+            "tenant",
+            "created_at",
+            "id",
+            postgresql_include=["upload_id", "document_id", "status", "stage", "updated_at"],
+        ),
+        Index(
+            "ix_jobs_tenant_status_created_at_id",
+            "tenant",
+            "status",
+            "created_at",
+            "id",
+            postgresql_include=["upload_id", "document_id", "stage", "updated_at"],
+        ),
+        Index(
+            "ix_jobs_tenant_stage_created_at_id",
+            "tenant",
+            "stage",
+            "created_at",
+            "id",
+            postgresql_include=["upload_id", "document_id", "status", "updated_at"],
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     upload_id = Column(String(64), nullable=False, unique=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+    document_id = Column(Integer, nullable=True)
     status = Column(String(32), nullable=False, default="pending", server_default="pending")
     stage = Column(String(32), nullable=True)
     payload = Column(JSONB, nullable=True)
+    tenant = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
-    document = relationship("DocumentModel", back_populates="job")
+    document = relationship(
+        "DocumentModel", primaryjoin="DocumentModel.id == foreign(JobModel.document_id)", back_populates="job"
+    )
+
+
+class SchemaTemplateModel(Base):
+    """A learned form layout: its anchor fingerprint, inferred schema and field boxes."""
+
+    __tablename__ = "schema_templates"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False, unique=True)
+    doc_type = Column(String(128), nullable=True, index=True)
+    anchors = Column(JSONB, nullable=False)
+    schema_json = Column(JSONB, nullable=False)
+    field_boxes = Column(JSONB, nullable=True)
+    hits = Column(Integer, nullable=False, default=0, server_default="0")
+    confidence_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
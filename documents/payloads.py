@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import storage
+from documents.models import DocumentModel
+
+
+def summarize_ocr(payload: dict[str, Any], stored_bytes: int) -> dict[str, Any]:
+    """Small digest of an OCR payload kept on ``documents.ocr_summary``."""
+    confidences = [
+        segment["confidence"]
+        for page in payload["pages"]
+        for segment in page["segments"]
+        if segment.get("confidence") is not None
+    ]
+    return {
+        "pages": len(payload["pages"]),
+        "segments": sum(len(page["segments"]) for page in payload["pages"]),
+        "characters": len(payload["text"]),
+        "mean_confidence": round(sum(confidences) / len(confidences), 4) if confidences else None,
+        "stored_bytes": stored_bytes,
+    }
+
+
+def ocr_payload_sync(document: DocumentModel) -> dict[str, Any] | None:
+    """Fetch the full OCR payload of ``document`` from MinIO (worker side).
+
+    Rows written before payloads moved to object storage fall back to the
+    deferred ``ocr_json`` column, which is only loaded by this access.
+    """
+    if document.ocr_object:
+        return storage.get_json_sync(document.ocr_object)
+    return document.ocr_json
+
+
+async def ocr_payload(db: AsyncSession, document: DocumentModel) -> dict[str, Any] | None:
+    """Async counterpart of :func:`ocr_payload_sync` for API handlers."""
+    if document.ocr_object:
+        return await storage.get_json(document.ocr_object)
+    return await db.scalar(select(DocumentModel.ocr_json).where(DocumentModel.id == document.id))
@@ -0,0 +1,324 @@
+"""Retention of documents, jobs, their fields and stored objects.
+
+In migrated databases ``documents`` and ``jobs`` are partitioned by UTC month of
+``created_at`` (revision 0006). Each pass of :func:`run_retention`:
+
+1. creates the partitions of the current and next ``RETENTION_PARTITIONS_AHEAD``
+   months, moving over any rows the default partition caught for them;
+2. drops (or detaches) the months that the longest retention of any tenant has
+   passed, so most expired data leaves without a ``DELETE``;
+3. deletes, in batches of ``RETENTION_BATCH_SIZE``, the expired rows of tenants
+   with a shorter retention, and rows left in the default partition.
+
+Data under the longest retention is therefore kept until its whole month has
+expired. Tables created by ``create_all`` are not partitioned; there every
+expired row is deleted in batches.
+
+Fields and the ``raw/{upload_id}/`` and ``proc/{upload_id}/`` prefixes of a
+document are removed before the document, except for objects that a surviving
+deduplicated copy still points at. A detached month is an archive instead: its
+objects stay in storage and its fields move to a standalone
+``document_fields_p{YYYY_MM}`` table, which is the operator's to remove with it.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Sequence
+
+from sqlalchemy import and_, bindparam, delete, false, or_, select, text
+from sqlalchemy.orm import Session
+
+from core import storage
+from core.config import get_settings
+from core.database import get_sync_sessionmaker
+from core.queue import tenant_key
+from documents.models import DocumentFieldModel, DocumentModel, JobModel
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("documents", "jobs")
+PARTITION_ACTIONS = ("drop", "detach")
+# Detaching locks the parent table; give up and retry on the next pass rather than queue requests behind it.
+DETACH_LOCK_TIMEOUT = "5s"
+
+_OBJECT_COLUMNS = (DocumentModel.source_url, DocumentModel.rectified_url, DocumentModel.ocr_object)
+_OBJECT_PREFIXES = (storage.RAW_PREFIX, storage.PROC_PREFIX)
+
+
+def parse_tenant_days(value: str) -> dict[str, int]:
+    """``"42=30,anonymous=7"`` -> days to keep per tenant."""
+    days: dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        tenant, _, count = item.rpartition("=")
+        if not tenant.strip():
+            raise ValueError(f"Invalid RETENTION_TENANT_DAYS entry: {item!r}")
+        days[tenant_key(tenant.strip())] = max(int(count), 0)
+    return days
+
+
+@dataclass
+class RetentionPolicy:
+    """Days to keep data per tenant; 0 keeps it forever."""
+
+    default_days: int
+    tenant_days: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_settings(cls) -> RetentionPolicy:
+        settings = get_settings()
+        return cls(max(int(settings.RETENTION_DAYS), 0), parse_tenant_days(settings.RETENTION_TENANT_DAYS))
+
+    def periods(self) -> list[int]:
+        return sorted({days for days in (self.default_days, *self.tenant_days.values()) if days > 0})
+
+    def longest(self) -> int | None:
+        """The retention every row has passed once it is this old; None when some tenant keeps data forever."""
+        days = (self.default_days, *self.tenant_days.values())
+        return None if not all(days) else max(days)
+
+    def expired(self, model: Any, days: int, cutoff: datetime) -> Any:
+        """Rows of ``model`` kept for ``days`` and created before ``cutoff``."""
+        tenants = [tenant for tenant, kept in self.tenant_days.items() if kept == days]
+        condition = model.tenant.in_(tenants) if tenants else false()
+        if self.default_days == days:
+            condition = or_(condition, model.tenant.is_(None), model.tenant.not_in(list(self.tenant_days)))
+        return and_(model.created_at < cutoff, condition)
+
+
+@dataclass
+class RetentionStats:
+    partitions_created: int = 0
+    partitions_removed: int = 0
+    documents: int = 0
+    jobs: int = 0
+    objects: int = 0
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bounds(month: date) -> tuple[datetime, datetime]:
+    lower = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    upper = _add_months(month, 1)
+    return lower, datetime(upper.year, upper.month, 1, tzinfo=timezone.utc)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def monthly_partitions(session: Session, table: str) -> dict[date, str] | None:
+    """Monthly partitions of ``table`` by first day of the month; None when the table is not partitioned."""
+    kind = session.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table})
+    if kind != "p":
+        return None
+    names = session.scalars(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    )
+    partitions = {}
+    prefix = f"{table}_p"
+    for name in names:
+        try:
+            month = datetime.strptime(name.removeprefix(prefix), "%Y_%m").date()
+        except ValueError:
+            continue  # the default partition
+        partitions[month] = name
+    return partitions
+
+
+def _create_partition(session: Session, table: str, month: date) -> None:
+    # Rows the default partition holds for this month must move before the range can be attached.
+    name = partition_name(table, month)
+    lower, upper = _bounds(month)
+    session.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING STORAGE)"))
+    if session.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"{table}_default"}):
+        session.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {table}_default WHERE created_at >= :lower AND created_at < :upper "
+                f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+            ),
+            {"lower": lower, "upper": upper},
+        )
+    session.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{lower:%Y-%m-%d} 00:00:00+00') TO ('{upper:%Y-%m-%d} 00:00:00+00')"
+        )
+    )
+    session.commit()
+    logger.info("Created partition %s", name)
+
+
+def _object_upload_id(object_name: str | None) -> str | None:
+    """``upload_id`` of a ``raw/{upload_id}/…`` or ``proc/{upload_id}/…`` object name."""
+    top, _, rest = (object_name or "").partition("/")
+    upload_id, separator, _ = rest.partition("/")
+    return upload_id if top in _OBJECT_PREFIXES and separator and upload_id else None
+
+
+def _remove_objects(session: Session, rows: Sequence[Any], survivors: Any) -> int:
+    """Delete the stored objects of ``rows`` that no document matching ``survivors`` points at.
+
+    Duplicates share the content hash and the objects of their original, so
+    only documents with the same hashes need to be checked.
+    """
+    upload_ids: set[str | None] = set()
+    hashes = set()
+    for row in rows:
+        upload_ids.add(row["upload_id"])
+        upload_ids.update(_object_upload_id(row[column.key]) for column in _OBJECT_COLUMNS)
+        if row["content_hash"]:
+            hashes.add(row["content_hash"])
+    if hashes:
+        kept = session.execute(select(*_OBJECT_COLUMNS).where(DocumentModel.content_hash.in_(hashes), survivors))
+        for objects in kept:
+            upload_ids.difference_update(map(_object_upload_id, objects))
+    upload_ids.discard(None)
+    prefixes = [f"{top}/{upload_id}/" for upload_id in sorted(upload_ids) for top in _OBJECT_PREFIXES]
+    return storage.remove_prefixes_sync(prefixes)
+
+
+def _document_rows(session: Session, condition: Any, limit: int, after: int | None = None) -> list[Any]:
+    query = select(DocumentModel.id, DocumentModel.upload_id, DocumentModel.content_hash, *_OBJECT_COLUMNS)
+    query = query.where(condition)
+    if after is not None:
+        query = query.where(DocumentModel.id > after).order_by(DocumentModel.id)
+    return list(session.execute(query.limit(limit)).mappings())
+
+
+def _remove_month(
+    session: Session, month: date, names: dict[str, str], stats: RetentionStats, stop: threading.Event
+) -> bool:
+    """Remove (or archive) the fields and objects of a month's documents, then drop or detach its partitions."""
+    settings = get_settings()
+    lower, upper = _bounds(month)
+    archive = None
+    if "documents" in names and settings.RETENTION_PARTITION_ACTION == "detach":
+        archive = partition_name("document_fields", month)
+        session.execute(text(f"CREATE TABLE IF NOT EXISTS {archive} (LIKE document_fields INCLUDING DEFAULTS)"))
+        session.commit()
+        move_fields = text(
+            f"WITH moved AS (DELETE FROM document_fields WHERE document_id IN :ids RETURNING *) "
+            f"INSERT INTO {archive} SELECT * FROM moved"
+        ).bindparams(bindparam("ids", expanding=True))
+    if "documents" in names:
+        after = 0
+        while rows := _document_rows(
+            session,
+            and_(DocumentModel.created_at >= lower, DocumentModel.created_at < upper),
+            settings.RETENTION_BATCH_SIZE,
+            after,
+        ):
+            if stop.is_set():
+                return False
+            ids = [row["id"] for row in rows]
+            if archive:
+                session.execute(move_fields, {"ids": ids})
+            else:
+                stats.objects += _remove_objects(session, rows, DocumentModel.created_at >= upper)
+                session.execute(delete(DocumentFieldModel).where(DocumentFieldModel.document_id.in_(ids)))
+            session.commit()
+            stats.documents += len(ids)
+            after = ids[-1]
+
+    for table, name in names.items():
+        session.execute(text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+        session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if settings.RETENTION_PARTITION_ACTION == "drop":
+            session.execute(text(f"DROP TABLE {name}"))
+        session.commit()
+        stats.partitions_removed += 1
+        logger.info("Removed partition %s (%s)", name, settings.RETENTION_PARTITION_ACTION)
+    return True
+
+
+def _delete_documents(session: Session, condition: Any, stats: RetentionStats, stop: threading.Event) -> None:
+    batch_size = get_settings().RETENTION_BATCH_SIZE
+    while not stop.is_set():
+        rows = _document_rows(session, condition, batch_size)
+        if not rows:
+            return
+        ids = [row["id"] for row in rows]
+        # Objects first: if their removal fails, the rows stay and the next pass retries.
+        stats.objects += _remove_objects(session, rows, DocumentModel.id.not_in(ids))
+        session.execute(delete(DocumentFieldModel).where(DocumentFieldModel.document_id.in_(ids)))
+        session.execute(delete(DocumentModel).where(DocumentModel.id.in_(ids), condition))
+        session.commit()
+        stats.documents += len(ids)
+        if len(rows) < batch_size:
+            return
+
+
+def _delete_jobs(session: Session, condition: Any, stats: RetentionStats, stop: threading.Event) -> None:
+    batch_size = get_settings().RETENTION_BATCH_SIZE
+    while not stop.is_set():
+        batch = select(JobModel.id).where(condition).limit(batch_size).scalar_subquery()
+        deleted = session.execute(delete(JobModel).where(JobModel.id.in_(batch), condition)).rowcount
+        session.commit()
+        stats.jobs += deleted
+        if deleted < batch_size:
+            return
+
+
+def run_retention(stop: threading.Event | None = None, now: datetime | None = None) -> RetentionStats:
+    """One retention pass; ``stop`` ends it early between batches."""
+    settings = get_settings()
+    if settings.RETENTION_PARTITION_ACTION not in PARTITION_ACTIONS:
+        raise ValueError(f"Unknown RETENTION_PARTITION_ACTION: {settings.RETENTION_PARTITION_ACTION!r}")
+    stop = stop or threading.Event()
+    now = now or datetime.now(timezone.utc)
+    policy = RetentionPolicy.from_settings()
+    stats = RetentionStats()
+
+    with get_sync_sessionmaker()() as session:
+        partitions = {table: monthly_partitions(session, table) for table in PARTITIONED_TABLES}
+        partitioned = all(found is not None for found in partitions.values())
+
+        if partitioned:
+            current = _month_start(now).date()
+            for table, found in partitions.items():
+                for month in (_add_months(current, count) for count in range(settings.RETENTION_PARTITIONS_AHEAD + 1)):
+                    if month not in found:
+                        _create_partition(session, table, month)
+                        stats.partitions_created += 1
+
+        longest = policy.longest()
+        if partitioned and longest is not None:
+            cutoff = _month_start(now - timedelta(days=longest))
+            months = sorted({month for found in partitions.values() for month in found if _bounds(month)[1] <= cutoff})
+            for month in months:
+                names = {table: found[month] for table, found in partitions.items() if month in found}
+                if not _remove_month(session, month, names, stats, stop):
+                    break
+
+        for days in policy.periods():
+            cutoff = now - timedelta(days=days)
+            if partitioned and days == longest:
+                # Whole months are dropped above; this only reaches rows left in the default partition.
+                cutoff = _month_start(cutoff)
+            _delete_documents(session, policy.expired(DocumentModel, days, cutoff), stats, stop)
+            _delete_jobs(session, policy.expired(JobModel, days, cutoff), stats, stop)
+
+    logger.info(
+        "Retention pass: %d partitions created, %d removed; %d documents, %d jobs and %d objects deleted",
+        stats.partitions_created,
+        stats.partitions_removed,
+        stats.documents,
+        stats.jobs,
+        stats.objects,
+    )
+    return stats
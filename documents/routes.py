@@ -1,18 +1,141 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, File, UploadFile, status
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, WebSocket, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core import queue as job_queue
+from core import storage
 from core.database import get_db
-from documents.schema import UploadResponse
-from documents.services import handle_upload
+from core.security import get_connection_user, get_current_user, get_stream_user
+from core.storage.local import FILES_ROUTE, signed_path
+from documents.events import job_event_stream, open_job_stream, serve_event_socket
+from documents.schema import BatchUploadResponse, DocumentListResponse, JobListResponse, UploadResponse
+from documents.services import get_document_ocr, handle_batch_upload, handle_upload, list_documents, list_jobs
+from users.models import UserModel
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
+documents_router = APIRouter(prefix="/documents", tags=["documents"], dependencies=[Depends(get_current_user)])
+jobs_router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(get_current_user)])
+# Event streams authenticate separately: EventSource and browser WebSockets cannot set headers.
+events_router = APIRouter(prefix="/jobs", tags=["jobs"])
+# Presigned URLs of the local storage backend; the signature is the authorization.
+files_router = APIRouter(prefix=FILES_ROUTE, tags=["files"])
+
+
+def _tenant(request: Request) -> str:
+    """Fair-share scheduling key: the authenticated user, else one shared anonymous tenant."""
+    user = request.scope.get("user")
+    return str(user.id) if isinstance(user, UserModel) else job_queue.ANONYMOUS_TENANT
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=UploadResponse)
 async def create_upload(
+    request: Request,
     file: UploadFile = File(...),
+    dedupe: bool = Query(True, description="Reuse results of an identical upload of yours that was already processed"),
     db: AsyncSession = Depends(get_db),
 ) -> UploadResponse:
-    return await handle_upload(file=file, db=db)
+    return await handle_upload(file=file, db=db, dedupe=dedupe, tenant=_tenant(request))
+
+
+@router.post("/batch", status_code=status.HTTP_201_CREATED, response_model=BatchUploadResponse)
+async def create_batch_upload(
+    request: Request,
+    files: list[UploadFile] = File(..., description="Files to ingest; zip archives are expanded"),
+    dedupe: bool = Query(True, description="Reuse results of identical uploads of yours that were already processed"),
+    db: AsyncSession = Depends(get_db),
+) -> BatchUploadResponse:
+    return await handle_batch_upload(files=files, db=db, dedupe=dedupe, tenant=_tenant(request))
+
+
+@documents_router.get("/", status_code=status.HTTP_200_OK, response_model=DocumentListResponse)
+async def get_documents(
+    cursor: str | None = Query(None, description="Opaque cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    status_: str | None = Query(None, alias="status"),
+    doc_type: str | None = Query(None),
+    created_from: datetime | None = Query(None, description="Only documents created at or after this time"),
+    created_to: datetime | None = Query(None, description="Only documents created before this time"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user),
+) -> DocumentListResponse:
+    return await list_documents(
+        db,
+        tenant=str(current_user.id),
+        limit=limit,
+        cursor=cursor,
+        status=status_,
+        doc_type=doc_type,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+@documents_router.get("/{document_id}/ocr", status_code=status.HTTP_200_OK)
+async def get_document_ocr_result(
+    document_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user),
+) -> dict[str, Any]:
+    return await get_document_ocr(db, tenant=str(current_user.id), document_id=document_id)
+
+
+@jobs_router.get("/", status_code=status.HTTP_200_OK, response_model=JobListResponse)
+async def get_jobs(
+    cursor: str | None = Query(None, description="Opaque cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    status_: str | None = Query(None, alias="status"),
+    stage: str | None = Query(None),
+    created_from: datetime | None = Query(None, description="Only jobs created at or after this time"),
+    created_to: datetime | None = Query(None, description="Only jobs created before this time"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user),
+) -> JobListResponse:
+    return await list_jobs(
+        db,
+        tenant=str(current_user.id),
+        limit=limit,
+        cursor=cursor,
+        status=status_,
+        stage=stage,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+@events_router.get("/{job_id}/events")
+async def stream_job_events(job_id: UUID, current_user: UserModel = Depends(get_stream_user)) -> StreamingResponse:
+    subscription, snapshot = await open_job_stream(job_id, tenant=str(current_user.id))
+    return StreamingResponse(
+        job_event_stream(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@events_router.websocket("/events")
+async def job_events_socket(websocket: WebSocket, access_token: str | None = Query(None)) -> None:
+    current_user = await get_connection_user(websocket, access_token)
+    if current_user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await serve_event_socket(websocket, tenant=str(current_user.id))
+
+
+@files_router.get("/{bucket}/{object_name:path}")
+async def get_file(
+    bucket: str,
+    object_name: str,
+    expires: int = Query(...),
+    signature: str = Query(...),
+) -> FileResponse:
+    path = signed_path(storage.get_backend(), bucket, object_name, expires, signature)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return FileResponse(path)
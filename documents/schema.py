@@ -1,11 +1,67 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field
 
 class UploadResponse(BaseModel):
     upload_id: str = Field(..., description="Unique identifier assigned to the upload batch")
     document_id: int = Field(..., description="Primary key of the created document record")
     db_job_id: str = Field(..., description="Primary key of the job record persisted in Postgres")
-    queue_job_id: str = Field(..., description="Identifier assigned by the task queue")
+    queue_job_id: str | None = Field(None, description="Identifier assigned by the task queue; empty when deduplicated")
     source_object: str = Field(..., description="MinIO object key for the raw source file")
-    presigned_url: str | None = Field(None, description="Short-lived URL for the uploaded object")
\ No newline at end of file
+    size_bytes: int = Field(..., description="Size of the stored source file in bytes")
+    content_sha256: str = Field(..., description="Hex SHA-256 digest of the stored source file")
+    deduplicated: bool = Field(False, description="True when results were reused from an identical prior upload")
+    duplicate_of: int | None = Field(None, description="Document whose results were reused, if deduplicated")
+    presigned_url: str | None = Field(None, description="Short-lived URL for the uploaded object")
+    estimated_wait_seconds: float | None = Field(
+        None, description="Estimated seconds the upload waits in the processing queues; empty without recent throughput"
+    )
+
+
+class BatchUploadItem(BaseModel):
+    filename: str = Field(..., description="Original filename, or the member path inside a zip archive")
+    upload: UploadResponse | None = Field(None, description="Upload result when the file was accepted")
+    error: str | None = Field(None, description="Reason the file was rejected")
+
+
+class BatchUploadResponse(BaseModel):
+    items: list[BatchUploadItem] = Field(..., description="One entry per submitted file, in submission order")
+    accepted: int = Field(..., description="Number of files accepted")
+    failed: int = Field(..., description="Number of files rejected")
+
+
+class DocumentListItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int = Field(..., description="Primary key of the document record")
+    upload_id: str = Field(..., description="Identifier of the upload that created the document")
+    doc_type: str | None = Field(None, description="Document type inferred by the schema stage")
+    status: str = Field(..., description="Processing status of the document")
+    created_at: datetime = Field(..., description="When the document was created")
+    updated_at: datetime = Field(..., description="When the document was last updated")
+    finalized_at: datetime | None = Field(None, description="When processing reached a final result")
+
+
+class DocumentListResponse(BaseModel):
+    items: list[DocumentListItem] = Field(..., description="Documents, newest first")
+    next_cursor: str | None = Field(None, description="Cursor for the next page; empty on the last page")
+
+
+class JobListItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID = Field(..., description="Primary key of the job record")
+    upload_id: str = Field(..., description="Identifier of the upload the job processes")
+    document_id: int | None = Field(None, description="Document the job belongs to")
+    status: str = Field(..., description="Job status")
+    stage: str | None = Field(None, description="Pipeline stage the job is in or last finished")
+    created_at: datetime = Field(..., description="When the job was created")
+    updated_at: datetime = Field(..., description="When the job was last updated")
+
+
+class JobListResponse(BaseModel):
+    items: list[JobListItem] = Field(..., description="Jobs, newest first")
+    next_cursor: str | None = Field(None, description="Cursor for the next page; empty on the last page")
@@ -1,19 +1,68 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import binascii
+import json
+import logging
 import mimetypes
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Tuple
-from uuid import uuid4
+from typing import Any, BinaryIO, Callable, Iterable, Tuple
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, UploadFile
+from sqlalchemy import Integer, String, column, func, insert, literal, select, tuple_, values
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core import queue as job_queue
 from core import storage
-from documents.models import DocumentModel, JobModel
-from documents.schema import UploadResponse
+from core.admission import admit_uploads
+from core.config import get_settings
+from documents.models import STATUS_COMPLETED, DocumentFieldModel, DocumentModel, JobModel
+from documents.payloads import ocr_payload
+from documents.schema import (
+    BatchUploadItem,
+    BatchUploadResponse,
+    DocumentListItem,
+    DocumentListResponse,
+    JobListItem,
+    JobListResponse,
+    UploadResponse,
+)
+
+logger = logging.getLogger(__name__)
 
 SUPPORTED_TYPES = {"image/jpeg", "image/png", "image/tiff", "application/pdf"}
+ARCHIVE_TYPES = {"application/zip", "application/x-zip-compressed"}
+DEDUPLICATED_STAGE = "deduplicated"
+
+_COPIED_DOCUMENT_COLUMNS = (
+    "doc_type",
+    "source_url",
+    "content_hash",
+    "rectified_url",
+    "quality_json",
+    "ocr_json",
+    "ocr_object",
+    "ocr_summary",
+    "schema_json",
+)
+_COPIED_FIELD_COLUMNS = (
+    DocumentFieldModel.field_name,
+    DocumentFieldModel.field_type,
+    DocumentFieldModel.value_text,
+    DocumentFieldModel.value_num,
+    DocumentFieldModel.value_date,
+    DocumentFieldModel.bbox,
+    DocumentFieldModel.confidence,
+    # Corrections stay attributed, so they are not mistaken for (and overwritten as) machine output.
+    DocumentFieldModel.edited_by,
+    DocumentFieldModel.edited_at,
+)
 
 
 def _normalize_extension(filename: str, content_type: str | None) -> str:
@@ -26,6 +75,12 @@ def _normalize_extension(filename: str, content_type: str | None) -> str:
     return ""
 
 
+def _source_object_name(upload_id: str, filename: str, content_type: str | None) -> str:
+    extension = _normalize_extension(filename, content_type)
+    object_suffix = extension if extension else ""
+    return f"{storage.RAW_PREFIX}/{upload_id}/source{object_suffix}"
+
+
 def _validate_content_type(content_type: str | None) -> None:
     if content_type not in SUPPORTED_TYPES:
         raise HTTPException(status_code=400, detail="Unsupported file type")
@@ -35,23 +90,130 @@ async def _persist_upload(
     upload_id: str,
     file: UploadFile,
     object_name: str,
-) -> None:
-    payload = await file.read()
-    if not payload:
+) -> storage.StoredObject:
+    settings = get_settings()
+    await file.seek(0)
+    try:
+        stored = await storage.put_stream(
+            object_name=object_name,
+            stream=file.file,
+            content_type=file.content_type,
+            max_size=settings.UPLOAD_MAX_BYTES,
+        )
+    except storage.ObjectTooLargeError:
+        raise HTTPException(status_code=413, detail="File exceeds the maximum upload size")
+
+    if not stored.size:
+        await storage.remove_object(object_name)
         raise HTTPException(status_code=400, detail="Empty file provided")
-    await storage.put_object(object_name=object_name, data=payload, content_type=file.content_type)
+    return stored
+
+
+async def _find_completed_duplicates(
+    db: AsyncSession, content_hashes: Iterable[str], tenant: str | None = None
+) -> dict[str, int]:
+    """Latest completed document of ``tenant`` per content hash; other tenants' results are never reused."""
+    hashes = set(content_hashes)
+    if not hashes:
+        return {}
+    result = await db.execute(
+        select(DocumentModel.content_hash, func.max(DocumentModel.id))
+        .where(
+            DocumentModel.content_hash.in_(hashes),
+            DocumentModel.status == STATUS_COMPLETED,
+            DocumentModel.tenant == job_queue.tenant_key(tenant),
+        )
+        .group_by(DocumentModel.content_hash)
+    )
+    return {content_hash: document_id for content_hash, document_id in result.all()}
+
+
+async def _copy_fields(db: AsyncSession, originals: dict[int, int]) -> None:
+    """Copy extracted fields from original documents; ``originals`` maps new id -> original id."""
+    if not originals:
+        return
+    pairs = values(
+        column("new_id", Integer),
+        column("original_id", Integer),
+        name="duplicate_documents",
+    ).data(list(originals.items()))
+    await db.execute(
+        insert(DocumentFieldModel).from_select(
+            ["document_id", *(column_.key for column_ in _COPIED_FIELD_COLUMNS)],
+            select(pairs.c.new_id, *_COPIED_FIELD_COLUMNS).join_from(
+                DocumentFieldModel, pairs, DocumentFieldModel.document_id == pairs.c.original_id
+            ),
+        )
+    )
+
+
+async def _insert_duplicate_documents(
+    db: AsyncSession, originals: dict[str, int], tenant: str | None = None
+) -> dict[str, int]:
+    """Create documents that reuse prior results; ``originals`` maps upload_id -> original id.
+
+    Returns a mapping of upload_id -> new document id.
+    """
+    if not originals:
+        return {}
+    pairs = values(
+        column("upload_id", String),
+        column("original_id", Integer),
+        name="duplicate_uploads",
+    ).data(list(originals.items()))
+    source = select(
+        pairs.c.upload_id,
+        literal(STATUS_COMPLETED),
+        literal(job_queue.tenant_key(tenant)),
+        func.now(),
+        *(getattr(DocumentModel, name) for name in _COPIED_DOCUMENT_COLUMNS),
+    ).join_from(DocumentModel, pairs, DocumentModel.id == pairs.c.original_id)
+    result = await db.execute(
+        insert(DocumentModel)
+        .from_select(["upload_id", "status", "tenant", "finalized_at", *_COPIED_DOCUMENT_COLUMNS], source)
+        .returning(DocumentModel.id, DocumentModel.upload_id)
+    )
+    document_ids = {upload_id: document_id for document_id, upload_id in result.all()}
+    await _copy_fields(db, {document_ids[upload_id]: original_id for upload_id, original_id in originals.items()})
+    return document_ids
+
+
+async def _create_duplicate_records(
+    db: AsyncSession,
+    upload_id: str,
+    original_id: int,
+    tenant: str | None = None,
+) -> Tuple[int, JobModel]:
+    document_ids = await _insert_duplicate_documents(db, {upload_id: original_id}, tenant)
+    job = JobModel(
+        upload_id=upload_id,
+        document_id=document_ids[upload_id],
+        tenant=job_queue.tenant_key(tenant),
+        status=STATUS_COMPLETED,
+        stage=DEDUPLICATED_STAGE,
+        payload={"duplicate_of": original_id},
+    )
+    db.add(job)
+    await db.flush()
+
+    await db.commit()
+    await db.refresh(job)
+    return document_ids[upload_id], job
 
 
 async def _create_records(
     db: AsyncSession,
     upload_id: str,
     source_object: str,
+    content_hash: str | None = None,
+    tenant: str | None = None,
 ) -> Tuple[DocumentModel, JobModel]:
-    document = DocumentModel(upload_id=upload_id, source_url=source_object)
+    tenant = job_queue.tenant_key(tenant)
+    document = DocumentModel(upload_id=upload_id, source_url=source_object, content_hash=content_hash, tenant=tenant)
     db.add(document)
     await db.flush()
 
-    job = JobModel(upload_id=upload_id, document=document)
+    job = JobModel(upload_id=upload_id, document=document, tenant=tenant)
     db.add(job)
     await db.flush()
 
@@ -61,17 +223,54 @@ async def _create_records(
     return document, job
 
 
-async def handle_upload(file: UploadFile, db: AsyncSession) -> UploadResponse:
+async def handle_upload(
+    file: UploadFile, db: AsyncSession, dedupe: bool = True, tenant: str | None = None
+) -> UploadResponse:
+    """Store one upload and queue it on the interactive lane."""
     _validate_content_type(file.content_type)
+    estimated_wait = await admit_uploads(tenant)
 
     upload_id = uuid4().hex
-    extension = _normalize_extension(file.filename or "", file.content_type)
-    object_suffix = extension if extension else ""
-    object_name = f"{storage.RAW_PREFIX}/{upload_id}/source{object_suffix}"
+    object_name = _source_object_name(upload_id, file.filename or "", file.content_type)
+
+    stored = await _persist_upload(upload_id, file, object_name)
 
-    await _persist_upload(upload_id, file, object_name)
-    document, job = await _create_records(db=db, upload_id=upload_id, source_object=object_name)
-    queue_job_id = await job_queue.enqueue_pipeline_job(job_id=str(job.id), upload_id=upload_id)
+    duplicates = await _find_completed_duplicates(db, [stored.sha256], tenant) if dedupe else {}
+    original_id = duplicates.get(stored.sha256)
+    if original_id is not None:
+        await storage.remove_object(object_name)
+        document_id, job = await _create_duplicate_records(
+            db=db, upload_id=upload_id, original_id=original_id, tenant=tenant
+        )
+        source_object = await db.scalar(select(DocumentModel.source_url).where(DocumentModel.id == document_id))
+        presigned = await storage.generate_presigned_get(source_object)
+        return UploadResponse(
+            upload_id=upload_id,
+            document_id=document_id,
+            db_job_id=str(job.id),
+            queue_job_id=None,
+            source_object=source_object,
+            size_bytes=stored.size,
+            content_sha256=stored.sha256,
+            deduplicated=True,
+            duplicate_of=original_id,
+            presigned_url=presigned,
+        )
+
+    document, job = await _create_records(
+        db=db,
+        upload_id=upload_id,
+        source_object=object_name,
+        content_hash=stored.sha256,
+        tenant=tenant,
+    )
+    queue_job_id = await job_queue.enqueue_pipeline_job(
+        job_id=str(job.id),
+        upload_id=upload_id,
+        source_object=object_name,
+        lane=job_queue.LANE_INTERACTIVE,
+        tenant=tenant,
+    )
 
     presigned = await storage.generate_presigned_get(object_name)
 
@@ -81,5 +280,332 @@ async def handle_upload(file: UploadFile, db: AsyncSession) -> UploadResponse:
         db_job_id=str(job.id),
         queue_job_id=queue_job_id,
         source_object=object_name,
+        size_bytes=stored.size,
+        content_sha256=stored.sha256,
         presigned_url=presigned,
+        estimated_wait_seconds=estimated_wait,
+    )
+
+
+@dataclass
+class _BatchEntry:
+    filename: str
+    content_type: str | None
+    open_stream: Callable[[], BinaryIO] | None
+    close_stream: bool = False
+    upload_id: str = ""
+    object_name: str = ""
+    stored: storage.StoredObject | None = None
+    error: str | None = None
+
+
+def _rewind(stream: BinaryIO) -> BinaryIO:
+    stream.seek(0)
+    return stream
+
+
+def _is_archive(file: UploadFile) -> bool:
+    return file.content_type in ARCHIVE_TYPES or (file.filename or "").lower().endswith(".zip")
+
+
+def _expand_batch(files: list[UploadFile]) -> list[_BatchEntry]:
+    entries: list[_BatchEntry] = []
+    for file in files:
+        filename = file.filename or ""
+        if not _is_archive(file):
+            entries.append(_BatchEntry(filename, file.content_type, partial(_rewind, file.file)))
+            continue
+
+        try:
+            archive = zipfile.ZipFile(file.file)
+        except zipfile.BadZipFile:
+            entries.append(_BatchEntry(filename, file.content_type, None, error="Invalid zip archive"))
+            continue
+
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            content_type, _ = mimetypes.guess_type(info.filename)
+            entries.append(
+                _BatchEntry(info.filename, content_type, partial(archive.open, info), close_stream=True)
+            )
+    return entries
+
+
+async def _store_batch_entry(entry: _BatchEntry, semaphore: asyncio.Semaphore, max_size: int) -> None:
+    async with semaphore:
+        stream = entry.open_stream()
+        try:
+            entry.stored = await storage.put_stream(
+                object_name=entry.object_name,
+                stream=stream,
+                content_type=entry.content_type,
+                max_size=max_size,
+            )
+        except storage.ObjectTooLargeError:
+            entry.error = "File exceeds the maximum upload size"
+            return
+        except Exception:
+            logger.exception("Failed to store batch entry", extra={"upload_id": entry.upload_id})
+            entry.error = "Failed to store file"
+            return
+        finally:
+            if entry.close_stream:
+                stream.close()
+
+        if not entry.stored.size:
+            await storage.remove_object(entry.object_name)
+            entry.stored = None
+            entry.error = "Empty file provided"
+
+
+async def _create_batch_records(
+    db: AsyncSession,
+    fresh: list[_BatchEntry],
+    duplicates: dict[str, int],
+    tenant: str | None = None,
+) -> tuple[dict[str, int], dict[str, str]]:
+    """Insert documents and jobs for a batch in one transaction.
+
+    Returns mappings of upload_id -> document id and upload_id -> job id.
+    """
+    tenant = job_queue.tenant_key(tenant)
+    document_ids: dict[str, int] = {}
+    if fresh:
+        result = await db.execute(
+            insert(DocumentModel).returning(DocumentModel.id, DocumentModel.upload_id),
+            [
+                {
+                    "upload_id": entry.upload_id,
+                    "source_url": entry.object_name,
+                    "content_hash": entry.stored.sha256,
+                    "tenant": tenant,
+                }
+                for entry in fresh
+            ],
+        )
+        document_ids.update({upload_id: document_id for document_id, upload_id in result.all()})
+    document_ids.update(await _insert_duplicate_documents(db, duplicates, tenant))
+
+    job_ids: dict[str, str] = {}
+    if fresh:
+        result = await db.execute(
+            insert(JobModel).returning(JobModel.id, JobModel.upload_id),
+            [
+                {"upload_id": entry.upload_id, "document_id": document_ids[entry.upload_id], "tenant": tenant}
+                for entry in fresh
+            ],
+        )
+        job_ids.update({upload_id: str(job_id) for job_id, upload_id in result.all()})
+    if duplicates:
+        result = await db.execute(
+            insert(JobModel).returning(JobModel.id, JobModel.upload_id),
+            [
+                {
+                    "upload_id": upload_id,
+                    "document_id": document_ids[upload_id],
+                    "status": STATUS_COMPLETED,
+                    "stage": DEDUPLICATED_STAGE,
+                    "payload": {"duplicate_of": original_id},
+                    "tenant": tenant,
+                }
+                for upload_id, original_id in duplicates.items()
+            ],
+        )
+        job_ids.update({upload_id: str(job_id) for job_id, upload_id in result.all()})
+
+    await db.commit()
+    return document_ids, job_ids
+
+
+async def handle_batch_upload(
+    files: list[UploadFile], db: AsyncSession, dedupe: bool = True, tenant: str | None = None
+) -> BatchUploadResponse:
+    """Store a batch and queue it on the bulk lane, so it cannot hold up single uploads."""
+    settings = get_settings()
+    entries = _expand_batch(files)
+    if len(entries) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail="Too many files in batch")
+
+    for entry in entries:
+        if entry.error:
+            continue
+        if entry.content_type not in SUPPORTED_TYPES:
+            entry.error = "Unsupported file type"
+            continue
+        entry.upload_id = uuid4().hex
+        entry.object_name = _source_object_name(entry.upload_id, entry.filename, entry.content_type)
+
+    pending = [entry for entry in entries if not entry.error]
+    estimated_wait = await admit_uploads(tenant, len(pending)) if pending else None
+    if pending:
+        semaphore = asyncio.Semaphore(settings.UPLOAD_BATCH_CONCURRENCY)
+        await asyncio.gather(
+            *(_store_batch_entry(entry, semaphore, settings.UPLOAD_MAX_BYTES) for entry in pending)
+        )
+    stored = [entry for entry in pending if entry.stored is not None]
+
+    originals = (
+        await _find_completed_duplicates(db, (entry.stored.sha256 for entry in stored), tenant) if dedupe else {}
+    )
+    duplicates = {
+        entry.upload_id: originals[entry.stored.sha256] for entry in stored if entry.stored.sha256 in originals
+    }
+    fresh = [entry for entry in stored if entry.upload_id not in duplicates]
+    if duplicates:
+        await asyncio.gather(
+            *(storage.remove_object(entry.object_name) for entry in stored if entry.upload_id in duplicates)
+        )
+
+    document_ids, job_ids = await _create_batch_records(db, fresh, duplicates, tenant)
+    queue_job_ids = await job_queue.enqueue_pipeline_jobs(
+        [(job_ids[entry.upload_id], entry.upload_id, entry.object_name) for entry in fresh],
+        lane=job_queue.LANE_BULK,
+        tenant=tenant,
+    )
+    queue_job_by_upload = {entry.upload_id: queue_job_id for entry, queue_job_id in zip(fresh, queue_job_ids)}
+
+    source_objects = {entry.upload_id: entry.object_name for entry in fresh}
+    if duplicates:
+        result = await db.execute(
+            select(DocumentModel.upload_id, DocumentModel.source_url).where(
+                DocumentModel.upload_id.in_(list(duplicates))
+            )
+        )
+        source_objects.update(dict(result.all()))
+    presigned = await storage.generate_presigned_get_many(list(source_objects.values()))
+    presigned_by_upload = dict(zip(source_objects, presigned))
+
+    items: list[BatchUploadItem] = []
+    for entry in entries:
+        if entry.error:
+            items.append(BatchUploadItem(filename=entry.filename, error=entry.error))
+            continue
+        upload_id = entry.upload_id
+        items.append(
+            BatchUploadItem(
+                filename=entry.filename,
+                upload=UploadResponse(
+                    upload_id=upload_id,
+                    document_id=document_ids[upload_id],
+                    db_job_id=job_ids[upload_id],
+                    queue_job_id=queue_job_by_upload.get(upload_id),
+                    source_object=source_objects[upload_id],
+                    size_bytes=entry.stored.size,
+                    content_sha256=entry.stored.sha256,
+                    deduplicated=upload_id in duplicates,
+                    duplicate_of=duplicates.get(upload_id),
+                    presigned_url=presigned_by_upload[upload_id],
+                    estimated_wait_seconds=None if upload_id in duplicates else estimated_wait,
+                ),
+            )
+        )
+
+    accepted = sum(1 for item in items if item.upload is not None)
+    return BatchUploadResponse(items=items, accepted=accepted, failed=len(items) - accepted)
+
+
+def encode_cursor(created_at: datetime, row_id: Any) -> str:
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), row_id
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _keyset_page(statement, model, cursor: str | None, limit: int, id_type: Callable[[str], Any]):
+    """Apply ``(created_at, id)`` keyset pagination, newest first.
+
+    The cursor is a row-value comparison served straight from the composite
+    indexes, so every page costs the same regardless of depth.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        try:
+            row_id = id_type(row_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        statement = statement.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    return statement.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def _next_cursor(rows: list, limit: int) -> str | None:
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.created_at, last.id)
+
+
+async def list_documents(
+    db: AsyncSession,
+    *,
+    tenant: str,
+    limit: int,
+    cursor: str | None = None,
+    status: str | None = None,
+    doc_type: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> DocumentListResponse:
+    columns = [getattr(DocumentModel, name) for name in DocumentListItem.model_fields]
+    statement = select(*columns).where(DocumentModel.tenant == job_queue.tenant_key(tenant))
+    if status:
+        statement = statement.where(DocumentModel.status == status)
+    if doc_type:
+        statement = statement.where(DocumentModel.doc_type == doc_type)
+    if created_from:
+        statement = statement.where(DocumentModel.created_at >= created_from)
+    if created_to:
+        statement = statement.where(DocumentModel.created_at < created_to)
+
+    rows = (await db.execute(_keyset_page(statement, DocumentModel, cursor, limit, int))).all()
+    return DocumentListResponse(
+        items=[DocumentListItem.model_validate(row) for row in rows[:limit]],
+        next_cursor=_next_cursor(rows, limit),
+    )
+
+
+async def list_jobs(
+    db: AsyncSession,
+    *,
+    tenant: str,
+    limit: int,
+    cursor: str | None = None,
+    status: str | None = None,
+    stage: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> JobListResponse:
+    columns = [getattr(JobModel, name) for name in JobListItem.model_fields]
+    statement = select(*columns).where(JobModel.tenant == job_queue.tenant_key(tenant))
+    if status:
+        statement = statement.where(JobModel.status == status)
+    if stage:
+        statement = statement.where(JobModel.stage == stage)
+    if created_from:
+        statement = statement.where(JobModel.created_at >= created_from)
+    if created_to:
+        statement = statement.where(JobModel.created_at < created_to)
+
+    rows = (await db.execute(_keyset_page(statement, JobModel, cursor, limit, UUID))).all()
+    return JobListResponse(
+        items=[JobListItem.model_validate(row) for row in rows[:limit]],
+        next_cursor=_next_cursor(rows, limit),
+    )
+
+
+async def get_document_ocr(db: AsyncSession, *, tenant: str, document_id: int) -> dict[str, Any]:
+    """Full OCR payload of one of the tenant's documents, fetched from object storage on demand."""
+    document = await db.scalar(
+        select(DocumentModel).where(DocumentModel.id == document_id, DocumentModel.tenant == job_queue.tenant_key(tenant))
     )
+    payload = await ocr_payload(db, document) if document is not None else None
+    if payload is None:
+        raise HTTPException(status_code=404, detail="OCR result not found")
+    return payload
@@ -1,29 +1,68 @@
+import logging
+import time
+
+_STARTED = time.perf_counter()
+
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
-from core.database import init_models
-from documents.routes import router as upload_router
+from core import metrics, storage
+from core.config import get_settings
+from core.database import RequestSessionMiddleware
+from documents.routes import documents_router, events_router, files_router, jobs_router, router as upload_router
 from users.routes import router as guest_router, user_router
 from auth.route import router as auth_router
-from core.security import JWTAuth
+from core.events import event_broker
+from core.security import JWTAuth, hashing_pool
+from core.startup import StartupTimings, log_ready, warm_gateway
 
 from starlette.middleware.authentication import AuthenticationMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await init_models()
+    timings = StartupTimings(_STARTED)
+    timings.mark("imports")
+    await warm_gateway(timings)
+    app.state.ready = True
+    # uvicorn only configures its own loggers; report next to its startup messages.
+    log_ready("Gateway", timings, logging.getLogger("uvicorn.error"))
     yield
+    # Shutdown
+    app.state.ready = False
+    await event_broker.close()
+    hashing_pool.shutdown()
+    storage.shutdown()
 
 app = FastAPI(lifespan=lifespan)
+app.state.ready = False
 app.include_router(upload_router)
+app.include_router(documents_router)
+app.include_router(jobs_router)
+app.include_router(events_router)
+app.include_router(files_router)
 app.include_router(user_router)
 app.include_router(auth_router)
 app.include_router(guest_router)
 
 app.add_middleware(AuthenticationMiddleware, backend=JWTAuth())
+app.add_middleware(RequestSessionMiddleware)
+if get_settings().METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.register_gateway_collectors()
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        body, content_type = metrics.render()
+        return Response(content=body, media_type=content_type)
 
 @app.get("/")
 def health_check():
     return JSONResponse(content={"message": "OK"})
+
+@app.get("/ready", include_in_schema=False)
+def readiness_check():
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"message": "Starting"})
+    return JSONResponse(content={"message": "OK"})
@@ -0,0 +1,3 @@
+from services.ocr.client import OCRError, normalize, recognize
+
+__all__ = ["OCRError", "normalize", "recognize"]
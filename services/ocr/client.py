@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import urllib.error
+import urllib.request
+from typing import Any
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class OCRError(Exception):
+    """Raised when the OCR provider rejects a request or returns an unusable payload."""
+
+
+def _bbox(bounding_box: dict[str, Any] | None) -> list[int] | None:
+    vertices = (bounding_box or {}).get("vertices") or []
+    if not vertices:
+        return None
+    xs = [int(vertex.get("x", 0)) for vertex in vertices]
+    ys = [int(vertex.get("y", 0)) for vertex in vertices]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def normalize(annotation: dict[str, Any], page: int = 1) -> dict[str, Any]:
+    """Flatten a Yandex ``textAnnotation`` into line segments ``{id, bbox, text, confidence}``."""
+    segments: list[dict[str, Any]] = []
+    for block_index, block in enumerate(annotation.get("blocks") or []):
+        for line_index, line in enumerate(block.get("lines") or []):
+            text = line.get("text") or " ".join(word.get("text", "") for word in line.get("words") or [])
+            if not text.strip():
+                continue
+            segments.append(
+                {
+                    "id": f"p{page}-b{block_index}-l{line_index}",
+                    "page": page,
+                    "bbox": _bbox(line.get("boundingBox")),
+                    "text": text,
+                    "confidence": line.get("confidence"),
+                }
+            )
+    return {
+        "page": page,
+        "width": int(annotation.get("width") or 0),
+        "height": int(annotation.get("height") or 0),
+        "text": annotation.get("fullText") or "\n".join(segment["text"] for segment in segments),
+        "segments": segments,
+    }
+
+
+def recognize(image: bytes, mime_type: str = "PNG", page: int = 1) -> dict[str, Any]:
+    """Run text recognition on one image and return the normalized page payload."""
+    settings = get_settings()
+    if not settings.YANDEX_OCR_API_KEY:
+        raise OCRError("YANDEX_OCR_API_KEY is not configured")
+
+    body = json.dumps(
+        {
+            "mimeType": mime_type,
+            "languageCodes": [code.strip() for code in settings.YANDEX_OCR_LANGUAGES.split(",")],
+            "model": settings.YANDEX_OCR_MODEL,
+            "content": base64.b64encode(image).decode("ascii"),
+        }
+    ).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Api-Key {settings.YANDEX_OCR_API_KEY}",
+    }
+    if settings.YANDEX_FOLDER_ID:
+        headers["x-folder-id"] = settings.YANDEX_FOLDER_ID
+
+    request = urllib.request.Request(settings.YANDEX_OCR_URL, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=settings.OCR_TIMEOUT_SECONDS) as response:
+            payload = json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        raise OCRError(f"OCR request failed with HTTP {exc.code}") from exc
+
+    annotation = (payload.get("result") or {}).get("textAnnotation")
+    if annotation is None:
+        raise OCRError("OCR response has no textAnnotation")
+    return normalize(annotation, page=page)
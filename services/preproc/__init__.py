@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from PIL import Image
+
+from core.config import get_settings
+from services.preproc.engine import PreprocResult, preprocess
+from services.preproc.imaging import encode_png, load_image
+
+
+def rectify(data: bytes, page: int = 0) -> tuple[bytes, dict[str, Any]]:
+    """Deskew, flatten, denoise and binarize an upload into the PNG consumed by OCR.
+
+    Returns the PNG bytes and a report with the detected geometry and per-operation timings.
+    """
+    target_dpi = get_settings().PREPROC_TARGET_DPI
+    started = time.perf_counter()
+    image = load_image(data, page, target_dpi=target_dpi)
+    image.load()
+    decode_ms = (time.perf_counter() - started) * 1000
+
+    result = preprocess(image)
+
+    started = time.perf_counter()
+    output = Image.fromarray(result.image)
+    if get_settings().PREPROC_BINARIZE:
+        output = output.convert("1", dither=Image.Dither.NONE)
+    output.info["dpi"] = (result.dpi, result.dpi)
+    png = encode_png(output)
+    timings = {"decode": round(decode_ms, 3), **result.timings_ms, "encode": round((time.perf_counter() - started) * 1000, 3)}
+
+    report = {
+        "width": output.width,
+        "height": output.height,
+        "dpi": result.dpi,
+        "skew_angle": result.skew_angle,
+        "page_quad": result.page_quad,
+        "timings_ms": timings,
+        "total_ms": round(sum(timings.values()), 3),
+    }
+    return png, report
+
+
+__all__ = ["PreprocResult", "preprocess", "rectify"]
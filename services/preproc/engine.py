@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import numpy as np
+from PIL import Image
+
+from core.config import get_settings
+
+# Letter-size long edge in inches, used to infer DPI when the file carries none.
+_ASSUMED_PAGE_INCHES = 11.0
+# Metadata below this is the 72/96 DPI placeholder cameras and editors write.
+MIN_TRUSTED_DPI = 100
+_WORKING_SIDE = 512
+_SKEW_SAMPLE = 20_000
+
+
+@dataclass
+class PreprocResult:
+    image: np.ndarray
+    dpi: int
+    skew_angle: float
+    page_quad: list[list[float]] | None
+    timings_ms: dict[str, float] = field(default_factory=dict)
+
+
+class _Timings(dict):
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[name] = round(self.get(name, 0.0) + (time.perf_counter() - started) * 1000, 3)
+
+
+def to_grayscale(image: Image.Image) -> np.ndarray:
+    """8-bit luminance (ITU-R 601 weights) from Pillow's C conversion."""
+    return np.asarray(image if image.mode == "L" else image.convert("L"), dtype=np.uint8)
+
+
+def source_dpi(image: Image.Image) -> float:
+    """The file's DPI, or the DPI of a letter page filling the frame when it carries only a placeholder."""
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and float(dpi[0]) >= MIN_TRUSTED_DPI:
+        return float(dpi[0])
+    return max(image.size) / _ASSUMED_PAGE_INCHES
+
+
+def normalize_resolution(image: Image.Image, dpi: float, target_dpi: int, max_upscale: float = 1.0) -> Image.Image:
+    """Resample to ``target_dpi``; downscales freely, upscales at most ``max_upscale``, ignores ±10%."""
+    scale = min(target_dpi / dpi, max_upscale)
+    if 0.9 <= scale <= 1.1:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    resample = Image.Resampling.BOX if scale < 1 else Image.Resampling.BILINEAR
+    return image.resize(size, resample=resample)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weights = np.cumsum(histogram)
+    means = np.cumsum(histogram * np.arange(256))
+    total = weights[-1]
+    total_mean = means[-1] / total
+    background, foreground = weights, total - weights
+    denominator = background * foreground
+    between = np.divide(
+        (total_mean * background - means) ** 2,
+        denominator,
+        out=np.zeros_like(denominator),
+        where=denominator > 0,
+    )
+    return int(np.argmax(between))
+
+
+def _working_copy(gray: np.ndarray) -> tuple[np.ndarray, int]:
+    step = max(1, max(gray.shape) // _WORKING_SIDE)
+    return gray[::step, ::step], step
+
+
+def find_page_quad(gray: np.ndarray, min_area: float = 0.2) -> np.ndarray | None:
+    """Locate a bright page on a darker background as TL, TR, BR, BL corners (x, y).
+
+    Returns None when the frame border is mostly paper (flatbed scans, pre-cropped
+    photos) or the detected page is too small to be trusted.
+    """
+    small, step = _working_copy(gray)
+    mask = small > otsu_threshold(small)
+    border = np.concatenate([mask[0], mask[-1], mask[:, 0], mask[:, -1]])
+    if border.mean() > 0.5:
+        return None
+    ys, xs = np.nonzero(mask)
+    if xs.size == 0:
+        return None
+    sums, diffs = xs + ys, xs - ys
+    corners = np.array(
+        [
+            (xs[sums.argmin()], ys[sums.argmin()]),
+            (xs[diffs.argmax()], ys[diffs.argmax()]),
+            (xs[sums.argmax()], ys[sums.argmax()]),
+            (xs[diffs.argmin()], ys[diffs.argmin()]),
+        ],
+        dtype=np.float64,
+    )
+    x, y = corners[:, 0], corners[:, 1]
+    area = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+    if area < min_area * mask.size:
+        return None
+    return corners * step
+
+
+def estimate_skew(gray: np.ndarray, max_angle: float = 10.0) -> float:
+    """Angle in degrees that maximizes the variance of the horizontal ink projection."""
+    small, _ = _working_copy(gray)
+    # Otsu's dark class is ``<= threshold`` (the page is ``>`` in ``find_page_quad``); on bilevel
+    # scans every split ties at 0, so a strict ``<`` would find no ink at all.
+    ink = small <= otsu_threshold(small)
+    ys, xs = np.nonzero(ink)
+    if xs.size < 50 or xs.size == ink.size:
+        return 0.0
+    if xs.size > _SKEW_SAMPLE:
+        keep = np.random.default_rng(0).choice(xs.size, _SKEW_SAMPLE, replace=False)
+        xs, ys = xs[keep], ys[keep]
+
+    def best(angles: np.ndarray) -> float:
+        radians = np.deg2rad(angles)[:, None]
+        rows = np.rint(ys[None, :] * np.cos(radians) - xs[None, :] * np.sin(radians)).astype(np.int64)
+        rows -= rows.min(axis=1, keepdims=True)
+        width = int(rows.max()) + 1
+        offsets = (np.arange(angles.size) * width)[:, None]
+        profile = np.bincount((rows + offsets).ravel(), minlength=angles.size * width).reshape(angles.size, width)
+        return float(angles[np.argmax((profile.astype(np.float64) ** 2).sum(axis=1))])
+
+    coarse = best(np.arange(-max_angle, max_angle + 0.5, 0.5))
+    return best(np.arange(coarse - 0.5, coarse + 0.55, 0.1))
+
+
+def _homography(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """3x3 matrix mapping ``source`` points onto ``target`` points (four pairs)."""
+    rows = []
+    for (x, y), (u, v) in zip(source, target):
+        rows.append([x, y, 1, 0, 0, 0, -u * x, -u * y])
+        rows.append([0, 0, 0, x, y, 1, -v * x, -v * y])
+    solution = np.linalg.solve(np.array(rows, dtype=np.float64), target.reshape(-1))
+    return np.append(solution, 1.0).reshape(3, 3)
+
+
+def warp(gray: np.ndarray, inverse: np.ndarray, size: tuple[int, int], fill: int = 255) -> np.ndarray:
+    """Apply the inverse homography with Pillow's C bilinear resampler.
+
+    A NumPy gather-based warp measured roughly four times slower on full pages,
+    so only the transform itself is solved in NumPy.
+    """
+    coefficients = tuple((inverse / inverse[2, 2]).ravel()[:8])
+    warped = Image.fromarray(gray).transform(
+        size, Image.Transform.PERSPECTIVE, coefficients, Image.Resampling.BILINEAR, fillcolor=fill
+    )
+    return np.asarray(warped)
+
+
+def rectification_transform(
+    shape: tuple[int, int],
+    quad: np.ndarray | None,
+    skew_angle: float,
+) -> tuple[np.ndarray, tuple[int, int]] | None:
+    """Inverse homography (output -> source) that flattens ``quad`` and removes ``skew_angle``."""
+    height, width = shape
+    if quad is None:
+        quad = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float64)
+        if abs(skew_angle) < 0.1:
+            return None
+    out_w = int(round(max(np.linalg.norm(quad[1] - quad[0]), np.linalg.norm(quad[2] - quad[3]))))
+    out_h = int(round(max(np.linalg.norm(quad[3] - quad[0]), np.linalg.norm(quad[2] - quad[1]))))
+    target = np.array([[0, 0], [out_w - 1, 0], [out_w - 1, out_h - 1], [0, out_h - 1]], dtype=np.float64)
+
+    # Rotating the source corners about the page centre before fitting folds deskew into the same warp.
+    theta = np.deg2rad(skew_angle)
+    centre = quad.mean(axis=0)
+    rotation = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    rotated = (quad - centre) @ rotation.T + centre
+    inverse = _homography(target, rotated)
+    return inverse, (out_w, out_h)
+
+
+def median3(gray: np.ndarray, tile_rows: int) -> np.ndarray:
+    """3x3 median filter via a min/max sorting network over shifted views, tiled by rows."""
+    output = np.empty_like(gray)
+    padded = np.pad(gray, 1, mode="edge")
+    height, width = gray.shape
+    for start in range(0, height, tile_rows):
+        stop = min(start + tile_rows, height)
+        band = padded[start : stop + 2]
+        p = [band[dy : dy + stop - start, dx : dx + width] for dy in range(3) for dx in range(3)]
+
+        def sort(a: int, b: int) -> None:
+            p[a], p[b] = np.minimum(p[a], p[b]), np.maximum(p[a], p[b])
+
+        for a, b in (
+            (1, 2), (4, 5), (7, 8), (0, 1), (3, 4), (6, 7), (1, 2), (4, 5), (7, 8),
+            (0, 3), (5, 8), (4, 7), (3, 6), (1, 4), (2, 5), (4, 7), (4, 2), (6, 4), (4, 2),
+        ):
+            sort(a, b)
+        output[start:stop] = p[4]
+    return output
+
+
+def sauvola(gray: np.ndarray, window: int, k: float, tile_rows: int, block: int = 8) -> np.ndarray:
+    """Sauvola adaptive threshold with local statistics computed on ``block``-pixel cells.
+
+    Cell sums come from reshaped views, window sums from an integral image of the
+    (much smaller) cell grid, and the per-cell thresholds are broadcast back onto
+    the page without materializing a full-size threshold map.
+    """
+    height, width = gray.shape
+    rows, cols = -(-height // block), -(-width // block)
+    padded = np.pad(gray, ((0, rows * block - height), (0, cols * block - width)), mode="edge")
+    cells = padded.reshape(rows, block, cols, block)
+    band = max(1, tile_rows // block)
+
+    sums = np.empty((rows, cols), dtype=np.float64)
+    squares = np.empty((rows, cols), dtype=np.float64)
+    for start in range(0, rows, band):
+        view = cells[start : start + band]
+        sums[start : start + band] = view.sum(axis=(1, 3), dtype=np.uint32)
+        squares[start : start + band] = np.square(view, dtype=np.uint16).sum(axis=(1, 3), dtype=np.uint32)
+
+    radius = max(1, round(window / block)) // 2
+    span = 2 * radius + 1
+
+    def window_sum(table: np.ndarray) -> np.ndarray:
+        integral = np.pad(np.pad(table, radius, mode="edge").cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+        return integral[span:, span:] - integral[:-span, span:] - integral[span:, :-span] + integral[:-span, :-span]
+
+    area = float((span * block) ** 2)
+    mean = window_sum(sums) / area
+    deviation = np.sqrt(np.maximum(window_sum(squares) / area - mean * mean, 0))
+    threshold = (mean * (1 + k * (deviation / 128.0 - 1)))[:, None, :, None]
+
+    output = np.empty((rows, block, cols, block), dtype=np.uint8)
+    for start in range(0, rows, band):
+        np.greater(cells[start : start + band], threshold[start : start + band], out=output[start : start + band].view(bool))
+    output *= 255
+    return output.reshape(rows * block, cols * block)[:height, :width]
+
+
+def preprocess(image: Image.Image) -> PreprocResult:
+    """Run the full rectification pipeline on a decoded page."""
+    settings = get_settings()
+    timings = _Timings()
+    tile_rows = settings.PREPROC_TILE_ROWS
+
+    dpi = source_dpi(image)
+    # Pillow's luminance conversion costs less than resampling three channels, so it runs first.
+    with timings.measure("grayscale"):
+        image = image if image.mode == "L" else image.convert("L")
+    with timings.measure("dpi_normalize"):
+        image = normalize_resolution(image, dpi, settings.PREPROC_TARGET_DPI, settings.PREPROC_MAX_UPSCALE)
+        gray = to_grayscale(image)
+
+    with timings.measure("page_detect"):
+        quad = find_page_quad(gray)
+    skew = 0.0
+    if quad is None:
+        # A detected page outline already fixes the orientation; text skew is only
+        # estimated for full-frame scans.
+        with timings.measure("deskew_estimate"):
+            skew = estimate_skew(gray, settings.PREPROC_MAX_SKEW_DEGREES)
+    with timings.measure("rectify"):
+        transform = rectification_transform(gray.shape, quad, skew)
+        if transform is not None:
+            inverse, size = transform
+            gray = warp(gray, inverse, size)
+
+    with timings.measure("denoise"):
+        gray = median3(gray, tile_rows)
+    if settings.PREPROC_BINARIZE:
+        with timings.measure("binarize"):
+            gray = sauvola(gray, settings.PREPROC_SAUVOLA_WINDOW, settings.PREPROC_SAUVOLA_K, tile_rows)
+
+    return PreprocResult(
+        image=gray,
+        dpi=settings.PREPROC_TARGET_DPI,
+        skew_angle=round(skew, 2),
+        page_quad=quad.round(1).tolist() if quad is not None else None,
+        timings_ms=dict(timings),
+    )
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import io
+from typing import Iterator
+
+from PIL import Image, ImageOps
+
+from core.config import get_settings
+from services.preproc.engine import source_dpi
+
+PDF_MAGIC = b"%PDF-"
+
+
+def is_pdf(data: bytes) -> bool:
+    return data[:5] == PDF_MAGIC
+
+
+def render_pdf_page(data: bytes, index: int = 0, dpi: int | None = None) -> Image.Image:
+    import pypdfium2 as pdfium
+
+    dpi = dpi or get_settings().PDF_RENDER_DPI
+    pdf = pdfium.PdfDocument(data)
+    try:
+        page = pdf[index]
+        try:
+            image = page.render(scale=dpi / 72).to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+    image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+def load_image(data: bytes, page: int = 0, target_dpi: int | None = None) -> Image.Image:
+    """Decode an upload into a PIL image; PDFs are rasterized, TIFF frames selected by ``page``.
+
+    With ``target_dpi`` PDFs are rendered at that resolution and JPEGs are
+    decoded at the smallest DCT scale that still reaches it.
+    """
+    if is_pdf(data):
+        return render_pdf_page(data, page, target_dpi)
+    image = Image.open(io.BytesIO(data))
+    if page:
+        image.seek(page)
+    dpi = source_dpi(image)
+    if target_dpi and image.format == "JPEG" and dpi > target_dpi:
+        width = image.width
+        scale = target_dpi / dpi
+        image.draft(image.mode, (round(width * scale), round(image.height * scale)))
+        if image.width != width:
+            dpi *= image.width / width
+            image.info["dpi"] = (dpi, dpi)
+    return ImageOps.exif_transpose(image)
+
+
+def encode_png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    params = {"dpi": image.info["dpi"]} if "dpi" in image.info else {}
+    image.save(buffer, format="PNG", **params)
+    return buffer.getvalue()
+
+
+def iter_pages(data: bytes) -> Iterator[tuple[bytes, str]]:
+    """Yield each page of a multi-page upload as standalone ``(bytes, suffix)``.
+
+    PDFs are split into single-page PDFs without rendering; TIFF frames are
+    re-encoded as PNG. Single-page inputs yield nothing, so callers can keep
+    the whole-document path for them.
+    """
+    if is_pdf(data):
+        import pypdfium2 as pdfium
+
+        source = pdfium.PdfDocument(data)
+        try:
+            if len(source) < 2:
+                return
+            for index in range(len(source)):
+                target = pdfium.PdfDocument.new()
+                try:
+                    target.import_pages(source, [index])
+                    buffer = io.BytesIO()
+                    target.save(buffer)
+                finally:
+                    target.close()
+                yield buffer.getvalue(), ".pdf"
+        finally:
+            source.close()
+        return
+
+    image = Image.open(io.BytesIO(data))
+    frames = getattr(image, "n_frames", 1)
+    if frames < 2:
+        return
+    for index in range(frames):
+        image.seek(index)
+        yield encode_png(image.copy()), ".png"
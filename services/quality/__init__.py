@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import numpy as np
+
+from core.config import get_settings
+from services.quality.metrics import load_thumbnail, measure
+
+# Skew is searched slightly beyond the threshold so that failing pages are still measured.
+_SKEW_SEARCH_MARGIN = 5.0
+_BLANK_DELTA = 48
+
+
+def assess(data: bytes) -> dict[str, Any]:
+    """Measure an upload on a small thumbnail and decide whether it is worth OCR.
+
+    ``ok`` is False when any configured threshold fails; ``reasons`` lists which.
+    """
+    settings = get_settings()
+    started = time.perf_counter()
+    thumbnail, (width, height), dpi = load_thumbnail(data, settings.QUALITY_THUMBNAIL_SIZE, settings.QUALITY_PDF_DPI)
+    metrics = measure(
+        np.asarray(thumbnail),
+        max_skew=settings.QUALITY_MAX_SKEW_DEGREES + _SKEW_SEARCH_MARGIN,
+        blank_delta=_BLANK_DELTA,
+    )
+    metrics["dpi"] = round(dpi, 1)
+
+    reasons = []
+    blank = metrics["ink_ratio"] < settings.QUALITY_MIN_INK_RATIO
+    if blank:
+        reasons.append("blank_page")
+    if metrics["brightness"] < settings.QUALITY_MIN_BRIGHTNESS:
+        reasons.append("underexposed")
+    # White paper is bright by design; a page is overexposed only when the background
+    # clips and the ink washes out with it. Without ink there is no contrast to judge.
+    if not blank and metrics["contrast"] < settings.QUALITY_MIN_CONTRAST:
+        overexposed = metrics["bright_clipped"] >= settings.QUALITY_MAX_BRIGHT_CLIPPED
+        reasons.append("overexposed" if overexposed else "low_contrast")
+    if metrics["sharpness"] < settings.QUALITY_MIN_SHARPNESS:
+        reasons.append("blurry")
+    if metrics["dpi"] < settings.QUALITY_MIN_DPI:
+        reasons.append("low_resolution")
+    if abs(metrics["skew_angle"]) > settings.QUALITY_MAX_SKEW_DEGREES:
+        reasons.append("skewed")
+
+    return {
+        "ok": not reasons,
+        "reasons": reasons,
+        "width": width,
+        "height": height,
+        "bytes": len(data),
+        "thumbnail": list(thumbnail.size),
+        "metrics": metrics,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+__all__ = ["assess"]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from core.config import get_settings
+from services.preproc.engine import estimate_skew, otsu_threshold, source_dpi
+from services.preproc.imaging import is_pdf, render_pdf_page
+
+
+def load_thumbnail(data: bytes, max_side: int, pdf_dpi: int) -> tuple[Image.Image, tuple[int, int], float]:
+    """Decode only as much of the upload as a ``max_side`` grayscale thumbnail needs.
+
+    JPEGs are decoded at a reduced DCT scale and PDFs rendered at ``pdf_dpi``.
+    Returns the thumbnail, the full-resolution size and the effective DPI.
+    """
+    if is_pdf(data):
+        # PDF pages are rasterized later at PREPROC_TARGET_DPI, so that is their effective resolution.
+        target_dpi = get_settings().PREPROC_TARGET_DPI
+        image = render_pdf_page(data, 0, pdf_dpi)
+        size = (round(image.width * target_dpi / pdf_dpi), round(image.height * target_dpi / pdf_dpi))
+        return _thumbnail(image, max_side), size, float(target_dpi)
+
+    # Photos carry no usable DPI, so ``source_dpi`` assumes the page fills the frame.
+    image = Image.open(io.BytesIO(data))
+    size = image.size
+    effective_dpi = source_dpi(image)
+    return _thumbnail(image, max_side), size, effective_dpi
+
+
+def _thumbnail(image: Image.Image, max_side: int) -> Image.Image:
+    if image.format == "JPEG":
+        # Decode luminance only, at the smallest DCT scale that still covers ``max_side``.
+        image.draft("L", (max_side, max_side))
+    image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR, reducing_gap=None)
+    image = ImageOps.exif_transpose(image)
+    return image if image.mode == "L" else image.convert("L")
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian; low values mean a blurry image."""
+    values = gray.astype(np.float32)
+    laplacian = (
+        values[:-2, 1:-1] + values[2:, 1:-1] + values[1:-1, :-2] + values[1:-1, 2:] - 4 * values[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def _percentile(cumulative: np.ndarray, fraction: float) -> int:
+    return int(np.searchsorted(cumulative, fraction * cumulative[-1]))
+
+
+def _class_contrast(histogram: np.ndarray, threshold: int) -> float:
+    """Mean of the paper class minus mean of the ink class of the Otsu split.
+
+    Percentiles of the whole histogram both land on paper when ink is sparse, so
+    clean text pages would read as low contrast.
+    """
+    levels = np.arange(256)
+    dark, light = histogram[: threshold + 1], histogram[threshold + 1 :]
+    if not dark.sum() or not light.sum():
+        return 0.0
+    dark_mean = np.dot(dark, levels[: threshold + 1]) / dark.sum()
+    light_mean = np.dot(light, levels[threshold + 1 :]) / light.sum()
+    return float(light_mean - dark_mean)
+
+
+def measure(gray: np.ndarray, max_skew: float, blank_delta: int) -> dict[str, float]:
+    histogram = np.bincount(gray.ravel(), minlength=256)
+    cumulative = np.cumsum(histogram)
+    total = float(cumulative[-1])
+
+    # Ink is what is clearly darker than the paper; the Otsu split only counts when well separated.
+    # Otsu's dark class is ``gray <= threshold``: on bilevel scans every split ties and it returns 0.
+    threshold = otsu_threshold(gray)
+    paper = _percentile(cumulative, 0.9)
+    ink_threshold = min(threshold, paper - blank_delta)
+    ink = cumulative[ink_threshold] / total if ink_threshold >= 0 else 0.0
+
+    return {
+        "sharpness": round(laplacian_variance(gray), 2),
+        "brightness": round(float(np.dot(histogram, np.arange(256)) / total), 2),
+        "contrast": round(_class_contrast(histogram, threshold), 2),
+        "dark_clipped": round(float(cumulative[8] / total), 4),
+        "bright_clipped": round(float(1 - cumulative[246] / total), 4),
+        "ink_ratio": round(float(ink), 5),
+        "skew_angle": round(estimate_skew(gray, max_skew), 2),
+    }
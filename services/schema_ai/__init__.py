@@ -0,0 +1,4 @@
+from services.schema_ai.inference import SchemaInferenceError, infer_schema
+from services.schema_ai.templates import resolve_schema
+
+__all__ = ["SchemaInferenceError", "infer_schema", "resolve_schema"]
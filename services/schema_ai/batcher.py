@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from redis import Redis
+
+from services.schema_ai.client import (
+    REPLY_KEY,
+    REQUESTS_KEY,
+    InferenceBackend,
+    InferenceRequest,
+    ResponseCache,
+    personalize,
+)
+
+logger = logging.getLogger(__name__)
+
+Pending = list[tuple[str, list[InferenceRequest]]]
+
+
+class BatchServer:
+    """Collects inference requests from every worker into micro-batches.
+
+    After the first request arrives, the server waits up to ``window`` seconds
+    for up to ``batch_size`` requests. It drops requests whose caller has
+    already given up, and answers identical requests (same cache key) with
+    one model call. At most ``max_in_flight`` backend calls run at once; when
+    all are busy, nothing more is taken from the queue.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        backend: InferenceBackend,
+        cache: ResponseCache | None,
+        *,
+        batch_size: int,
+        window: float,
+        max_in_flight: int,
+        reply_ttl: int = 60,
+        metrics_interval: float = 60.0,
+    ) -> None:
+        self.redis = redis
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+        self.window = window
+        self.reply_ttl = reply_ttl
+        self.metrics_interval = metrics_interval
+        self.metrics = {"requests": 0, "batches": 0, "model_calls": 0, "cache_hits": 0, "deduplicated": 0, "expired": 0, "errors": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="inference")
+        self._slots = threading.Semaphore(max_in_flight)
+        self._metrics_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def run(self) -> None:
+        next_report = time.monotonic() + self.metrics_interval
+        try:
+            while not self._stopping.is_set():
+                try:
+                    raws = self._pull()
+                    if raws:
+                        self._handle(raws)
+                except Exception:
+                    logger.exception("Inference batch failed")
+                    time.sleep(1.0)
+                if time.monotonic() >= next_report:
+                    logger.info("Inference batch metrics", extra=dict(self.metrics))
+                    next_report = time.monotonic() + self.metrics_interval
+        finally:
+            self._executor.shutdown(wait=True)
+            logger.info("Inference batch metrics", extra=dict(self.metrics))
+
+    def _count(self, **increments: int) -> None:
+        with self._metrics_lock:
+            for name, value in increments.items():
+                self.metrics[name] += value
+
+    def _pull(self) -> list[bytes]:
+        first = self.redis.brpop([REQUESTS_KEY], timeout=1)
+        if first is None:
+            return []
+        raws = [first[1]]
+        deadline = time.monotonic() + self.window
+        while len(raws) < self.batch_size:
+            more = self.redis.rpop(REQUESTS_KEY, self.batch_size - len(raws))
+            if more:
+                raws.extend(more)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.005))
+        return raws
+
+    def _handle(self, raws: list[bytes]) -> None:
+        now = time.time()
+        groups: dict[str, list[InferenceRequest]] = {}
+        expired = 0
+        for raw in raws:
+            data = json.loads(raw)
+            if data.get("deadline", now) < now:
+                expired += 1
+                continue
+            request = InferenceRequest.from_json(data)
+            groups.setdefault(request.cache_key, []).append(request)
+
+        pending: Pending = []
+        hits = 0
+        for key, requests in groups.items():
+            cached = self.cache.get(key) if self.cache else None
+            if cached is None:
+                pending.append((key, requests))
+            else:
+                hits += len(requests)
+                self._reply(requests, response=cached)
+        unique = len(groups)
+        self._count(requests=len(raws), batches=1, cache_hits=hits, expired=expired, deduplicated=len(raws) - expired - unique)
+
+        chunks = [pending] if self.backend.batched else [[item] for item in pending]
+        for chunk in chunks:
+            if not chunk:
+                continue
+            self._slots.acquire()
+            self._executor.submit(self._run, chunk)
+
+    def _run(self, pending: Pending) -> None:
+        try:
+            try:
+                results: list[Any] = self.backend.complete_batch([requests[0] for _, requests in pending])
+            except Exception as exc:
+                results = [exc] * len(pending)
+            self._count(model_calls=1)
+            for (key, requests), result in zip(pending, results):
+                if isinstance(result, Exception):
+                    self._count(errors=len(requests))
+                    self._reply(requests, error=str(result) or type(result).__name__)
+                    continue
+                if self.cache:
+                    self.cache.set(key, result)
+                self._reply(requests, response=result)
+        except Exception:
+            logger.exception("Failed to answer inference requests")
+        finally:
+            self._slots.release()
+
+    def _reply(
+        self,
+        requests: list[InferenceRequest],
+        response: dict[str, Any] | None = None,
+        error: str | None = None,
+    ) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for request in requests:
+            key = REPLY_KEY.format(id=request.id)
+            if error is None:
+                message = {"ok": True, "response": personalize(request, response)}
+            else:
+                message = {"ok": False, "error": error}
+            pipe.lpush(key, json.dumps(message))
+            pipe.expire(key, self.reply_ttl)
+        pipe.execute()
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from core.config import get_settings
+from core.queue import get_redis_connection
+from services.schema_ai.prompts import load_prompt
+
+logger = logging.getLogger(__name__)
+
+REQUESTS_KEY = "schema_ai:requests"
+REPLY_KEY = "schema_ai:reply:{id}"
+# Per-document identifiers do not change the model's answer; they are left out of cache keys.
+VOLATILE_KEYS = frozenset({"document_id"})
+
+
+class SchemaInferenceError(Exception):
+    """Raised when the model endpoint fails or returns something that is not JSON."""
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(load_prompt(prompt).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class InferenceRequest:
+    prompt: str
+    payload: dict[str, Any]
+    model: str = ""
+    id: str = field(default_factory=lambda: uuid4().hex)
+
+    @property
+    def cache_key(self) -> str:
+        """Prompt template hash + model + hash of the normalized input."""
+        normalized = {key: value for key, value in self.payload.items() if key not in VOLATILE_KEYS}
+        digest = hashlib.sha256()
+        digest.update(prompt_hash(self.prompt).encode("ascii"))
+        digest.update(b"\0" + self.model.encode("utf-8") + b"\0")
+        digest.update(_canonical(normalized))
+        return digest.hexdigest()
+
+    def to_json(self) -> dict[str, Any]:
+        return {"id": self.id, "prompt": self.prompt, "model": self.model, "payload": self.payload}
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> InferenceRequest:
+        return cls(prompt=data["prompt"], payload=data["payload"], model=data.get("model", ""), id=data["id"])
+
+
+def personalize(request: InferenceRequest, response: dict[str, Any]) -> dict[str, Any]:
+    """Put the request's own identifiers back into a response that may come from the cache."""
+    restored = {key: request.payload[key] for key in VOLATILE_KEYS if key in response and key in request.payload}
+    return {**response, **restored} if restored else response
+
+
+class InferenceBackend:
+    """Runs model calls. ``batched`` backends take a whole micro-batch in one call."""
+
+    name = "base"
+    batched = False
+
+    def complete(self, request: InferenceRequest) -> dict[str, Any]:
+        raise NotImplementedError
+
+    def complete_batch(self, requests: list[InferenceRequest]) -> list[dict[str, Any] | Exception]:
+        results: list[dict[str, Any] | Exception] = []
+        for request in requests:
+            try:
+                results.append(self.complete(request))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+
+class HttpBackend(InferenceBackend):
+    """OpenAI-compatible chat completions endpoint (``SCHEMA_AI_URL``)."""
+
+    name = "http"
+
+    def __init__(self, url: str, api_key: str | None, timeout: float) -> None:
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def complete(self, request: InferenceRequest) -> dict[str, Any]:
+        body = _canonical(
+            {
+                "model": request.model,
+                "temperature": 0,
+                "response_format": {"type": "json_object"},
+                "messages": [
+                    {"role": "system", "content": load_prompt(request.prompt)},
+                    {"role": "user", "content": json.dumps(request.payload, ensure_ascii=False)},
+                ],
+            }
+        )
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        http_request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(http_request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+            content = payload["choices"][0]["message"]["content"]
+            return json.loads(content)
+        except urllib.error.HTTPError as exc:
+            raise SchemaInferenceError(f"Schema inference failed with HTTP {exc.code}") from exc
+        except (KeyError, IndexError, ValueError) as exc:
+            raise SchemaInferenceError("Schema inference returned an unexpected payload") from exc
+
+
+_LABEL_VALUE = re.compile(r"^\s*([^:]{2,40}?)\s*:\s*(\S.*)$")
+
+
+class StubBackend(InferenceBackend):
+    """Deterministic offline model for tests and benchmarks.
+
+    The answer depends only on the request payload. ``latency`` is paid once
+    per call, batched or not, like a server that batches on the GPU.
+    """
+
+    name = "stub"
+    batched = True
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    def _answer(self, request: InferenceRequest) -> dict[str, Any]:
+        segments = [
+            segment
+            for page in (request.payload.get("ocr_json") or {}).get("pages", [])
+            for segment in page.get("segments", [])
+        ] or request.payload.get("segments") or []
+        fields = []
+        for segment in segments:
+            found = _LABEL_VALUE.match(segment.get("text") or "")
+            if found:
+                name = re.sub(r"\W+", "_", found.group(1).strip().lower()).strip("_")
+                fields.append({"name": name, "type": "string", "required": False, "example": found.group(2), "confidence": 0.9})
+        if request.prompt.startswith("field_map"):
+            return {
+                "document_id": request.payload.get("document_id"),
+                "mappings": [{"field": item["name"], "segment_id": None, "value": item["example"], "confidence": 0.9} for item in fields],
+            }
+        return {
+            "doc_type": f"stub-{request.cache_key[:8]}",
+            "confidence": 0.9,
+            "tables": [{"name": "document", "fields": fields}],
+            "notes": ["stub backend"],
+        }
+
+    def complete_batch(self, requests: list[InferenceRequest]) -> list[dict[str, Any] | Exception]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._answer(request) for request in requests]
+
+    def complete(self, request: InferenceRequest) -> dict[str, Any]:
+        return self.complete_batch([request])[0]
+
+
+class ResponseCache:
+    """Gzipped JSON responses on disk, shared by every process on the node.
+
+    Entries expire ``ttl`` seconds after they were written. When a write pushes
+    the directory past ``max_bytes``, the least recently used entries (by
+    access time, refreshed on every hit) are removed down to 90% of the limit.
+    """
+
+    def __init__(self, directory: str | os.PathLike, ttl: float, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._size: int | None = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if time.time() - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            value = json.loads(gzip.decompress(path.read_bytes()))
+            os.utime(path, (time.time(), stat.st_mtime))
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Dropping unreadable cache entry", extra={"key": key}, exc_info=True)
+            path.unlink(missing_ok=True)
+            return None
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        path = self._path(key)
+        data = gzip.compress(_canonical(value), compresslevel=6, mtime=0)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=path.parent, suffix=".part")
+            with os.fdopen(fd, "wb") as target:
+                target.write(data)
+            os.replace(temp_name, path)
+        except OSError:
+            logger.warning("Failed to write cache entry", extra={"key": key}, exc_info=True)
+            return
+        with self._lock:
+            # The first scan already sees the entry just written.
+            self._size = self._scan_size() if self._size is None else self._size + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list[tuple[float, float, int, Path]]:
+        entries = []
+        for path in self.directory.glob("*/*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(entry[2] for entry in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(entry[2] for entry in entries)
+        target = int(self.max_bytes * 0.9)
+        now = time.time()
+        for _, mtime, size, path in entries:
+            if total > target or now - mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                total -= size
+        self._size = total
+
+
+class InferenceClient:
+    """Memoized model calls from pipeline workers.
+
+    Cache hits never reach the model. With ``SCHEMA_AI_BATCHING`` misses are
+    queued in Redis for the batch server (``python -m app_worker.inference``),
+    which groups requests from all workers into micro-batches; otherwise the
+    backend is called in-process.
+    """
+
+    def __init__(self, backend: InferenceBackend, cache: ResponseCache | None, batching: bool, timeout: float) -> None:
+        self.backend = backend
+        self.cache = cache
+        self.batching = batching
+        self.timeout = timeout
+
+    def complete(self, request: InferenceRequest) -> dict[str, Any]:
+        key = request.cache_key
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            return personalize(request, cached)
+        response = self._remote(request) if self.batching else self.backend.complete(request)
+        if self.cache:
+            self.cache.set(key, response)
+        return response
+
+    def _remote(self, request: InferenceRequest) -> dict[str, Any]:
+        redis = get_redis_connection()
+        envelope = {**request.to_json(), "deadline": time.time() + self.timeout}
+        redis.lpush(REQUESTS_KEY, json.dumps(envelope))
+        reply = redis.blpop([REPLY_KEY.format(id=request.id)], timeout=max(int(self.timeout), 1))
+        if reply is None:
+            raise SchemaInferenceError("Schema inference timed out waiting for the batch server")
+        result = json.loads(reply[1])
+        if not result.get("ok"):
+            raise SchemaInferenceError(result.get("error") or "Schema inference failed")
+        return result["response"]
+
+
+def create_backend() -> InferenceBackend | None:
+    """The backend selected by ``SCHEMA_AI_BACKEND``; None when ``http`` has no ``SCHEMA_AI_URL``."""
+    settings = get_settings()
+    if settings.SCHEMA_AI_BACKEND == "stub":
+        return StubBackend(settings.SCHEMA_AI_STUB_LATENCY_MS / 1000)
+    if settings.SCHEMA_AI_BACKEND == "http":
+        if not settings.SCHEMA_AI_URL:
+            return None
+        return HttpBackend(settings.SCHEMA_AI_URL, settings.SCHEMA_AI_API_KEY, settings.SCHEMA_AI_TIMEOUT_SECONDS)
+    raise ValueError(f"Unknown SCHEMA_AI_BACKEND: {settings.SCHEMA_AI_BACKEND!r}")
+
+
+def create_cache() -> ResponseCache | None:
+    settings = get_settings()
+    if not settings.SCHEMA_AI_CACHE_DIR:
+        return None
+    return ResponseCache(
+        settings.SCHEMA_AI_CACHE_DIR, settings.SCHEMA_AI_CACHE_TTL_SECONDS, settings.SCHEMA_AI_CACHE_MAX_BYTES
+    )
+
+
+@lru_cache(maxsize=1)
+def get_inference_client() -> InferenceClient | None:
+    settings = get_settings()
+    backend = create_backend()
+    if backend is None:
+        return None
+    return InferenceClient(backend, create_cache(), settings.SCHEMA_AI_BATCHING, settings.SCHEMA_AI_TIMEOUT_SECONDS)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from core.config import get_settings
+from services.schema_ai.client import InferenceRequest, SchemaInferenceError, get_inference_client
+from services.schema_ai.prompts import SCHEMA_INFER_PROMPT
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["SchemaInferenceError", "infer_schema"]
+
+
+def infer_schema(
+    document_id: str,
+    ocr_payload: dict[str, Any],
+    quality_summary: dict[str, Any] | None = None,
+) -> dict[str, Any] | None:
+    """Run the ``schema_infer`` prompt over OCR segments; returns None when no model is configured."""
+    client = get_inference_client()
+    if client is None:
+        logger.info("Schema inference disabled", extra={"document_id": document_id})
+        return None
+
+    request = InferenceRequest(
+        SCHEMA_INFER_PROMPT,
+        {
+            "document_id": document_id,
+            "ocr_json": {"pages": [{"page": page["page"], "segments": page["segments"]} for page in ocr_payload["pages"]]},
+            "quality_summary": quality_summary,
+        },
+        model=get_settings().SCHEMA_AI_MODEL,
+    )
+    return client.complete(request)
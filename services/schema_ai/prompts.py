@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+PROMPTS_DIR = Path(__file__).resolve().parents[2] / "prompts"
+
+SCHEMA_INFER_PROMPT = "schema_infer.md"
+FIELD_MAP_PROMPT = "field_map.md"
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    return (PROMPTS_DIR / name).read_text(encoding="utf-8")
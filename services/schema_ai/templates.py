@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from documents.fields import ExtractedField
+from documents.models import SchemaTemplateModel
+from services.schema_ai.inference import infer_schema
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w]+")
+_DIGIT = re.compile(r"\d")
+_MIN_ANCHOR_LETTERS = 3
+_MAX_CANDIDATES = 8
+
+Box = tuple[float, float, float, float]
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """Static labels of the first page and their centers, normalized to the text area.
+
+    Lines with digits are treated as filled-in values and ignored, so two copies
+    of the same form share anchors while their contents differ.
+    """
+
+    anchors: dict[str, tuple[float, float]]
+    content_box: Box
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha256("\n".join(sorted(self.anchors)).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    template_id: int
+    confidence: float
+    coverage: float
+    shared: frozenset[str]
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def _content_box(segments: list[dict[str, Any]]) -> Box | None:
+    boxes = [segment["bbox"] for segment in segments if segment.get("bbox")]
+    if not boxes:
+        return None
+    x0, y0 = min(box[0] for box in boxes), min(box[1] for box in boxes)
+    x1, y1 = max(box[2] for box in boxes), max(box[3] for box in boxes)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return float(x0), float(y0), float(x1), float(y1)
+
+
+def _relative(bbox: list[float], box: Box) -> Box:
+    x0, y0, x1, y1 = box
+    width, height = x1 - x0, y1 - y0
+    return (bbox[0] - x0) / width, (bbox[1] - y0) / height, (bbox[2] - x0) / width, (bbox[3] - y0) / height
+
+
+def _center(box: Box) -> tuple[float, float]:
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+
+def fingerprint(ocr_payload: dict[str, Any]) -> Fingerprint | None:
+    """Layout fingerprint of the first OCR page; None when it has too few anchors to be reliable."""
+    pages = ocr_payload.get("pages") or []
+    if not pages:
+        return None
+    segments = pages[0].get("segments") or []
+    content_box = _content_box(segments)
+    if content_box is None:
+        return None
+
+    anchors: dict[str, tuple[float, float]] = {}
+    for segment in segments:
+        text = _normalize_text(segment.get("text") or "")
+        if not segment.get("bbox") or _DIGIT.search(text) or sum(ch.isalpha() for ch in text) < _MIN_ANCHOR_LETTERS:
+            continue
+        anchors.setdefault(text, _center(_relative(segment["bbox"], content_box)))
+    if len(anchors) < get_settings().SCHEMA_TEMPLATE_MIN_ANCHORS:
+        return None
+    return Fingerprint(anchors=anchors, content_box=content_box)
+
+
+def score(fp: Fingerprint, template_anchors: dict[str, list[float]]) -> tuple[float, float, frozenset[str]]:
+    """Return ``(confidence, coverage, shared anchors)`` of ``fp`` against a template.
+
+    Coverage is the smaller of the shares of the template's and the page's
+    anchors that the two have in common, so a page with many labels the template
+    lacks does not match a smaller template; each shared anchor also counts by
+    how close it sits to its template position.
+    """
+    shared = frozenset(fp.anchors.keys() & template_anchors.keys())
+    if not template_anchors or not shared:
+        return 0.0, 0.0, shared
+    tolerance = get_settings().SCHEMA_TEMPLATE_GEOMETRY_TOLERANCE
+    geometry = 0.0
+    for anchor in shared:
+        (x, y), (tx, ty) = fp.anchors[anchor], template_anchors[anchor]
+        geometry += max(0.0, 1.0 - math.hypot(x - tx, y - ty) / (2 * tolerance))
+    coverage = min(len(shared) / len(template_anchors), len(shared) / len(fp.anchors))
+    return coverage * geometry / len(shared), coverage, shared
+
+
+class TemplateIndex:
+    """Process-local copy of template anchors with an inverted index, refreshed every ``ttl`` seconds.
+
+    Only anchors are cached; a matched template's schema is loaded by id.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._anchors: dict[int, dict[str, list[float]]] = {}
+        self._postings: dict[str, set[int]] = {}
+        self._loaded_at = -math.inf
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        self._loaded_at = -math.inf
+
+    def _refresh(self, session: Session) -> None:
+        rows = session.execute(select(SchemaTemplateModel.id, SchemaTemplateModel.anchors)).all()
+        postings: dict[str, set[int]] = {}
+        for template_id, anchors in rows:
+            for anchor in anchors:
+                postings.setdefault(anchor, set()).add(template_id)
+        self._anchors = dict(rows)
+        self._postings = postings
+        self._loaded_at = time.monotonic()
+
+    def match(self, session: Session, fp: Fingerprint) -> TemplateMatch | None:
+        with self._lock:
+            if time.monotonic() - self._loaded_at > self.ttl:
+                self._refresh(session)
+            anchors, postings = self._anchors, self._postings
+
+        votes: dict[int, int] = {}
+        for anchor in fp.anchors:
+            for template_id in postings.get(anchor, ()):
+                votes[template_id] = votes.get(template_id, 0) + 1
+        best: TemplateMatch | None = None
+        for template_id in sorted(votes, key=votes.get, reverse=True)[:_MAX_CANDIDATES]:
+            confidence, coverage, shared = score(fp, anchors[template_id])
+            candidate = TemplateMatch(template_id, round(confidence, 4), round(coverage, 4), shared)
+            # A form whose labels include a smaller form's labels also covers it fully;
+            # prefer the template that explains more of the page.
+            if best is None or (confidence, len(shared)) > (best.confidence, len(best.shared)):
+                best = candidate
+        return best
+
+
+_index: TemplateIndex | None = None
+
+
+def get_template_index() -> TemplateIndex:
+    global _index
+    if _index is None:
+        _index = TemplateIndex(get_settings().SCHEMA_TEMPLATE_CACHE_TTL_SECONDS)
+    return _index
+
+
+def field_boxes(schema: dict[str, Any], ocr_payload: dict[str, Any], fp: Fingerprint) -> dict[str, dict[str, Any]]:
+    """Locate each schema field's example value on the first page; fields without a match are left out."""
+    segments = [
+        (_normalize_text(segment.get("text") or ""), segment)
+        for segment in ocr_payload["pages"][0].get("segments") or []
+        if segment.get("bbox")
+    ]
+    boxes: dict[str, dict[str, Any]] = {}
+    for table in schema.get("tables") or []:
+        for field in table.get("fields") or []:
+            example = _normalize_text(str(field.get("example") or ""))
+            if not example or not field.get("name"):
+                continue
+            for text, segment in segments:
+                if example in text:
+                    boxes[field["name"]] = {
+                        "bbox": [round(value, 4) for value in _relative(segment["bbox"], fp.content_box)],
+                        "type": field.get("type"),
+                    }
+                    break
+    return boxes
+
+
+def _without_examples(schema: dict[str, Any]) -> dict[str, Any]:
+    """``schema`` without its fields' ``example`` values, which come from the document it was inferred from."""
+    tables = [
+        {**table, "fields": [{k: v for k, v in field.items() if k != "example"} for field in table.get("fields") or []]}
+        for table in schema.get("tables") or []
+    ]
+    return {**schema, "tables": tables} if "tables" in schema else dict(schema)
+
+
+def extract_fields(boxes: dict[str, dict[str, Any]], ocr_payload: dict[str, Any], fp: Fingerprint) -> list[ExtractedField]:
+    """Read field values from the segments whose centers fall inside each template field box."""
+    tolerance = get_settings().SCHEMA_TEMPLATE_GEOMETRY_TOLERANCE
+    segments = [segment for segment in ocr_payload["pages"][0].get("segments") or [] if segment.get("bbox")]
+    fields = []
+    for name, box in boxes.items():
+        x0, y0, x1, y1 = box["bbox"]
+        hits = []
+        for segment in segments:
+            x, y = _center(_relative(segment["bbox"], fp.content_box))
+            if x0 - tolerance <= x <= x1 + tolerance and y0 - tolerance <= y <= y1 + tolerance:
+                hits.append(segment)
+        if not hits:
+            continue
+        hits.sort(key=lambda segment: (segment["bbox"][1], segment["bbox"][0]))
+        confidences = [segment["confidence"] for segment in hits if segment.get("confidence") is not None]
+        fields.append(
+            ExtractedField(
+                name=name,
+                value=" ".join(segment["text"] for segment in hits),
+                field_type=box.get("type"),
+                bbox=[round(value, 4) for value in _relative(hits[0]["bbox"], fp.content_box)]
+                if len(hits) == 1
+                else box["bbox"],
+                confidence=min(confidences) if confidences else None,
+            )
+        )
+    return fields
+
+
+def record_hit(session: Session, template: SchemaTemplateModel, match: TemplateMatch) -> None:
+    """Count the hit. The caller commits.
+
+    Anchors are kept as learned: narrowing them to what one page shared would let
+    a single off-form page shrink the template until unrelated pages match it.
+    """
+    values: dict[str, Any] = {
+        "hits": SchemaTemplateModel.hits + 1,
+        "confidence_sum": SchemaTemplateModel.confidence_sum + match.confidence,
+        "last_hit_at": datetime.now(timezone.utc),
+    }
+    session.execute(update(SchemaTemplateModel).where(SchemaTemplateModel.id == template.id).values(**values))
+
+
+def learn_template(session: Session, fp: Fingerprint, schema: dict[str, Any], ocr_payload: dict[str, Any]) -> None:
+    """Store an inferred schema as a template when the model was confident enough. The caller commits."""
+    if float(schema.get("confidence") or 0) < get_settings().SCHEMA_TEMPLATE_LEARN_MIN_CONFIDENCE:
+        return
+    statement = (
+        insert(SchemaTemplateModel)
+        .values(
+            fingerprint=fp.key,
+            doc_type=schema.get("doc_type"),
+            anchors={anchor: [round(x, 4), round(y, 4)] for anchor, (x, y) in fp.anchors.items()},
+            # Templates are shared by all tenants, so nothing read off this document is kept.
+            schema_json=_without_examples(schema),
+            field_boxes=field_boxes(schema, ocr_payload, fp),
+        )
+        .on_conflict_do_nothing(index_elements=[SchemaTemplateModel.fingerprint])
+    )
+    if session.execute(statement).rowcount:
+        logger.info("Learned schema template", extra={"doc_type": schema.get("doc_type"), "anchors": len(fp.anchors)})
+        get_template_index().invalidate()
+
+
+def resolve_schema(
+    session: Session,
+    document_id: str,
+    ocr_payload: dict[str, Any],
+    quality_summary: dict[str, Any] | None = None,
+) -> tuple[dict[str, Any] | None, list[ExtractedField], dict[str, Any]]:
+    """Reuse the schema of a confidently matching template, else run inference and learn from it.
+
+    Returns ``(schema, fields, report)``: ``fields`` are read through the
+    template's field boxes on a hit (empty otherwise) and ``report`` records
+    whether a template was hit and the best match confidence. The caller commits.
+    """
+    settings = get_settings()
+    report: dict[str, Any] = {"hit": False, "template_id": None, "confidence": None}
+    fp = fingerprint(ocr_payload) if settings.SCHEMA_TEMPLATES_ENABLED else None
+    if fp is not None:
+        match = get_template_index().match(session, fp)
+        if match is not None:
+            report.update(template_id=match.template_id, confidence=match.confidence, coverage=match.coverage)
+        if match is not None and match.confidence >= settings.SCHEMA_TEMPLATE_MIN_CONFIDENCE:
+            template = session.get(SchemaTemplateModel, match.template_id)
+            if template is not None:
+                record_hit(session, template, match)
+                # Templates learned before examples were stripped may still carry them.
+                schema = {
+                    **_without_examples(template.schema_json),
+                    "template": {"id": template.id, "confidence": match.confidence},
+                }
+                report["hit"] = True
+                return schema, extract_fields(template.field_boxes or {}, ocr_payload, fp), report
+
+    schema = infer_schema(document_id, ocr_payload, quality_summary=quality_summary)
+    if schema is not None and fp is not None:
+        learn_template(session, fp, schema, ocr_payload)
+    return schema, [], report
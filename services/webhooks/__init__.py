@@ -0,0 +1,3 @@
+from services.webhooks.outbox import enqueue_webhook_sync, webhook_event
+
+__all__ = ["enqueue_webhook_sync", "webhook_event"]
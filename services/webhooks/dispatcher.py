@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from core.config import get_settings
+from services.webhooks.outbox import DEAD_LETTER_KEY, METRICS_KEY, PENDING_KEY, PROCESSING_KEY, RETRY_KEY
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429})
+_PROMOTE_LIMIT = 500
+
+Item = tuple[bytes, dict[str, Any]]
+
+
+def backoff_delay(attempts: int, base: float, cap: float, retry_after: float | None = None) -> float:
+    """Exponential backoff with equal jitter: half the ceiling fixed, half random.
+
+    A ``Retry-After`` from the endpoint is honoured up to ``cap``.
+    """
+    ceiling = min(cap, base * 2 ** max(attempts - 1, 0))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+def is_retryable(status: int | None) -> bool:
+    """Network errors, timeouts, throttling and 5xx are retried; other responses are final."""
+    return status is None or status >= 500 or status in RETRYABLE_STATUSES
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    try:
+        return max(float(response.headers["Retry-After"]), 0.0)
+    except (KeyError, ValueError):
+        return None
+
+
+def create_client() -> httpx.AsyncClient:
+    """Shared keep-alive client; ``WEBHOOK_MAX_CONNECTIONS`` bounds sockets across all endpoints."""
+    settings = get_settings()
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.WEBHOOK_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WEBHOOK_MAX_KEEPALIVE,
+        ),
+        headers={"User-Agent": f"{settings.PROJECT_NAME}-webhooks/{settings.PROJECT_VERSION}"},
+    )
+
+
+@dataclass(frozen=True)
+class DispatcherConfig:
+    consumer: str
+    max_in_flight: int = 100
+    per_host: int = 4
+    batch_size: int = 1
+    batch_window: float = 0.2
+    max_attempts: int = 8
+    backoff_base: float = 2.0
+    backoff_max: float = 600.0
+    dead_letter_max: int = 10000
+    poll_interval: float = 1.0
+    metrics_interval: float = 60.0
+
+    @classmethod
+    def from_settings(cls, consumer: str) -> DispatcherConfig:
+        settings = get_settings()
+        return cls(
+            consumer=consumer,
+            max_in_flight=settings.WEBHOOK_MAX_CONNECTIONS,
+            per_host=settings.WEBHOOK_PER_HOST_CONCURRENCY,
+            batch_size=settings.WEBHOOK_BATCH_SIZE,
+            batch_window=settings.WEBHOOK_BATCH_WINDOW_MS / 1000,
+            max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+            backoff_base=settings.WEBHOOK_BACKOFF_BASE_SECONDS,
+            backoff_max=settings.WEBHOOK_BACKOFF_MAX_SECONDS,
+            dead_letter_max=settings.WEBHOOK_DEAD_LETTER_MAX,
+            metrics_interval=settings.WEBHOOK_METRICS_INTERVAL_SECONDS,
+        )
+
+
+@dataclass
+class DeliveryMetrics:
+    delivered: int = 0
+    requests: int = 0
+    failed_requests: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    latency_ms_total: float = 0.0
+    latency_ms_max: float = 0.0
+    statuses: dict[str, int] = field(default_factory=dict)
+
+    def observe(self, status: int | None, latency_ms: float, events: int) -> None:
+        self.requests += 1
+        self.latency_ms_total += latency_ms
+        self.latency_ms_max = max(self.latency_ms_max, latency_ms)
+        key = str(status) if status is not None else "error"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is not None and 200 <= status < 300:
+            self.delivered += events
+        else:
+            self.failed_requests += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "delivered": self.delivered,
+            "requests": self.requests,
+            "failed_requests": self.failed_requests,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "latency_ms_avg": round(self.latency_ms_total / self.requests, 2) if self.requests else 0.0,
+            "latency_ms_max": round(self.latency_ms_max, 2),
+            **{f"status_{key}": count for key, count in sorted(self.statuses.items())},
+        }
+
+
+class WebhookDispatcher:
+    """Delivers queued webhook events from Redis over one pooled HTTP client.
+
+    Deliveries are moved atomically from ``webhooks:pending`` to this
+    consumer's processing list and only removed once acknowledged, retried or
+    dead-lettered, so anything in flight during a crash is re-queued by
+    :meth:`run` on the next start (delivery is at-least-once; receivers can
+    de-duplicate on the event ``id``). Failed deliveries wait in the
+    ``webhooks:retry`` sorted set until their backoff expires.
+    """
+
+    def __init__(self, redis: Redis, client: httpx.AsyncClient, config: DispatcherConfig) -> None:
+        self.redis = redis
+        self.client = client
+        self.config = config
+        self.metrics = DeliveryMetrics()
+        self._processing = PROCESSING_KEY.format(consumer=config.consumer)
+        self._slots = asyncio.Semaphore(config.max_in_flight)
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self, shutdown_timeout: float = 30.0) -> None:
+        """Consume until :meth:`stop`; then give in-flight requests ``shutdown_timeout`` seconds."""
+        recovered = await self._recover()
+        if recovered:
+            logger.info("Re-queued unacknowledged webhooks", extra={"count": recovered})
+        background = [asyncio.create_task(self._promote_due()), asyncio.create_task(self._report_metrics())]
+        try:
+            await self._consume()
+        finally:
+            if self._tasks:
+                await asyncio.wait(self._tasks, timeout=shutdown_timeout)
+            pending = [*background, *self._tasks]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await self._flush_metrics()
+
+    async def _recover(self) -> int:
+        count = 0
+        while await self.redis.lmove(self._processing, PENDING_KEY, "LEFT", "RIGHT") is not None:
+            count += 1
+        return count
+
+    async def _pull(self) -> list[bytes]:
+        first = await self.redis.blmove(PENDING_KEY, self._processing, self.config.poll_interval, "RIGHT", "LEFT")
+        if first is None:
+            return []
+        raws = [first]
+        if self.config.batch_size > 1:
+            # Give completions that finish together a moment to arrive, then take them in one round trip.
+            await asyncio.sleep(self.config.batch_window)
+            pipe = self.redis.pipeline(transaction=False)
+            for _ in range(self.config.batch_size - 1):
+                pipe.lmove(PENDING_KEY, self._processing, "RIGHT", "LEFT")
+            raws.extend(raw for raw in await pipe.execute() if raw is not None)
+        return raws
+
+    def _group(self, raws: list[bytes]) -> tuple[dict[str, list[Item]], list[bytes]]:
+        groups: dict[str, list[Item]] = {}
+        invalid = []
+        for raw in raws:
+            try:
+                item = json.loads(raw)
+                url = item["url"]
+            except (ValueError, KeyError, TypeError):
+                invalid.append(raw)
+                continue
+            groups.setdefault(url, []).append((raw, item))
+        return groups, invalid
+
+    async def _consume(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                raws = await self._pull()
+            except Exception:
+                logger.warning("Failed to read webhook queue", exc_info=True)
+                await asyncio.sleep(self.config.poll_interval)
+                continue
+            groups, invalid = self._group(raws)
+            if invalid:
+                await self._dead_letter_invalid(invalid)
+            for url, items in groups.items():
+                await self._slots.acquire()
+                task = asyncio.create_task(self._deliver(url, items))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, url: str, items: list[Item]) -> None:
+        try:
+            events = [{"id": item["id"], **item["event"]} for _, item in items]
+            body = events[0] if len(events) == 1 else {"events": events}
+            limit = self._hosts.setdefault(urlsplit(url).netloc, asyncio.Semaphore(self.config.per_host))
+            status = retry_after = error = None
+            started = time.perf_counter()
+            try:
+                async with limit:
+                    response = await self.client.post(url, json=body)
+                status = response.status_code
+                retry_after = _retry_after(response)
+            except httpx.HTTPError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            self.metrics.observe(status, (time.perf_counter() - started) * 1000, len(items))
+
+            if status is not None and 200 <= status < 300:
+                await self._ack(items)
+            else:
+                await self._fail(items, status, error, retry_after)
+        except Exception:
+            logger.exception("Webhook delivery bookkeeping failed", extra={"url": url})
+        finally:
+            self._slots.release()
+
+    async def _ack(self, items: list[Item]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for raw, _ in items:
+            pipe.lrem(self._processing, 1, raw)
+        await pipe.execute()
+
+    async def _fail(self, items: list[Item], status: int | None, error: str | None, retry_after: float | None) -> None:
+        config = self.config
+        now = time.time()
+        retry = is_retryable(status)
+        pipe = self.redis.pipeline(transaction=True)
+        for raw, item in items:
+            item = {**item, "attempts": item.get("attempts", 0) + 1, "last_status": status, "last_error": error}
+            if retry and item["attempts"] < config.max_attempts:
+                delay = backoff_delay(item["attempts"], config.backoff_base, config.backoff_max, retry_after)
+                pipe.zadd(RETRY_KEY, {json.dumps(item): now + delay})
+                self.metrics.retried += 1
+            else:
+                pipe.lpush(DEAD_LETTER_KEY, json.dumps({**item, "dead_at": now}))
+                self.metrics.dead_lettered += 1
+                logger.error(
+                    "Webhook dead-lettered",
+                    extra={"url": item["url"], "id": item["id"], "attempts": item["attempts"], "status": status},
+                )
+            pipe.lrem(self._processing, 1, raw)
+        pipe.ltrim(DEAD_LETTER_KEY, 0, config.dead_letter_max - 1)
+        await pipe.execute()
+
+    async def _dead_letter_invalid(self, raws: list[bytes]) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        for raw in raws:
+            pipe.lpush(DEAD_LETTER_KEY, raw)
+            pipe.lrem(self._processing, 1, raw)
+        pipe.ltrim(DEAD_LETTER_KEY, 0, self.config.dead_letter_max - 1)
+        await pipe.execute()
+        self.metrics.dead_lettered += len(raws)
+        logger.error("Dead-lettered malformed webhook entries", extra={"count": len(raws)})
+
+    async def _promote_batch(self) -> int:
+        """Move up to ``_PROMOTE_LIMIT`` due retries onto the pending list; returns how many.
+
+        The read is watched, so when another dispatcher promotes (or anything else
+        changes the retry set) first, the transaction aborts and the read is
+        repeated instead of pushing the same deliveries twice.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(RETRY_KEY)
+                    due = await pipe.zrangebyscore(RETRY_KEY, "-inf", time.time(), start=0, num=_PROMOTE_LIMIT)
+                    if not due:
+                        return 0
+                    pipe.multi()
+                    pipe.zrem(RETRY_KEY, *due)
+                    pipe.lpush(PENDING_KEY, *due)
+                    await pipe.execute()
+                    return len(due)
+                except WatchError:
+                    continue
+
+    async def _promote_due(self) -> None:
+        """Move retries whose backoff has expired back onto the pending list."""
+        while True:
+            try:
+                while await self._promote_batch() == _PROMOTE_LIMIT:
+                    pass
+            except Exception:
+                logger.warning("Failed to promote webhook retries", exc_info=True)
+            await asyncio.sleep(self.config.poll_interval)
+
+    async def _flush_metrics(self) -> None:
+        snapshot = self.metrics.snapshot()
+        logger.info("Webhook delivery metrics", extra={"consumer": self.config.consumer, **snapshot})
+        try:
+            await self.redis.hset(METRICS_KEY.format(consumer=self.config.consumer), mapping=snapshot)
+        except Exception:
+            logger.warning("Failed to store webhook metrics", exc_info=True)
+
+    async def _report_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.metrics_interval)
+            await self._flush_metrics()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Any
+from uuid import uuid4
+
+from core.queue import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "webhooks:pending"
+RETRY_KEY = "webhooks:retry"
+DEAD_LETTER_KEY = "webhooks:dead"
+PROCESSING_KEY = "webhooks:processing:{consumer}"
+METRICS_KEY = "webhooks:metrics:{consumer}"
+
+
+def webhook_event(
+    status: str,
+    *,
+    job_id: str,
+    upload_id: str,
+    document_id: int | None,
+    stage: str | None,
+    doc_type: str | None = None,
+) -> dict[str, Any]:
+    return {
+        "event": f"job.{status}",
+        "job_id": job_id,
+        "upload_id": upload_id,
+        "document_id": document_id,
+        "status": status,
+        "stage": stage,
+        "doc_type": doc_type,
+        "ts": time.time(),
+    }
+
+
+def delivery(url: str, event: dict[str, Any]) -> dict[str, Any]:
+    """Envelope stored in Redis; ``attempts`` grows on every failed POST."""
+    return {"id": uuid4().hex, "url": url, "event": event, "attempts": 0, "created_at": time.time()}
+
+
+def enqueue_webhook_sync(url: str, event: dict[str, Any]) -> None:
+    """Queue ``event`` for the webhook dispatcher. Failures are logged, never raised.
+
+    Pipeline workers only push to Redis; the HTTP call happens in the
+    dispatcher process so a slow endpoint never holds a worker slot.
+    """
+    try:
+        get_redis_connection().lpush(PENDING_KEY, json.dumps(delivery(url, event)))
+    except Exception:
+        logger.warning("Failed to queue webhook", extra={"url": url, "event": event.get("event")}, exc_info=True)
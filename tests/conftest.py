@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+import os
+
+from bench.standins import STANDIN_ENV
+
+# Settings need connection values to load; tests never connect to anything.
+for name, value in STANDIN_ENV.items():
+    os.environ.setdefault(name, value)
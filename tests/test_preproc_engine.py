@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from services.preproc.engine import estimate_skew, normalize_resolution, source_dpi
+
+
+def _bilevel_page(angle: float) -> np.ndarray:
+    page = Image.new("1", (1200, 1600), 1)
+    draw = ImageDraw.Draw(page)
+    for top in range(150, 1450, 40):
+        draw.rectangle([150, top, 1050, top + 12], fill=0)
+    return np.asarray(page.rotate(angle, resample=Image.Resampling.NEAREST, fillcolor=1).convert("L"))
+
+
+def test_estimate_skew_on_bilevel_page():
+    assert abs(abs(estimate_skew(_bilevel_page(4.0))) - 4.0) < 0.5
+
+
+def test_estimate_skew_on_uniform_page_is_zero():
+    assert estimate_skew(np.zeros((400, 300), dtype=np.uint8)) == 0.0
+    assert estimate_skew(np.full((400, 300), 255, dtype=np.uint8)) == 0.0
+
+
+def test_placeholder_dpi_is_ignored():
+    photo = Image.new("RGB", (4032, 3024), "white")
+    photo.info["dpi"] = (72, 72)
+
+    assert source_dpi(photo) == 4032 / 11.0
+
+
+def test_normalize_resolution_does_not_upscale_by_default():
+    page = Image.new("L", (1275, 1650), 255)
+
+    assert normalize_resolution(page, 150, 300).size == (1275, 1650)
+    assert normalize_resolution(page, 150, 300, max_upscale=2.0).size == (2550, 3300)
+    assert normalize_resolution(page, 600, 300).size == (638, 825)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from services.quality import assess
+from services.quality.metrics import measure
+
+
+def _bilevel_page() -> Image.Image:
+    """A 1-bit text-like page: black bars on white, about a quarter ink."""
+    page = Image.new("1", (1700, 2200), 1)
+    draw = ImageDraw.Draw(page)
+    for top in range(150, 2050, 40):
+        draw.rectangle([120, top, 1580, top + 14], fill=0)
+    return page
+
+
+def _text_page(paper: int, ink: int, lines: int) -> bytes:
+    """A 300 dpi letter page with a few lines of anti-aliased text."""
+    page = Image.new("L", (2550, 3300), paper)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=28)
+    for line in range(lines):
+        draw.text((200, 200 + line * 60), "The quick brown fox jumps over the lazy dog", fill=ink, font=font)
+    buffer = io.BytesIO()
+    page.save(buffer, "PNG", dpi=(300, 300))
+    return buffer.getvalue()
+
+
+def test_measure_counts_ink_on_two_level_histogram():
+    gray = np.asarray(_bilevel_page().convert("L"))
+    expected = float((gray == 0).mean())
+
+    metrics = measure(gray, max_skew=12.0, blank_delta=40)
+
+    assert metrics["ink_ratio"] == round(expected, 5)
+
+
+def test_bilevel_tiff_is_not_rejected_as_blank():
+    buffer = io.BytesIO()
+    _bilevel_page().save(buffer, "TIFF", dpi=(300, 300))
+
+    result = assess(buffer.getvalue())
+
+    assert "blank_page" not in result["reasons"]
+    assert result["metrics"]["ink_ratio"] > 0.2
+
+
+def test_white_page_is_blank():
+    gray = np.full((400, 300), 255, dtype=np.uint8)
+
+    assert measure(gray, max_skew=12.0, blank_delta=40)["ink_ratio"] == 0.0
+
+
+def test_sparse_text_on_off_white_paper_passes():
+    result = assess(_text_page(paper=250, ink=20, lines=20))
+
+    assert result["ok"], result["reasons"]
+    assert result["metrics"]["contrast"] > 80
+
+
+def test_text_on_pure_white_paper_passes():
+    result = assess(_text_page(paper=255, ink=0, lines=20))
+
+    assert result["ok"], result["reasons"]
+
+
+def test_washed_out_text_on_clipped_paper_is_overexposed():
+    result = assess(_text_page(paper=255, ink=170, lines=20))
+
+    assert "overexposed" in result["reasons"]
+    assert "low_contrast" not in result["reasons"]
+
+
+def test_faint_text_on_gray_paper_is_low_contrast():
+    result = assess(_text_page(paper=200, ink=120, lines=20))
+
+    assert "low_contrast" in result["reasons"]
+    assert "overexposed" not in result["reasons"]
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from services.schema_ai import client as client_module
+from services.schema_ai.batcher import BatchServer
+from services.schema_ai.client import (
+    REPLY_KEY,
+    REQUESTS_KEY,
+    InferenceBackend,
+    InferenceClient,
+    InferenceRequest,
+    ResponseCache,
+    SchemaInferenceError,
+    StubBackend,
+)
+from services.schema_ai.prompts import FIELD_MAP_PROMPT, SCHEMA_INFER_PROMPT
+
+
+def _request(document_id: str, text: str = "Invoice no: 42", prompt: str = SCHEMA_INFER_PROMPT) -> InferenceRequest:
+    return InferenceRequest(prompt, {"document_id": document_id, "segments": [{"text": text}]}, model="test")
+
+
+def _envelope(request: InferenceRequest, deadline_in: float = 30.0) -> bytes:
+    return json.dumps({**request.to_json(), "deadline": time.time() + deadline_in}).encode()
+
+
+def _reply(redis, request: InferenceRequest) -> dict | None:
+    raw = redis.lpop(REPLY_KEY.format(id=request.id))
+    return json.loads(raw) if raw is not None else None
+
+
+class SlowBackend(InferenceBackend):
+    """One request per call; records how many calls overlap."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def complete(self, request: InferenceRequest) -> dict:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+        return {"doc_type": request.payload["segments"][0]["text"]}
+
+
+# ResponseCache
+
+
+def test_cache_returns_stored_response(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=1 << 20)
+    cache.set("ab" * 32, {"doc_type": "invoice"})
+
+    assert cache.get("ab" * 32) == {"doc_type": "invoice"}
+    assert cache.get("cd" * 32) is None
+
+
+def test_cache_entries_expire_after_ttl(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=1 << 20)
+    key = "ab" * 32
+    cache.set(key, {"doc_type": "invoice"})
+    path = cache._path(key)
+    written = time.time() - 61
+    os.utime(path, (written, written))
+
+    assert cache.get(key) is None
+    assert not path.exists()
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    keys = ["aa" * 32, "bb" * 32, "cc" * 32]
+    probe = ResponseCache(tmp_path / "probe", ttl=60, max_bytes=1 << 20)
+    probe.set(keys[0], {"value": "x" * 10})
+    entry_size = probe._path(keys[0]).stat().st_size
+    cache = ResponseCache(tmp_path / "cache", ttl=60, max_bytes=int(entry_size * 2.5))
+    cache.set(keys[0], {"value": "x" * 10})
+    cache.set(keys[1], {"value": "y" * 10})
+    now = time.time()
+    for age, key in ((20, keys[0]), (10, keys[1])):
+        os.utime(cache._path(key), (now - age, now - age))
+
+    assert cache.get(keys[0]) is not None  # a hit makes the oldest entry the most recently used
+    cache.set(keys[2], {"value": "z" * 10})
+
+    assert [cache._path(key).exists() for key in keys] == [True, False, True]
+
+
+def test_cache_key_ignores_volatile_identifiers():
+    assert _request("doc-1").cache_key == _request("doc-2").cache_key
+    assert _request("doc-1").cache_key != _request("doc-1", text="Invoice no: 43").cache_key
+    assert _request("doc-1").cache_key != _request("doc-1", prompt=FIELD_MAP_PROMPT).cache_key
+
+
+# InferenceClient
+
+
+def test_client_serves_repeats_from_cache_with_their_own_document_id(tmp_path):
+    backend = StubBackend()
+    client = InferenceClient(backend, ResponseCache(tmp_path, ttl=60, max_bytes=1 << 20), batching=False, timeout=5)
+
+    first = client.complete(_request("doc-1", prompt=FIELD_MAP_PROMPT))
+    second = client.complete(_request("doc-2", prompt=FIELD_MAP_PROMPT))
+
+    assert backend.calls == 1
+    assert (first["document_id"], second["document_id"]) == ("doc-1", "doc-2")
+    assert first["mappings"] == second["mappings"]
+
+
+def test_client_without_cache_calls_backend_every_time():
+    backend = StubBackend()
+    client = InferenceClient(backend, None, batching=False, timeout=5)
+
+    client.complete(_request("doc-1"))
+    client.complete(_request("doc-1"))
+
+    assert backend.calls == 2
+
+
+def test_batching_client_is_answered_by_batch_server(monkeypatch):
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(client_module, "get_redis_connection", lambda: redis)
+    backend = StubBackend()
+    server = BatchServer(redis, backend, None, batch_size=4, window=0.01, max_in_flight=2)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        response = InferenceClient(backend, None, batching=True, timeout=5).complete(_request("doc-1"))
+    finally:
+        server.stop()
+        thread.join(5)
+
+    assert response["tables"][0]["fields"][0]["example"] == "42"
+    assert backend.calls == 1
+
+
+def test_batching_client_times_out_without_batch_server(monkeypatch):
+    monkeypatch.setattr(client_module, "get_redis_connection", lambda: fakeredis.FakeRedis())
+
+    with pytest.raises(SchemaInferenceError, match="timed out"):
+        InferenceClient(StubBackend(), None, batching=True, timeout=1).complete(_request("doc-1"))
+
+
+# BatchServer
+
+
+def test_batch_server_answers_identical_requests_with_one_model_call():
+    redis = fakeredis.FakeRedis()
+    backend = StubBackend()
+    server = BatchServer(redis, backend, None, batch_size=8, window=0.01, max_in_flight=2)
+    requests = [
+        _request("doc-1", prompt=FIELD_MAP_PROMPT),
+        _request("doc-2", prompt=FIELD_MAP_PROMPT),
+        _request("doc-3", text="Total: 7", prompt=FIELD_MAP_PROMPT),
+    ]
+
+    server._handle([_envelope(request) for request in requests])
+    server._executor.shutdown(wait=True)
+
+    replies = [_reply(redis, request) for request in requests]
+    assert backend.calls == 1
+    assert server.metrics["deduplicated"] == 1
+    assert [reply["response"]["document_id"] for reply in replies] == ["doc-1", "doc-2", "doc-3"]
+    assert replies[0]["response"]["mappings"] == replies[1]["response"]["mappings"]
+
+
+def test_batch_server_drops_requests_past_their_deadline():
+    redis = fakeredis.FakeRedis()
+    backend = StubBackend()
+    server = BatchServer(redis, backend, None, batch_size=8, window=0.01, max_in_flight=2)
+    expired, live = _request("doc-1"), _request("doc-2", text="Total: 7")
+
+    server._handle([_envelope(expired, deadline_in=-1), _envelope(live)])
+    server._executor.shutdown(wait=True)
+
+    assert _reply(redis, expired) is None
+    assert _reply(redis, live)["ok"]
+    assert server.metrics["expired"] == 1
+    assert backend.calls == 1
+
+
+def test_batch_server_answers_cached_requests_without_the_model(tmp_path):
+    redis = fakeredis.FakeRedis()
+    backend = StubBackend()
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=1 << 20)
+    request = _request("doc-1")
+    cache.set(request.cache_key, {"doc_type": "cached"})
+    server = BatchServer(redis, backend, cache, batch_size=8, window=0.01, max_in_flight=2)
+
+    server._handle([_envelope(request)])
+    server._executor.shutdown(wait=True)
+
+    assert _reply(redis, request)["response"] == {"doc_type": "cached"}
+    assert backend.calls == 0
+    assert server.metrics["cache_hits"] == 1
+
+
+def test_batch_server_bounds_backend_calls_in_flight():
+    redis = fakeredis.FakeRedis()
+    backend = SlowBackend(latency=0.05)
+    server = BatchServer(redis, backend, None, batch_size=8, window=0.01, max_in_flight=2)
+    requests = [_request(f"doc-{number}", text=f"Total: {number}") for number in range(6)]
+
+    server._handle([_envelope(request) for request in requests])
+    server._executor.shutdown(wait=True)
+
+    assert all(_reply(redis, request)["ok"] for request in requests)
+    assert backend.max_active == 2
+    assert server.metrics["model_calls"] == 6
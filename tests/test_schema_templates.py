@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from services.schema_ai.templates import Fingerprint, learn_template, score
+
+
+def _fingerprint(labels: list[str]) -> Fingerprint:
+    return Fingerprint(anchors={label: (0.1, 0.05 * i) for i, label in enumerate(labels)}, content_box=(0, 0, 1, 1))
+
+
+def _template(labels: list[str]) -> dict[str, list[float]]:
+    return {label: [0.1, 0.05 * i] for i, label in enumerate(labels)}
+
+
+def test_page_with_many_extra_labels_does_not_match_smaller_template():
+    template = [f"label {chr(97 + i)}" for i in range(5)]
+    page = template + [f"other {chr(97 + i)}" for i in range(15)]
+    confidence, coverage, shared = score(_fingerprint(page), _template(template))
+    assert len(shared) == 5
+    assert coverage == 0.25
+    assert confidence < 0.75
+
+
+def test_same_labels_score_fully():
+    labels = [f"label {chr(97 + i)}" for i in range(6)]
+    confidence, coverage, _ = score(_fingerprint(labels), _template(labels))
+    assert (confidence, coverage) == (1.0, 1.0)
+
+
+class _RecordingSession:
+    def __init__(self) -> None:
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+        class Result:
+            rowcount = 0
+
+        return Result()
+
+
+def test_learned_template_keeps_no_example_values():
+    labels = [f"label {chr(97 + i)}" for i in range(6)]
+    fp = _fingerprint(labels)
+    schema = {
+        "doc_type": "invoice",
+        "confidence": 0.9,
+        "tables": [{"name": "document", "fields": [{"name": "customer", "type": "string", "example": "Jane Roe"}]}],
+    }
+    ocr_payload = {"pages": [{"segments": [{"text": "Jane Roe", "bbox": [0.2, 0.2, 0.4, 0.25]}]}]}
+    session = _RecordingSession()
+
+    learn_template(session, fp, schema, ocr_payload)
+
+    params = session.statements[0].compile().params
+    assert params["schema_json"]["tables"][0]["fields"] == [{"name": "customer", "type": "string"}]
+    assert "customer" in params["field_boxes"]
+    assert schema["tables"][0]["fields"][0]["example"] == "Jane Roe"
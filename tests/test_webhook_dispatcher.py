@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fakeredis import aioredis
+
+from services.webhooks.dispatcher import DispatcherConfig, WebhookDispatcher, backoff_delay
+from services.webhooks.outbox import DEAD_LETTER_KEY, PENDING_KEY, PROCESSING_KEY, RETRY_KEY, delivery
+
+
+class StubEndpoint(ThreadingHTTPServer):
+    """Local webhook receiver; the path picks the response (``/ok``, ``/fail``, ``/throttle``, ``/gone``, ``/slow``)."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.requests: list[tuple[str, dict]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: StubEndpoint
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests.append((self.path, body))
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            if self.path.startswith("/slow"):
+                time.sleep(0.1)
+            status, headers = {
+                "/fail": (503, {}),
+                "/throttle": (429, {"Retry-After": "30"}),
+                "/gone": (404, {}),
+            }.get(self.path, (200, {}))
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class FakeRedis(aioredis.FakeRedis):
+    """fakeredis answers a BLMOVE on an empty list at once; wait out the timeout like Redis does."""
+
+    async def blmove(self, first_list, second_list, timeout, *args, **kwargs):
+        value = await super().blmove(first_list, second_list, timeout, *args, **kwargs)
+        if value is None:
+            await asyncio.sleep(timeout)
+        return value
+
+
+@pytest.fixture
+def endpoint():
+    server = StubEndpoint()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _config(**overrides) -> DispatcherConfig:
+    return DispatcherConfig(consumer="test", batch_window=0.05, poll_interval=0.05, **overrides)
+
+
+def _event(number: int) -> dict:
+    return {"event": "job.completed", "job_id": f"job-{number}", "status": "completed"}
+
+
+async def _dispatch(redis, config: DispatcherConfig, done, timeout: float = 5.0) -> WebhookDispatcher:
+    """Run a dispatcher until ``done()`` holds, then stop it."""
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        dispatcher = WebhookDispatcher(redis, client, config)
+        task = asyncio.create_task(dispatcher.run(shutdown_timeout=1.0))
+        deadline = time.monotonic() + timeout
+        while not await done():
+            assert time.monotonic() < deadline, "dispatcher did not settle in time"
+            await asyncio.sleep(0.02)
+        dispatcher.stop()
+        await task
+    return dispatcher
+
+
+async def _settled(redis) -> bool:
+    return not await redis.llen(PENDING_KEY) and not await redis.llen(PROCESSING_KEY.format(consumer="test"))
+
+
+def test_deliveries_to_one_url_are_batched(endpoint):
+    async def scenario():
+        redis = FakeRedis()
+        for number in range(3):
+            await redis.lpush(PENDING_KEY, json.dumps(delivery(endpoint.url("/ok"), _event(number))))
+        await redis.lpush(PENDING_KEY, json.dumps(delivery(endpoint.url("/other"), _event(3))))
+
+        dispatcher = await _dispatch(redis, _config(batch_size=10), lambda: _settled(redis))
+        return dispatcher
+
+    dispatcher = asyncio.run(scenario())
+
+    bodies = dict(endpoint.requests)
+    assert [event["job_id"] for event in bodies["/ok"]["events"]] == ["job-0", "job-1", "job-2"]
+    assert bodies["/other"]["job_id"] == "job-3"
+    assert dispatcher.metrics.delivered == 4
+    assert dispatcher.metrics.requests == 2
+
+
+def test_requests_per_host_are_limited(endpoint):
+    async def scenario():
+        redis = FakeRedis()
+        for number in range(8):
+            await redis.lpush(PENDING_KEY, json.dumps(delivery(endpoint.url(f"/slow/{number}"), _event(number))))
+
+        await _dispatch(redis, _config(per_host=2), lambda: _settled(redis))
+
+    asyncio.run(scenario())
+
+    assert len(endpoint.requests) == 8
+    assert endpoint.max_in_flight == 2
+
+
+def test_backoff_delay_grows_with_jitter_and_honours_retry_after():
+    for attempts, ceiling in ((1, 2.0), (3, 8.0), (20, 600.0)):
+        delay = backoff_delay(attempts, base=2.0, cap=600.0)
+        assert ceiling / 2 <= delay <= ceiling
+
+    assert backoff_delay(1, base=2.0, cap=600.0, retry_after=30.0) >= 30.0
+    assert backoff_delay(1, base=2.0, cap=600.0, retry_after=5000.0) <= 600.0
+
+
+def test_throttled_delivery_is_scheduled_after_retry_after(endpoint):
+    async def scenario():
+        redis = FakeRedis()
+        await redis.lpush(PENDING_KEY, json.dumps(delivery(endpoint.url("/throttle"), _event(1))))
+        started = time.time()
+
+        async def retried() -> bool:
+            return await redis.zcard(RETRY_KEY) == 1 and await _settled(redis)
+
+        await _dispatch(redis, _config(), retried)
+        [(raw, due)] = await redis.zrange(RETRY_KEY, 0, -1, withscores=True)
+        return json.loads(raw), due - started
+
+    item, delay = asyncio.run(scenario())
+
+    assert item["attempts"] == 1
+    assert item["last_status"] == 429
+    assert delay >= 30.0
+
+
+def test_deliveries_are_dead_lettered_after_max_attempts_or_final_status(endpoint):
+    async def scenario():
+        redis = FakeRedis()
+        exhausted = {**delivery(endpoint.url("/fail"), _event(1)), "attempts": 2}
+        await redis.lpush(PENDING_KEY, json.dumps(exhausted))
+        await redis.lpush(PENDING_KEY, json.dumps(delivery(endpoint.url("/gone"), _event(2))))
+
+        async def dead() -> bool:
+            return await redis.llen(DEAD_LETTER_KEY) == 2 and await _settled(redis)
+
+        await _dispatch(redis, _config(max_attempts=3), dead)
+        entries = [json.loads(raw) for raw in await redis.lrange(DEAD_LETTER_KEY, 0, -1)]
+        return entries, await redis.zcard(RETRY_KEY)
+
+    entries, retries = asyncio.run(scenario())
+
+    assert sorted((entry["last_status"], entry["attempts"]) for entry in entries) == [(404, 1), (503, 3)]
+    assert retries == 0
+
+
+def test_unacknowledged_deliveries_are_recovered_on_start(endpoint):
+    async def scenario():
+        redis = FakeRedis()
+        # Left behind by a dispatcher of the same consumer that crashed mid-delivery.
+        await redis.lpush(PROCESSING_KEY.format(consumer="test"), json.dumps(delivery(endpoint.url("/ok"), _event(1))))
+
+        await _dispatch(redis, _config(), lambda: _settled(redis))
+
+    asyncio.run(scenario())
+
+    assert [body["job_id"] for _, body in endpoint.requests] == ["job-1"]
+
+
+class InterleavingRedis(FakeRedis):
+    """Yields to the event loop after every watched read, so two promoters read the same due retries."""
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.immediate_execute_command
+
+        async def immediate_execute_command(*args, **options):
+            result = await execute(*args, **options)
+            await asyncio.sleep(0)
+            return result
+
+        pipe.immediate_execute_command = immediate_execute_command
+        return pipe
+
+
+def test_concurrent_promotion_pushes_each_retry_once():
+    async def scenario():
+        redis = InterleavingRedis()
+        now = time.time()
+        for number in range(3):
+            await redis.zadd(RETRY_KEY, {json.dumps(delivery("http://example.invalid/", _event(number))): now - 1})
+
+        async with httpx.AsyncClient() as client:
+            first = WebhookDispatcher(redis, client, DispatcherConfig(consumer="a"))
+            second = WebhookDispatcher(redis, client, DispatcherConfig(consumer="b"))
+            promoted = await asyncio.gather(first._promote_batch(), second._promote_batch())
+        return promoted, await redis.llen(PENDING_KEY), await redis.zcard(RETRY_KEY)
+
+    promoted, pending, retries = asyncio.run(scenario())
+
+    assert sorted(promoted) == [0, 3]
+    assert (pending, retries) == (3, 0)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from core.cache import TTLCache
+from core.config import get_settings
+from core.queue import get_async_redis_connection, get_redis_connection
+from users.models import UserModel
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+REDIS_KEY_PREFIX = "auth:user:"
+_INVALIDATED_KEY = "invalidated_user_ids"
+
+# The password hash is never cached; it stays unloaded on cached instances.
+_CACHED_COLUMNS = tuple(
+    column.key for column in UserModel.__table__.columns if column.key != "password"
+)
+_DATETIME_COLUMNS = {
+    column.key
+    for column in UserModel.__table__.columns
+    if column.key in _CACHED_COLUMNS and column.type.python_type is datetime
+}
+
+_local = TTLCache(maxsize=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL_SECONDS)
+# Scheduled Redis deletes, referenced until they finish so they are not garbage collected mid-flight.
+_pending_deletes: set[asyncio.Task] = set()
+
+
+def _snapshot(user: UserModel) -> dict[str, Any]:
+    return {key: getattr(user, key) for key in _CACHED_COLUMNS}
+
+
+def _from_snapshot(snapshot: dict[str, Any]) -> UserModel:
+    """Build a detached ``UserModel`` that never touches the database on attribute access."""
+    user = UserModel.__mapper__.class_manager.new_instance()
+    for key, value in snapshot.items():
+        set_committed_value(user, key, value)
+    make_transient_to_detached(user)
+    return user
+
+
+def _encode(snapshot: dict[str, Any]) -> str:
+    return json.dumps(
+        {
+            key: value.isoformat() if key in _DATETIME_COLUMNS and value is not None else value
+            for key, value in snapshot.items()
+        }
+    )
+
+
+def _decode(raw: bytes | str) -> dict[str, Any]:
+    data = json.loads(raw)
+    for key in _DATETIME_COLUMNS:
+        if data.get(key) is not None:
+            data[key] = datetime.fromisoformat(data[key])
+    return data
+
+
+async def get_cached_user(user_id: int) -> UserModel | None:
+    snapshot = _local.get(user_id)
+    if snapshot is None and settings.USER_CACHE_REDIS_ENABLED:
+        try:
+            raw = await get_async_redis_connection().get(f"{REDIS_KEY_PREFIX}{user_id}")
+        except Exception:
+            logger.warning("User cache lookup in Redis failed", exc_info=True)
+            raw = None
+        if raw is not None:
+            snapshot = _decode(raw)
+            _local.set(user_id, snapshot)
+    if snapshot is None:
+        return None
+    return _from_snapshot(snapshot)
+
+
+async def cache_user(user: UserModel) -> None:
+    snapshot = _snapshot(user)
+    _local.set(user.id, snapshot)
+    if settings.USER_CACHE_REDIS_ENABLED:
+        try:
+            await get_async_redis_connection().set(
+                f"{REDIS_KEY_PREFIX}{user.id}",
+                _encode(snapshot),
+                ex=settings.USER_CACHE_REDIS_TTL_SECONDS,
+            )
+        except Exception:
+            logger.warning("User cache write to Redis failed", exc_info=True)
+
+
+async def invalidate_user(user_id: int) -> None:
+    _local.pop(user_id)
+    if settings.USER_CACHE_REDIS_ENABLED:
+        try:
+            await get_async_redis_connection().delete(f"{REDIS_KEY_PREFIX}{user_id}")
+        except Exception:
+            logger.warning("User cache invalidation in Redis failed", exc_info=True)
+
+
+@event.listens_for(UserModel, "after_update")
+def _record_user_update(mapper, connection, target: UserModel) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(_INVALIDATED_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    user_ids = session.info.pop(_INVALIDATED_KEY, None)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        _local.pop(user_id)
+    if settings.USER_CACHE_REDIS_ENABLED:
+        keys = [f"{REDIS_KEY_PREFIX}{user_id}" for user_id in user_ids]
+        # Commits of AsyncSession run on the event loop thread, so the Redis
+        # delete can be scheduled there without blocking the commit; plain
+        # sync sessions (workers, scripts) delete before returning.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                get_redis_connection().delete(*keys)
+            except Exception:
+                logger.warning("User cache invalidation in Redis failed", exc_info=True)
+            return
+        task = loop.create_task(get_async_redis_connection().delete(*keys))
+        _pending_deletes.add(task)
+        task.add_done_callback(_finish_delete)
+
+
+def _finish_delete(task: asyncio.Task) -> None:
+    _pending_deletes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("User cache invalidation in Redis failed", exc_info=task.exception())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session: Session) -> None:
+    session.info.pop(_INVALIDATED_KEY, None)
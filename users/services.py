@@ -19,7 +19,7 @@ async def create_user_account(data: CreateUserRequest, db: AsyncSession):
         first_name=data.first_name,
         last_name=data.last_name,
         email=data.email,
-        password=get_password_hash(data.password),
+        password=await get_password_hash(data.password),
         is_active=True,
         is_verified=False,
         registered_at=datetime.now(),